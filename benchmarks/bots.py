@@ -0,0 +1,118 @@
+"""Bot-heavy tick benchmark: inline planning vs. the nav worker pool.
+
+Usage (from repo root):
+  python -m benchmarks.bots --rooms 4 --bots 15 --modes inline,thread,process
+  python -m benchmarks.bots --save /tmp/bots.json
+
+Every room is stepped once per tick, paced at real time (simulation_hz) so
+pooled plans complete at the rate they would in the server. Measured per mode
+(µs per call):
+  tick                 all rooms stepped once (what the service tick pays)
+  system.step_bots     step_bots per room
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any
+
+from benchmarks.common import FORMAT_VERSION, Samples, build_room, environment, write_json
+
+
+def _run_mode(mode: str, args: argparse.Namespace) -> dict[str, Any]:
+    import server.game.room as room_mod
+    from server.ai.planner import NavPool
+
+    pool = None
+    if mode != "inline":
+        pool = NavPool(args.workers, mode)
+    rooms = [build_room(args.map, 1, args.bots, seed=args.seed + i, room_id=f"r{i}", nav_pool=pool) for i in range(args.rooms)]
+    for room in rooms:
+        room.config.bot_ai_budget_us = args.ai_budget_us
+    if pool is not None:
+        # Start the workers (and build their grids) before timing.
+        for f in [pool.submit(rooms[0].nav, [0.0, 0.0, 0.0], [1.0, 0.0, 1.0]) for _ in range(args.workers * 2)]:
+            f.result()
+
+    tick_s = Samples()
+    bots_s = Samples()
+    orig = room_mod.step_bots
+    measuring = [False]
+
+    def timed(room, dt):
+        if not measuring[0]:
+            return orig(room, dt)
+        return bots_s.time(lambda: orig(room, dt))
+
+    dt = 1.0 / float(rooms[0].config.simulation_hz)
+    room_mod.step_bots = timed
+    try:
+        next_at = time.perf_counter()
+        for tick in range(1, args.warmup + args.ticks + 1):
+            measuring[0] = tick > args.warmup
+            t0 = time.perf_counter_ns()
+            for room in rooms:
+                room.step(tick, dt)
+            if measuring[0]:
+                tick_s.add(time.perf_counter_ns() - t0)
+            next_at += dt
+            delay = next_at - time.perf_counter()
+            if delay > 0.0:
+                time.sleep(delay)
+    finally:
+        room_mod.step_bots = orig
+        if pool is not None:
+            pool.shutdown()
+
+    out = {"tick": tick_s.summary(), "system.step_bots": bots_s.summary()}
+    if pool is not None:
+        out["nav"] = pool.payload()
+    return out
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--map", default="map01")
+    ap.add_argument("--rooms", type=int, default=4)
+    ap.add_argument("--bots", type=int, default=15, help="bots per room")
+    ap.add_argument("--modes", default="inline,thread,process")
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--ai-budget-us", type=float, default=0.0, help="per-room AI budget (0 = unlimited)")
+    ap.add_argument("--ticks", type=int, default=600)
+    ap.add_argument("--warmup", type=int, default=60)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", default=None, help="write JSON here (default: stdout)")
+    args = ap.parse_args()
+
+    results = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        results[mode] = _run_mode(mode, args)
+        r = results[mode]["tick"]
+        print(f"{mode:>8}: tick mean {r['meanUs']:.0f} us  p95 {r['p95Us']:.0f} us  max {r['maxUs']:.0f} us", flush=True)
+
+    write_json(
+        args.save,
+        {
+            "tool": "benchmarks.bots",
+            "format": FORMAT_VERSION,
+            "timestamp": time.time(),
+            "environment": environment(),
+            "scenario": {
+                "map": args.map,
+                "rooms": args.rooms,
+                "botsPerRoom": args.bots,
+                "workers": args.workers,
+                "aiBudgetUs": args.ai_budget_us,
+                "ticks": args.ticks,
+                "warmup": args.warmup,
+                "seed": args.seed,
+            },
+            "results": results,
+        },
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
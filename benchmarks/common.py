@@ -0,0 +1,174 @@
+"""Shared helpers for in-process benchmarks: room setup, timing, JSON I/O."""
+
+from __future__ import annotations
+
+import json
+import math
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+FORMAT_VERSION = 1
+
+
+def repo_root() -> str:
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+class Samples:
+    """Collects per-call durations (ns) for one measured operation."""
+
+    def __init__(self):
+        self.ns: list[int] = []
+
+    def add(self, ns: int) -> None:
+        self.ns.append(ns)
+
+    def time(self, fn: Callable[[], Any]) -> Any:
+        t0 = time.perf_counter_ns()
+        out = fn()
+        self.ns.append(time.perf_counter_ns() - t0)
+        return out
+
+    def summary(self) -> dict[str, Any]:
+        if not self.ns:
+            return {"n": 0}
+        us = sorted(n / 1000.0 for n in self.ns)
+
+        def pct(q: float) -> float:
+            return us[max(0, min(len(us) - 1, int(round(q * (len(us) - 1)))))]
+
+        return {
+            "n": len(us),
+            "meanUs": statistics.fmean(us),
+            "p50Us": pct(0.50),
+            "p95Us": pct(0.95),
+            "minUs": us[0],
+            "maxUs": us[-1],
+        }
+
+
+def make_config(humans: int, bots: int):
+    from server.game.config import ServerConfig
+
+    cfg = ServerConfig()
+    cfg.sqlite_enabled = False
+    cfg.bots_enabled = bots > 0
+    cfg.bot_count = bots
+    cfg.max_players_per_room = max(cfg.max_players_per_room, humans + bots + 1)
+    return cfg
+
+
+def build_room(map_id: str, humans: int, bots: int, seed: int = 1, room_id: str = "bench", nav_pool=None):
+    """Room with `humans` scripted players and `bots` server bots; no network, no sqlite."""
+    from server.game.room import Room
+    from server.storage.memory import MemoryStore
+
+    # Room seeds itself from the global RNG; pin it so runs are comparable.
+    random.seed(seed)
+    cfg = make_config(humans, bots)
+    room = Room(room_id=room_id, map_id=map_id, config=cfg, memory=MemoryStore(), sqlite=None, nav_pool=nav_pool)
+    for i in range(humans):
+        room.add_player(f"h{i:03d}", f"Human {i}")
+    return room
+
+
+def human_ids(room) -> list[str]:
+    return [pid for pid in room.players if not pid.startswith("bot_")]
+
+
+def drive_humans(room, tick: int, fire_every: int = 20, weapons: tuple[str, ...] = ("pistol", "shotgun", "rocket")) -> None:
+    """Scripted input: run in circles, switch weapons, fire every `fire_every` ticks."""
+    for i, pid in enumerate(human_ids(room)):
+        t = tick / 60.0
+        yaw = (t * 0.8 + i * 0.7) % math.tau - math.pi
+        room.apply_input(
+            pid,
+            {
+                "seq": tick,
+                "moveX": 0.0,
+                "moveY": 1.0,
+                "jump": False,
+                "sprint": True,
+                "yaw": yaw,
+                "pitch": 0.0,
+                "fire": fire_every > 0 and ((tick + i) % fire_every) == 0,
+                "weaponId": weapons[i % len(weapons)],
+                "reload": False,
+            },
+        )
+
+
+def top_up_projectiles(room, count: int) -> None:
+    """Keep `count` rockets in flight along the map edge.
+
+    They run the full integrate + collide path but stay clear of the arena so
+    the benchmark doesn't turn into a room full of corpses.
+    """
+    if count <= 0 or not room.players:
+        return
+    from server.game.systems.projectiles import spawn_rocket
+
+    owner = next(iter(room.players))
+    bmin, bmax = room.map.bounds.min, room.map.bounds.max
+    k = len(room.projectiles)
+    while len(room.projectiles) < count:
+        side = 1.0 if k % 2 else -1.0
+        x = (bmax[0] - 2.0) if side > 0 else (bmin[0] + 2.0)
+        z = bmin[2] + 2.0 + (k * 7.0) % max(1.0, bmax[2] - bmin[2] - 4.0)
+        spawn_rocket(room, owner, [x, bmax[1] - 0.5, z], [0.0, 0.0, side], "rocket")
+        k += 1
+
+
+def environment() -> dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+    }
+
+
+def write_json(path: str | None, data: dict[str, Any]) -> None:
+    text = json.dumps(data, indent=2)
+    if not path:
+        print(text)
+        return
+    out = os.path.abspath(path)
+    os.makedirs(os.path.dirname(out), exist_ok=True)
+    with open(out, "w", encoding="utf-8") as f:
+        f.write(text)
+    print(f"Wrote {out}", file=sys.stderr)
+
+
+def compare(baseline_path: str, current: dict[str, Any], threshold: float, metric: str = "p50Us") -> int:
+    """Print a ratio table against a saved run. Returns the number of regressions."""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        base = json.load(f)
+
+    base_res = base.get("results", {})
+    cur_res = current.get("results", {})
+    regressions = 0
+    width = max([len(k) for k in cur_res] + [10])
+    print(f"{'operation':<{width}}  {'base':>10}  {'current':>10}  {'ratio':>7}", file=sys.stderr)
+    for name, cur in cur_res.items():
+        b = base_res.get(name)
+        if not b or metric not in b or metric not in cur:
+            print(f"{name:<{width}}  {'-':>10}  {cur.get(metric, 0.0):>10.1f}  {'new':>7}", file=sys.stderr)
+            continue
+        ratio = cur[metric] / b[metric] if b[metric] > 0 else float("inf")
+        flag = ""
+        if ratio > 1.0 + threshold:
+            regressions += 1
+            flag = "  REGRESSION"
+        elif ratio < 1.0 - threshold:
+            flag = "  faster"
+        print(f"{name:<{width}}  {b[metric]:>10.1f}  {cur[metric]:>10.1f}  {ratio:>7.2f}{flag}", file=sys.stderr)
+    for name in base_res:
+        if name not in cur_res:
+            print(f"{name:<{width}}  {base_res[name].get(metric, 0.0):>10.1f}  {'-':>10}  {'gone':>7}", file=sys.stderr)
+    return regressions
@@ -0,0 +1,131 @@
+"""Bot visibility checks: grid DDA raycasts vs. the exact AABB ray tests.
+
+Usage (from repo root):
+  python -m benchmarks.los --map map01 --rays 2000
+  python -m benchmarks.los --boxes 300        # map01 plus 300 random crates
+
+Measured (µs per call) from random walkable points at eye height:
+  los.aabb        first_obstacle_hit over every collider (the old bot LOS check)
+  los.grid        GridNav.raycast on the sight grid
+  wander.plan     GridNav.next_direction to a wander candidate (the old validation, one plan each)
+  wander.grid     GridNav.can_walk to the same candidate
+`agreement` counts rays where the grid saw through a wall the exact test hit
+(`missedWalls`, should be 0) or was blocked where the exact test was clear
+(`extraBlocks`, the cost of cell-sized footprints).
+"""
+
+from __future__ import annotations
+
+import argparse
+import dataclasses
+import math
+import random
+import time
+from typing import Any
+
+from benchmarks.common import FORMAT_VERSION, Samples, environment, write_json
+
+
+def _with_boxes(map_data, count: int, rng: random.Random):
+    from server.game.world import AABB
+
+    bmin, bmax = map_data.bounds.min, map_data.bounds.max
+    boxes = list(map_data.colliders)
+    for _ in range(count):
+        sx = rng.uniform(0.5, 4.0)
+        sz = rng.uniform(0.5, 4.0)
+        x = rng.uniform(bmin[0] + sx, bmax[0] - sx)
+        z = rng.uniform(bmin[2] + sz, bmax[2] - sz)
+        boxes.append(AABB.from_center_size(x, 1.0, z, sx, 2.0, sz))
+    # Drop the BVH and compiled nav grids: they describe the original colliders.
+    return dataclasses.replace(map_data, colliders=boxes, bvh=None, nav=None)
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--map", default="map01")
+    ap.add_argument("--boxes", type=int, default=0, help="extra random 2 m tall crates")
+    ap.add_argument("--rays", type=int, default=2000)
+    ap.add_argument("--range", type=float, default=28.0, help="bot LOS range (m)")
+    ap.add_argument("--wander", type=int, default=300, help="wander candidates to validate")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", default=None, help="write JSON here (default: stdout)")
+    args = ap.parse_args()
+
+    from server.ai.nav import GridNav
+    from server.game.config import ServerConfig
+    from server.game.systems.collision import first_obstacle_hit
+    from server.game.world import load_map
+
+    cfg = ServerConfig()
+    rng = random.Random(args.seed)
+    map_data = _with_boxes(load_map(args.map), args.boxes, rng)
+    nav = GridNav(map_data, cell_size=1.0, pad=cfg.player_radius, cluster_size=cfg.nav_cluster_size, jps=cfg.nav_jps)
+    free = [(x, z) for x in range(nav.w) for z in range(nav.h) if not nav.blocked[x][z]]
+
+    def point() -> list[float]:
+        ix, iz = rng.choice(free)
+        x, z = nav._cell_center(ix, iz)
+        return [x + rng.uniform(-0.5, 0.5), cfg.eye_height, z + rng.uniform(-0.5, 0.5)]
+
+    rays = []
+    for _ in range(args.rays):
+        ang = rng.random() * math.tau
+        rays.append((point(), [math.cos(ang), 0.0, math.sin(ang)]))
+
+    exact_s = Samples()
+    grid_s = Samples()
+    missed = extra = 0
+    colliders = map_data.colliders
+    for origin, d in rays:
+        t_exact = exact_s.time(lambda: first_obstacle_hit(origin, d, colliders, args.range))
+        t_grid = grid_s.time(lambda: nav.raycast(origin, d, args.range))
+        if t_exact is not None and t_grid is None:
+            missed += 1
+        elif t_grid is not None and t_exact is None:
+            extra += 1
+
+    plan_s = Samples()
+    walk_s = Samples()
+    for _ in range(args.wander):
+        a = point()
+        ang = rng.random() * math.tau
+        rad = 4.0 + rng.random() * 8.0
+        b = [a[0] + math.cos(ang) * rad, a[1], a[2] + math.sin(ang) * rad]
+        plan_s.time(lambda: nav.next_direction(a, b))
+        walk_s.time(lambda: nav.can_walk(a, b))
+
+    results: dict[str, Any] = {
+        "los.aabb": exact_s.summary(),
+        "los.grid": grid_s.summary(),
+        "wander.plan": plan_s.summary(),
+        "wander.grid": walk_s.summary(),
+    }
+    for name, r in results.items():
+        print(f"{name:>12}: mean {r['meanUs']:.1f} us  p95 {r['p95Us']:.1f} us", flush=True)
+    print(f"   agreement: missedWalls {missed}  extraBlocks {extra} / {args.rays}", flush=True)
+
+    write_json(
+        args.save,
+        {
+            "tool": "benchmarks.los",
+            "format": FORMAT_VERSION,
+            "timestamp": time.time(),
+            "environment": environment(),
+            "scenario": {
+                "map": args.map,
+                "colliders": len(colliders),
+                "rays": args.rays,
+                "range": args.range,
+                "wander": args.wander,
+                "seed": args.seed,
+            },
+            "results": results,
+            "agreement": {"rays": args.rays, "missedWalls": missed, "extraBlocks": extra},
+        },
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,110 @@
+"""Map loading: JSON vs. the compiled bundle (tools/export_map.py --compile).
+
+Usage (from repo root):
+  python tools/export_map.py --compile map01
+  python -m benchmarks.maps --map map01
+
+Measured (µs per call):
+  load.json / load.bundle        parse the JSON / map the bundle (no cache)
+  gridnav.json / gridnav.bundle  GridNav for a room (rasterize vs. mapped grids)
+  room.json / room.bundle        Room construction (shared HPA* hierarchy warm)
+  colliders.linear / .bvh        hitscan-sized collider query, filter vs. BVH
+                                 (`--boxes N` adds random crates for this one)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import time
+from typing import Any
+
+from benchmarks.common import FORMAT_VERSION, Samples, build_room, environment, write_json
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--map", default="map01")
+    ap.add_argument("--repeat", type=int, default=20)
+    ap.add_argument("--boxes", type=int, default=300, help="random crates for the collider query")
+    ap.add_argument("--queries", type=int, default=2000)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", default=None, help="write JSON here (default: stdout)")
+    args = ap.parse_args()
+
+    from server.ai.nav import GridNav
+    from server.game import world
+    from server.game.bvh import build_bvh
+    from server.game.config import ServerConfig
+    from server.game.mapbin import read_bundle
+    from server.game.systems.collision import aabb_overlaps
+    from server.game.world import AABB, parse_map
+
+    src = os.path.join(world.maps_dir(), f"{args.map}.json")
+    bundle = os.path.join(world.maps_dir(), f"{args.map}.mapbin")
+    if not os.path.exists(bundle):
+        ap.error(f"{bundle} missing; run tools/export_map.py --compile {args.map}")
+    cfg = ServerConfig()
+    results: dict[str, Samples] = {}
+
+    def load_json():
+        with open(src, "rb") as f:
+            return parse_map(json.loads(f.read()), args.map)
+
+    maps = {"json": load_json(), "bundle": read_bundle(bundle)[0]}
+    for kind, m in maps.items():
+        s = results.setdefault(f"load.{kind}", Samples())
+        for _ in range(args.repeat):
+            s.time(load_json if kind == "json" else lambda: read_bundle(bundle))
+        s = results.setdefault(f"gridnav.{kind}", Samples())
+        for _ in range(max(1, args.repeat // 4)):
+            s.time(lambda: GridNav(m, cell_size=1.0, pad=cfg.player_radius, jps=cfg.nav_jps))
+        # Rooms take the cached map; swap in the one under test.
+        world._MAPS[args.map] = m
+        build_room(args.map, 0, 0)
+        s = results.setdefault(f"room.{kind}", Samples())
+        for _ in range(max(1, args.repeat // 4)):
+            s.time(lambda: build_room(args.map, 0, 0))
+    world._MAPS.pop(args.map, None)
+
+    rng = random.Random(args.seed)
+    base = maps["json"]
+    bmin, bmax = base.bounds.min, base.bounds.max
+    boxes = list(base.colliders)
+    for _ in range(args.boxes):
+        x = rng.uniform(bmin[0] + 4, bmax[0] - 4)
+        z = rng.uniform(bmin[2] + 4, bmax[2] - 4)
+        boxes.append(AABB.from_center_size(x, 1.0, z, rng.uniform(0.5, 4.0), 2.0, rng.uniform(0.5, 4.0)))
+    bvh = build_bvh(boxes)
+    queries = []
+    for _ in range(args.queries):
+        x = rng.uniform(bmin[0], bmax[0])
+        z = rng.uniform(bmin[2], bmax[2])
+        queries.append(AABB.from_center_size(x, 1.5, z, 40.0, 3.0, 40.0))  # ~ a 20 m hitscan
+    linear = results.setdefault("colliders.linear", Samples())
+    tree = results.setdefault("colliders.bvh", Samples())
+    mismatches = 0
+    for q in queries:
+        a = linear.time(lambda: [c for c in boxes if aabb_overlaps(c, q)])
+        b = tree.time(lambda: [boxes[i] for i in bvh.query(q) if aabb_overlaps(boxes[i], q)])
+        mismatches += a != b
+
+    out: dict[str, Any] = {
+        "tool": "benchmarks.maps",
+        "format": FORMAT_VERSION,
+        "timestamp": time.time(),
+        "environment": environment(),
+        "scenario": {"map": args.map, "repeat": args.repeat, "boxes": args.boxes, "queries": args.queries, "seed": args.seed},
+        "results": {k: v.summary() for k, v in results.items()},
+        "bundleBytes": os.path.getsize(bundle),
+        "bvhNodes": bvh.node_count,
+        "queryMismatches": mismatches,
+    }
+    write_json(args.save, out)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,126 @@
+"""Path planning benchmark: flat A*, Jump Point Search and HPA* on one map.
+
+Usage (from repo root):
+  python -m benchmarks.nav --map map01 --pairs 300
+  python -m benchmarks.nav --modes astar,jps --max-nodes 1200 --save /tmp/nav.json
+
+Plans between the same seeded random pairs of walkable cells in every mode.
+Per mode: µs per plan, cells expanded per plan (flat modes), plans found and
+mean path cost relative to the cheapest mode.
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import statistics
+import time
+from typing import Any
+
+from benchmarks.common import FORMAT_VERSION, Samples, environment, write_json
+
+MODES = ("astar", "jps", "hpa")
+
+
+def _path_cost(cells: list[tuple[int, int]]) -> float:
+    from server.ai.nav import octile
+
+    return sum(octile(a, b) for a, b in zip(cells, cells[1:]))
+
+
+def _run_mode(mode: str, map_data, pairs, args: argparse.Namespace) -> tuple[dict[str, Any], list[float | None]]:
+    from server.ai.nav import GridNav
+
+    nav = GridNav(
+        map_data,
+        cell_size=args.cell,
+        pad=args.pad,
+        cluster_size=args.cluster if mode == "hpa" else 0,
+        jps=mode == "jps",
+    )
+    plan = nav.hpa.plan if mode == "hpa" else (lambda a, b: nav.plan_cells(a, b, args.max_nodes))
+    # Warm lazy state (JPS jump tables, HPA* cluster edges) outside the timed runs.
+    for a, b in pairs:
+        plan(a, b)
+
+    samples = Samples()
+    expanded: list[int] = []
+    costs: list[float | None] = []
+    for a, b in pairs:
+        cells = samples.time(lambda: plan(a, b))
+        if mode != "hpa":
+            expanded.append(nav.last_expanded)
+        costs.append(_path_cost(cells) if cells else None)
+    out = samples.summary()
+    out["found"] = sum(1 for c in costs if c is not None)
+    if expanded:
+        out["expandedMean"] = statistics.fmean(expanded)
+        out["expandedMax"] = max(expanded)
+    return out, costs
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--map", default="map01")
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--pairs", type=int, default=300)
+    ap.add_argument("--max-nodes", type=int, default=1200, help="expansion cap for flat modes (GridNav.plan default)")
+    ap.add_argument("--cluster", type=int, default=16, help="HPA* cluster size in cells")
+    ap.add_argument("--cell", type=float, default=1.0)
+    ap.add_argument("--pad", type=float, default=0.4)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", default=None, help="write JSON here (default: stdout)")
+    args = ap.parse_args()
+
+    from server.ai.nav import GridNav
+    from server.game.world import load_map
+
+    map_data = load_map(args.map)
+    grid = GridNav(map_data, cell_size=args.cell, pad=args.pad)
+    free = [(x, z) for x in range(grid.w) for z in range(grid.h) if not grid.blocked[x][z]]
+    rng = random.Random(args.seed)
+    pairs = [tuple(rng.sample(free, 2)) for _ in range(args.pairs)]
+
+    results: dict[str, Any] = {}
+    costs: dict[str, list[float | None]] = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        if mode not in MODES:
+            ap.error(f"unknown mode: {mode}")
+        results[mode], costs[mode] = _run_mode(mode, map_data, pairs, args)
+
+    # Path quality: cost over the cheapest path any mode found for the same pair.
+    for mode, cs in costs.items():
+        ratios = []
+        for i, c in enumerate(cs):
+            best = min((other[i] for other in costs.values() if other[i] is not None), default=None)
+            if c is not None and best:
+                ratios.append(c / best)
+        results[mode]["costRatioMean"] = statistics.fmean(ratios) if ratios else None
+        r = results[mode]
+        exp = f"  expanded {r['expandedMean']:.0f}" if "expandedMean" in r else ""
+        print(f"{mode:>6}: {r['meanUs']:.0f} us/plan  p95 {r['p95Us']:.0f} us  found {r['found']}/{args.pairs}{exp}", flush=True)
+
+    write_json(
+        args.save,
+        {
+            "tool": "benchmarks.nav",
+            "format": FORMAT_VERSION,
+            "timestamp": time.time(),
+            "environment": environment(),
+            "scenario": {
+                "map": args.map,
+                "pairs": args.pairs,
+                "maxNodes": args.max_nodes,
+                "cluster": args.cluster,
+                "cell": args.cell,
+                "pad": args.pad,
+                "seed": args.seed,
+            },
+            "results": results,
+        },
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
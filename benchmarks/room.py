@@ -0,0 +1,204 @@
+"""Room.step / per-system / snapshot benchmark (in-process, no network).
+
+Usage (from repo root):
+  python -m benchmarks.room --humans 8 --bots 4 --projectiles 6 --ticks 600
+  python -m benchmarks.room --save benchmarks/baseline.json
+  python -m benchmarks.room --baseline benchmarks/baseline.json --threshold 0.10
+
+Measured operations (µs per call):
+  room.step              full Room.step
+  system.<step_*>        each system Room.step runs, timed in place
+  freeze_world           Room.freeze_world, once per broadcast
+  snapshot_for           Room._snapshot_for on that frozen state, one call per connected human
+  broadcast              Room.broadcast_snapshots incl. delta cache + JSON encode
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from types import SimpleNamespace
+from typing import Any
+
+from benchmarks.common import (
+    FORMAT_VERSION,
+    Samples,
+    build_room,
+    compare,
+    drive_humans,
+    environment,
+    human_ids,
+    top_up_projectiles,
+    write_json,
+)
+
+
+class _NullWs:
+    """Stands in for aiohttp's WebSocketResponse; counts encoded bytes."""
+
+    def __init__(self):
+        self.bytes = 0
+        self.frames = 0
+
+    async def send_str(self, data: str) -> None:
+        self.bytes += len(data)
+        self.frames += 1
+
+
+def _make_hub(room, hub=None):
+    """Null-socket connections for the room's humans, on a new hub (or `hub`)."""
+    from server.net.rate_limit import TokenBucket
+    from server.net.ws import Connection, WsHub
+
+    if hub is None:
+        svc = SimpleNamespace(config=room.config, tick=0)
+        hub = WsHub(svc)
+    else:
+        svc = hub.svc
+    sockets = []
+    for pid in human_ids(room):
+        ws = _NullWs()
+        sockets.append(ws)
+        conn = Connection(
+            conn_id=f"{room.room_id}:{pid}",
+            ws=ws,
+            created_at=time.time(),
+            player_id=pid,
+            player_name=room.players[pid].name,
+            room_id=room.room_id,
+            hello_version="bench",
+            want_deltas=False,
+            input_bucket=TokenBucket(rate_per_sec=120.0, burst=240.0),
+            chat_bucket=TokenBucket(rate_per_sec=1.5, burst=3.0),
+        )
+        hub._register(conn)
+    return svc, hub, sockets
+
+
+def _advance(room, tick: int, args: argparse.Namespace) -> None:
+    drive_humans(room, tick, fire_every=args.fire_every, weapons=tuple(args.weapons.split(",")))
+    top_up_projectiles(room, args.projectiles)
+
+
+def bench(args: argparse.Namespace) -> dict[str, Any]:
+    import server.game.room as room_mod
+
+    results: dict[str, Samples] = {}
+    dt = 1.0 / 60.0
+
+    # Pass 1: whole-step timing, systems untouched.
+    room = build_room(args.map, args.humans, args.bots, seed=args.seed)
+    step = results.setdefault("room.step", Samples())
+    for tick in range(1, args.warmup + args.ticks + 1):
+        _advance(room, tick, args)
+        if tick <= args.warmup:
+            room.step(tick, dt)
+        else:
+            step.time(lambda: room.step(tick, dt))
+
+    # Pass 2: per-system timing. Wrap every step_* Room.step calls, in place,
+    # so new systems show up without touching this file.
+    names = [n for n in dir(room_mod) if n.startswith("step_") and callable(getattr(room_mod, n))]
+    originals = {n: getattr(room_mod, n) for n in names}
+    measuring = [False]
+
+    def wrap(name, fn):
+        samples = results.setdefault(f"system.{name}", Samples())
+
+        def timed(*a, **kw):
+            if not measuring[0]:
+                return fn(*a, **kw)
+            t0 = time.perf_counter_ns()
+            try:
+                return fn(*a, **kw)
+            finally:
+                samples.add(time.perf_counter_ns() - t0)
+
+        return timed
+
+    room = build_room(args.map, args.humans, args.bots, seed=args.seed)
+    try:
+        for n, fn in originals.items():
+            setattr(room_mod, n, wrap(n, fn))
+        for tick in range(1, args.warmup + args.ticks + 1):
+            _advance(room, tick, args)
+            measuring[0] = tick > args.warmup
+            room.step(tick, dt)
+    finally:
+        for n, fn in originals.items():
+            setattr(room_mod, n, fn)
+
+    # Pass 3: snapshots. Same room state; step between samples so events/positions move.
+    freeze = results.setdefault("freeze_world", Samples())
+    snap_for = results.setdefault("snapshot_for", Samples())
+    broadcast = results.setdefault("broadcast", Samples())
+    svc, hub, sockets = _make_hub(room)
+    loop = asyncio.new_event_loop()
+    try:
+        tick = args.warmup + args.ticks
+        for i in range(max(1, args.ticks // 4)):
+            tick += 1
+            _advance(room, tick, args)
+            room.step(tick, dt)
+            svc.tick = tick
+            world = freeze.time(room.freeze_world)
+            for pid in human_ids(room):
+                snap_for.time(lambda: room._snapshot_for(pid, world))
+            t0 = time.perf_counter_ns()
+            loop.run_until_complete(room.broadcast_snapshots(hub))
+            broadcast.add(time.perf_counter_ns() - t0)
+    finally:
+        loop.close()
+
+    frames = sum(s.frames for s in sockets)
+    return {
+        "tool": "benchmarks.room",
+        "format": FORMAT_VERSION,
+        "timestamp": time.time(),
+        "environment": environment(),
+        "scenario": {
+            "map": args.map,
+            "humans": args.humans,
+            "bots": args.bots,
+            "projectiles": args.projectiles,
+            "ticks": args.ticks,
+            "warmup": args.warmup,
+            "fireEvery": args.fire_every,
+            "weapons": args.weapons,
+            "seed": args.seed,
+        },
+        "results": {k: v.summary() for k, v in results.items()},
+        "snapshotBytesMean": (sum(s.bytes for s in sockets) / frames) if frames else 0.0,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--map", default="map01")
+    ap.add_argument("--humans", type=int, default=8)
+    ap.add_argument("--bots", type=int, default=4)
+    ap.add_argument("--projectiles", type=int, default=4, help="rockets kept in flight")
+    ap.add_argument("--ticks", type=int, default=600)
+    ap.add_argument("--warmup", type=int, default=60)
+    ap.add_argument("--fire-every", type=int, default=20, help="each human fires every N ticks (0 = never)")
+    ap.add_argument("--weapons", default="pistol,shotgun,rocket", help="comma-separated; humans cycle through these")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", default=None, help="write JSON here (default: stdout)")
+    ap.add_argument("--baseline", default=None, help="compare against a saved JSON run")
+    ap.add_argument("--metric", default="p50Us", choices=("p50Us", "meanUs", "p95Us", "minUs"))
+    ap.add_argument("--threshold", type=float, default=0.10, help="relative slowdown counted as a regression")
+    args = ap.parse_args()
+
+    result = bench(args)
+    if args.baseline:
+        regressions = compare(args.baseline, result, args.threshold, metric=args.metric)
+        if args.save:
+            write_json(args.save, result)
+        return 1 if regressions else 0
+    write_json(args.save, result)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,171 @@
+"""Many small rooms on one map: room-by-room stepping vs. batched stepping.
+
+Usage (from repo root):
+  python -m benchmarks.rooms --rooms 20 --humans 8 --bots 4 --projectiles 2
+  python -m benchmarks.rooms --modes serial,batch --save /tmp/rooms.json
+
+Both modes step the same seeded rooms with the same scripted input (bot AI
+budget off, so timing can't change decisions). Measured (µs per call):
+  tick                  every room stepped once
+  system.movement       step_movement (serial: summed over rooms) / step_movement_batch
+  system.projectiles    step_projectiles / step_projectiles_batch
+`maxPosDiff` is the largest player or rocket position difference between the
+modes at the end of the run (float rounding only; inf if different rockets
+are alive).
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+import uuid
+from typing import Any
+
+from benchmarks.common import FORMAT_VERSION, Samples, build_room, drive_humans, environment, top_up_projectiles, write_json
+
+
+def _rooms(args: argparse.Namespace) -> list:
+    rooms = [build_room(args.map, args.humans, args.bots, seed=args.seed + i, room_id=f"r{i:02d}") for i in range(args.rooms)]
+    cfg = rooms[0].config
+    cfg.bot_ai_budget_us = 0.0
+    for room in rooms:
+        # Batched groups share one config object, as rooms do in the service.
+        room.config = cfg
+    return rooms
+
+
+def _run_mode(mode: str, args: argparse.Namespace) -> tuple[dict[str, Any], list]:
+    import server.game.batch as batch_mod
+    import server.game.room as room_mod
+
+    dt = 1.0 / 60.0
+    tick_s = Samples()
+    move_s = Samples()
+    proj_s = Samples()
+    measuring = [False]
+    acc = [0, 0]
+
+    def timed(fn, slot):
+        def inner(*a, **kw):
+            t0 = time.perf_counter_ns()
+            try:
+                return fn(*a, **kw)
+            finally:
+                acc[slot] += time.perf_counter_ns() - t0
+
+        return inner
+
+    patched = {
+        (room_mod, "step_movement"): timed(room_mod.step_movement, 0),
+        (room_mod, "step_projectiles"): timed(room_mod.step_projectiles, 1),
+        (batch_mod, "step_movement_batch"): timed(batch_mod.step_movement_batch, 0),
+        (batch_mod, "step_projectiles_batch"): timed(batch_mod.step_projectiles_batch, 1),
+        # Bot and rocket ids come from uuid4 and key per-entity RNG: pin them so every mode plays the same game.
+        (uuid, "uuid4"): lambda: uuid.UUID(int=ids.getrandbits(128), version=4),
+    }
+    ids = random.Random(args.seed)
+    originals = {k: getattr(*k) for k in patched}
+    try:
+        for (mod, name), fn in patched.items():
+            setattr(mod, name, fn)
+        rooms = _rooms(args)
+        for tick in range(1, args.warmup + args.ticks + 1):
+            for room in rooms:
+                drive_humans(room, tick, fire_every=args.fire_every)
+                top_up_projectiles(room, args.projectiles)
+            measuring[0] = tick > args.warmup
+            acc[0] = acc[1] = 0
+            t0 = time.perf_counter_ns()
+            if mode == "batch":
+                for group in batch_mod.group_rooms(rooms):
+                    batch_mod.step_rooms(group, tick, dt)
+            else:
+                for room in rooms:
+                    room.step(tick, dt)
+            if measuring[0]:
+                tick_s.add(time.perf_counter_ns() - t0)
+                move_s.add(acc[0])
+                proj_s.add(acc[1])
+    finally:
+        for (mod, name), fn in originals.items():
+            setattr(mod, name, fn)
+
+    out = {"tick": tick_s.summary(), "system.movement": move_s.summary(), "system.projectiles": proj_s.summary()}
+    return out, rooms
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--map", default="map01")
+    ap.add_argument("--rooms", type=int, default=20)
+    ap.add_argument("--humans", type=int, default=8)
+    ap.add_argument("--bots", type=int, default=4)
+    ap.add_argument("--projectiles", type=int, default=2, help="rockets kept in flight per room")
+    ap.add_argument("--fire-every", type=int, default=20, help="each human fires every N ticks (0 = never)")
+    ap.add_argument("--modes", default="serial,batch")
+    ap.add_argument("--ticks", type=int, default=300)
+    ap.add_argument("--warmup", type=int, default=30)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", default=None, help="write JSON here (default: stdout)")
+    args = ap.parse_args()
+
+    from server.game import batch
+
+    if not batch.available():
+        print("NumPy is not installed: batch mode steps rooms one by one", flush=True)
+
+    results: dict[str, Any] = {}
+    finals: dict[str, list] = {}
+    for mode in [m.strip() for m in args.modes.split(",") if m.strip()]:
+        results[mode], finals[mode] = _run_mode(mode, args)
+        r = results[mode]
+        print(
+            f"{mode:>7}: tick mean {r['tick']['meanUs']:.0f} us  p95 {r['tick']['p95Us']:.0f} us  "
+            f"movement {r['system.movement']['meanUs']:.0f} us  projectiles {r['system.projectiles']['meanUs']:.0f} us",
+            flush=True,
+        )
+
+    diff = None
+    if "serial" in finals and "batch" in finals:
+        diff = 0.0
+        for a, b in zip(finals["serial"], finals["batch"]):
+            for pid, p in a.players.items():
+                q = b.players.get(pid)
+                if q is not None:
+                    diff = max(diff, max(abs(x - y) for x, y in zip(p.pos, q.pos)))
+            if set(a.projectiles) != set(b.projectiles):
+                diff = float("inf")
+            for rid, r in a.projectiles.items():
+                q = b.projectiles.get(rid)
+                if q is not None:
+                    diff = max(diff, max(abs(x - y) for x, y in zip(r.pos, q.pos)))
+        print(f"maxPosDiff {diff:.3g}", flush=True)
+
+    write_json(
+        args.save,
+        {
+            "tool": "benchmarks.rooms",
+            "format": FORMAT_VERSION,
+            "timestamp": time.time(),
+            "environment": environment(),
+            "scenario": {
+                "map": args.map,
+                "rooms": args.rooms,
+                "humansPerRoom": args.humans,
+                "botsPerRoom": args.bots,
+                "projectilesPerRoom": args.projectiles,
+                "fireEvery": args.fire_every,
+                "ticks": args.ticks,
+                "warmup": args.warmup,
+                "seed": args.seed,
+            },
+            "results": results,
+            "maxPosDiff": diff,
+        },
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,134 @@
+"""Snapshot broadcast encoding: inline json / orjson vs. the encode pool.
+
+Usage (from repo root):
+  python -m benchmarks.snapshots --rooms 20 --humans 16
+  python -m benchmarks.snapshots --modes json,orjson,thread,process --workers 2
+
+Every mode broadcasts the same stepped rooms through one hub (null sockets).
+Measured per snapshot tick (all rooms broadcast once, in order, as the tick
+loop does):
+  wall       µs until the last room's broadcast returns
+  loopCpu    µs of CPU the event loop thread spent (time.thread_time); work a
+             pool worker does is not counted here
+Pool modes encode with orjson when it is installed; `json` forces the stdlib
+encoder inline.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import Any
+
+from benchmarks.common import FORMAT_VERSION, Samples, build_room, drive_humans, environment, write_json
+from benchmarks.room import _make_hub
+
+MODES = ("json", "orjson", "thread", "process")
+
+
+def _stdlib_encode(obj: Any) -> str:
+    return json.dumps(obj, separators=(",", ":"))
+
+
+def _run_mode(mode: str, args: argparse.Namespace) -> dict[str, Any]:
+    from server.game import protocol
+
+    dt = 1.0 / 60.0
+    rooms = [build_room(args.map, args.humans, args.bots, seed=args.seed + i, room_id=f"r{i:02d}") for i in range(args.rooms)]
+    cfg = rooms[0].config
+    cfg.snapshot_workers = args.workers if mode in ("thread", "process") else 0
+    cfg.snapshot_pool_mode = mode if mode in ("thread", "process") else "thread"
+    svc, hub, sockets = _make_hub(rooms[0])
+    for room in rooms[1:]:
+        room.config = cfg
+        _, _, more = _make_hub(room, hub=hub)
+        sockets.extend(more)
+
+    wall = Samples()
+    cpu = Samples()
+    original = protocol.encode
+    if mode == "json":
+        protocol.encode = _stdlib_encode
+    loop = asyncio.new_event_loop()
+    try:
+        tick = 0
+        for i in range(args.warmup + args.snapshots):
+            for _ in range(4):  # 60 Hz sim, 15 Hz snapshots
+                tick += 1
+                for room in rooms:
+                    drive_humans(room, tick, fire_every=args.fire_every)
+                    room.step(tick, dt)
+            svc.tick = tick
+
+            async def broadcast_all():
+                for room in rooms:
+                    await room.broadcast_snapshots(hub)
+
+            w0 = time.perf_counter_ns()
+            c0 = time.thread_time_ns()
+            loop.run_until_complete(broadcast_all())
+            if i >= args.warmup:
+                cpu.add(time.thread_time_ns() - c0)
+                wall.add(time.perf_counter_ns() - w0)
+    finally:
+        protocol.encode = original
+        hub.shutdown_encoder()
+        loop.close()
+
+    frames = sum(s.frames for s in sockets)
+    return {
+        "wall": wall.summary(),
+        "loopCpu": cpu.summary(),
+        "frames": frames,
+        "bytesMean": (sum(s.bytes for s in sockets) / frames) if frames else 0.0,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--map", default="map01")
+    ap.add_argument("--rooms", type=int, default=20)
+    ap.add_argument("--humans", type=int, default=16)
+    ap.add_argument("--bots", type=int, default=0)
+    ap.add_argument("--snapshots", type=int, default=150)
+    ap.add_argument("--warmup", type=int, default=15)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--fire-every", type=int, default=20, help="each human fires every N ticks (0 = never)")
+    ap.add_argument("--modes", default=",".join(MODES))
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--save", default=None, help="write JSON here (default: stdout)")
+    args = ap.parse_args()
+
+    modes = [m for m in args.modes.split(",") if m]
+    for m in modes:
+        if m not in MODES:
+            ap.error(f"unknown mode: {m}")
+    results = {m: _run_mode(m, args) for m in modes}
+    write_json(
+        args.save,
+        {
+            "tool": "benchmarks.snapshots",
+            "format": FORMAT_VERSION,
+            "timestamp": time.time(),
+            "environment": environment(),
+            "scenario": {
+                "map": args.map,
+                "rooms": args.rooms,
+                "humans": args.humans,
+                "bots": args.bots,
+                "snapshots": args.snapshots,
+                "warmup": args.warmup,
+                "workers": args.workers,
+                "fireEvery": args.fire_every,
+                "seed": args.seed,
+            },
+            "results": results,
+        },
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
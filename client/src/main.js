@@ -285,15 +285,19 @@ function setCameraFromState(state, look, dt) {
 function sendInputs(state, look, dt) {
   state.clock.tick(performance.now());
   state.sendAcc += dt;
+  const inputs = [];
   while (state.sendAcc >= SEND_DT) {
     state.sendAcc -= SEND_DT;
-    const msg = {
+    inputs.push({
       seq: state.seq++,
       dt: SEND_DT,
       ...look,
-    };
-    state.transport.send("input", msg);
+    });
   }
+  if (!inputs.length) return;
+  // One frame per render frame; the server also accepts resends of recent inputs
+  // in the same bundle (not needed over a reliable WebSocket).
+  state.transport.send("input", inputs.length === 1 ? inputs[0] : { inputs });
 }
 
 let last = performance.now();
@@ -1,41 +1,163 @@
-"""Server-side bot behavior (utility-lite)."""
+"""Server-side bot behavior (utility-lite).
+
+Thinking (target selection, nav query, LOS ray) is time-sliced: each bot
+re-decides every `room.rates.bot_every` ticks at its own phase, so a room's
+bots spread their thinks over the interval instead of all landing on one
+tick. Due thinks beyond the room's per-tick AI budget slip to the next tick
+(most overdue first). Between thinks a bot steers toward its last waypoint.
+
+Inline planning keeps each bot's smoothed path in its state and reuses it
+while it still fits: the bot can see its next waypoint and the goal is still
+visible from the last leg. It replans only when that breaks.
+"""
 
 from __future__ import annotations
 
 import math
-import random
+import time
 
-from server.game.systems.collision import first_obstacle_hit
+from server.game.rng import CounterRng, mix_key, stable_id
 
 
 def step_bots(room, dt: float) -> None:
-    # Very simple: move toward nearest non-self, shoot if line-of-sight.
-    for bot_id in list(room.bots):
+    every = room.rates.bot_every
+    tick = room.server_tick
+    if room.paths is not None:
+        room.paths.collect()
+    due: list[tuple[int, str]] = []
+    for bot_id in room.bots:
         bot = room.players.get(bot_id)
         if not bot:
             continue
         if not bot.alive:
             if bot.respawnAt and room.t >= bot.respawnAt:
                 room.respawn_player(bot_id)
+                st = room.bot_state.get(bot_id)
+                if st is not None:
+                    # Old decision is meaningless from the spawn point: think now.
+                    st["waypoint"] = None
+                    st["path"] = None
+                    st["nextThink"] = tick
+            continue
+        st = room.bot_state.get(bot_id)
+        if st is None:
+            st = room.bot_state[bot_id] = {
+                "last": [bot.pos[0], bot.pos[2]],
+                "stuck": 0.0,
+                "wander": None,
+                "wanderUntil": 0.0,
+                "waypoint": None,
+                "path": None,
+                "pathGoal": None,
+                "pathIndex": 0,
+                "lastThink": tick,
+                # Stagger: consecutive bots get consecutive phases.
+                "nextThink": tick + (room.bot_seq % every),
+            }
+            room.bot_seq += 1
+        if tick >= st["nextThink"]:
+            due.append((st["nextThink"], bot_id))
+        else:
+            _steer(bot, st)
+
+    if not due:
+        return
+    due.sort()
+    budget = room.config.bot_ai_budget_us * 1e-6
+    t0 = time.perf_counter()
+    for i, (_, bot_id) in enumerate(due):
+        bot = room.players[bot_id]
+        st = room.bot_state[bot_id]
+        # Always make progress on at least one bot.
+        if i > 0 and budget > 0.0 and (time.perf_counter() - t0) >= budget:
+            room.bot_thinks_deferred += 1
+            _steer(bot, st)
             continue
+        _think(room, bot_id, bot, st, dt, max(1, tick - st["lastThink"]))
+        st["lastThink"] = tick
+        nxt = st["nextThink"] + every
+        st["nextThink"] = nxt if nxt > tick else tick + every
+
 
-        # Track stuckness.
-        st = room.bot_state.setdefault(bot_id, {"last": [bot.pos[0], bot.pos[2]], "stuck": 0.0, "wander": None, "wanderUntil": 0.0})
-        moved = math.hypot(bot.pos[0] - st["last"][0], bot.pos[2] - st["last"][1])
-        st["last"] = [bot.pos[0], bot.pos[2]]
-        if moved < 0.02:
-            st["stuck"] += dt
+def _steer(bot, st) -> None:
+    # Reuse the last decision: keep heading for the chosen waypoint.
+    wp = st["waypoint"]
+    if wp is None:
+        return
+    dx = wp[0] - bot.pos[0]
+    dz = wp[1] - bot.pos[2]
+    if dx * dx + dz * dz > 0.04:
+        bot.lastCmd["yaw"] = math.atan2(-dx, -dz)
+
+
+def _route(room, st, bot, goal_pos: list[float]) -> tuple[float, float]:
+    # Next waypoint toward goal_pos on the cached smoothed path; replan when it no longer fits.
+    nav = room.nav
+    here = nav.walkable_cell(bot.pos)
+    goal = nav.walkable_cell(goal_pos)
+    path = st["path"]
+    if path is not None and (here is None or goal is None or st["stuck"] > 0.5):
+        path = None
+    if path is not None and goal != st["pathGoal"]:
+        # The goal moved: keep the route if its last leg can be aimed straight at the new goal.
+        last = len(path) - 1
+        anchor = here if st["pathIndex"] >= last else nav.cell_of_xz(path[last - 1])
+        if nav.cells_visible(anchor, goal):
+            path[last] = (goal_pos[0], goal_pos[2])
+            st["pathGoal"] = goal
         else:
-            st["stuck"] = 0.0
+            path = None
+    if path is not None:
+        index = nav.advance(path, st["pathIndex"], bot.pos)
+        # Knocked off the route: the waypoint went out of sight.
+        if not nav.cells_visible(here, nav.cell_of_xz(path[index])):
+            path = None
+    if path is None:
+        path = nav.plan(bot.pos, goal_pos, smooth=True)
+        if len(path) < 2:
+            st["path"] = None
+            return goal_pos[0], goal_pos[2]
+        index = nav.advance(path, 1, bot.pos)
+        st["path"] = path
+        st["pathGoal"] = goal
+    st["pathIndex"] = index
+    if index >= len(path) - 1:
+        return goal_pos[0], goal_pos[2]
+    return path[index]
+
+
+def _think(room, bot_id: str, bot, st, dt: float, ticks: int) -> None:
+    # Move toward nearest non-self, shoot if line-of-sight.
+    # `ticks` simulation ticks have passed since this bot last thought.
+    think_dt = dt * ticks
+
+    # Track stuckness.
+    moved = math.hypot(bot.pos[0] - st["last"][0], bot.pos[2] - st["last"][1])
+    st["last"] = [bot.pos[0], bot.pos[2]]
+    if moved < 0.02 * ticks:
+        st["stuck"] += think_dt
+    else:
+        st["stuck"] = 0.0
 
-        # Prefer targeting humans; if none, target bots.
-        target = None
-        best2 = None
+    # Prefer targeting humans; if none, target bots.
+    target = None
+    best2 = None
+    for pid, p in room.players.items():
+        if pid == bot_id or not p.alive:
+            continue
+        if pid.startswith("bot_"):
+            continue
+        d0 = p.pos[0] - bot.pos[0]
+        d2 = p.pos[2] - bot.pos[2]
+        dist2 = d0 * d0 + d2 * d2
+        if best2 is None or dist2 < best2:
+            best2 = dist2
+            target = p
+
+    if not target:
         for pid, p in room.players.items():
             if pid == bot_id or not p.alive:
                 continue
-            if pid.startswith("bot_"):
-                continue
             d0 = p.pos[0] - bot.pos[0]
             d2 = p.pos[2] - bot.pos[2]
             dist2 = d0 * d0 + d2 * d2
@@ -43,68 +165,70 @@ def step_bots(room, dt: float) -> None:
                 best2 = dist2
                 target = p
 
-        if not target:
-            for pid, p in room.players.items():
-                if pid == bot_id or not p.alive:
-                    continue
-                d0 = p.pos[0] - bot.pos[0]
-                d2 = p.pos[2] - bot.pos[2]
-                dist2 = d0 * d0 + d2 * d2
-                if best2 is None or dist2 < best2:
-                    best2 = dist2
-                    target = p
-
-        if not target:
-            bot.lastCmd["moveX"] = 0.0
-            bot.lastCmd["moveY"] = 0.0
-            bot.lastCmd["fire"] = False
-            continue
+    if not target:
+        bot.lastCmd["moveX"] = 0.0
+        bot.lastCmd["moveY"] = 0.0
+        bot.lastCmd["fire"] = False
+        st["waypoint"] = None
+        return
 
-        # Wander/unstuck: if stuck for >1s, pick a random nearby reachable point.
-        if st["stuck"] > 1.0 and room.t >= float(st.get("wanderUntil", 0.0)):
-            rng = random.Random((room.seed ^ (hash(bot_id) & 0xFFFFFFFF) ^ int(room.t * 10)) & 0xFFFFFFFF)
-            for _ in range(8):
-                ang = rng.random() * math.tau
-                rad = 4.0 + rng.random() * 8.0
-                tx = bot.pos[0] + math.cos(ang) * rad
-                tz = bot.pos[2] + math.sin(ang) * rad
-                # Ensure the nav grid has a path-ish direction.
-                dx0, dz0 = room.nav.next_direction(bot.pos, [tx, bot.pos[1], tz])
-                if (dx0 * dx0 + dz0 * dz0) > 0.01:
-                    st["wander"] = [tx, tz]
-                    st["wanderUntil"] = room.t + 1.6
-                    st["stuck"] = 0.0
-                    break
-
-        goal_pos = target.pos
-        if st.get("wander") is not None and room.t < float(st.get("wanderUntil", 0.0)):
-            goal_pos = [float(st["wander"][0]), bot.pos[1], float(st["wander"][1])]
-        else:
-            st["wander"] = None
+    # Wander/unstuck: if stuck for >1s, pick a random nearby point in a straight walkable line.
+    if st["stuck"] > 1.0 and room.t >= float(st.get("wanderUntil", 0.0)):
+        rng = CounterRng(mix_key(room.seed, stable_id(bot_id), int(room.t * 10)))
+        for _ in range(8):
+            ang = rng.random() * math.tau
+            rad = 4.0 + rng.random() * 8.0
+            tx = bot.pos[0] + math.cos(ang) * rad
+            tz = bot.pos[2] + math.sin(ang) * rad
+            if room.nav.can_walk(bot.pos, [tx, bot.pos[1], tz]):
+                st["wander"] = [tx, tz]
+                st["wanderUntil"] = room.t + 1.6
+                st["stuck"] = 0.0
+                break
 
-        dx, dz = room.nav.next_direction(bot.pos, goal_pos)
-        # Convention: yaw=0 faces -Z; positive yaw rotates LEFT.
-        yaw = math.atan2(-dx, -dz)
-        bot.lastCmd["yaw"] = yaw
-        bot.lastCmd["pitch"] = 0.0
-        bot.lastCmd["sprint"] = True
-        bot.lastCmd["jump"] = False
+    goal_pos = target.pos
+    if st.get("wander") is not None and room.t < float(st.get("wanderUntil", 0.0)):
+        goal_pos = [float(st["wander"][0]), bot.pos[1], float(st["wander"][1])]
+    else:
+        st["wander"] = None
 
-        # Use forward movement only.
-        bot.lastCmd["moveX"] = 0.0
-        bot.lastCmd["moveY"] = 1.0
-
-        # Fire if in range and line-of-sight (skip while wandering).
-        spec = room.config.weapon(bot.weaponId)
-        dist = 0.0 if best2 is None else (best2 ** 0.5)
-        fire = False
-        if st.get("wander") is None and dist <= min(28.0, spec.range):
-            origin = [bot.pos[0], bot.pos[1] + room.config.eye_height, bot.pos[2]]
-            direction = [dx, 0.0, dz]
-            # If any wall is closer than target, don't shoot.
-            t_wall = first_obstacle_hit(origin, direction, room.map.colliders, spec.range)
-            if t_wall is None or t_wall >= dist:
-                fire = True
-
-        bot.lastCmd["fire"] = fire
-        bot.lastCmd["weaponId"] = "pistol"
+    if room.paths is not None:
+        wp = room.paths.waypoint(bot_id, bot.pos, goal_pos)
+    else:
+        wp = _route(room, st, bot, goal_pos)
+    st["waypoint"] = wp
+    dx = wp[0] - bot.pos[0]
+    dz = wp[1] - bot.pos[2]
+    l = (dx * dx + dz * dz) ** 0.5
+    if l > 1e-6:
+        dx /= l
+        dz /= l
+    else:
+        dx = dz = 0.0
+    # Convention: yaw=0 faces -Z; positive yaw rotates LEFT.
+    yaw = math.atan2(-dx, -dz)
+    bot.lastCmd["yaw"] = yaw
+    bot.lastCmd["pitch"] = 0.0
+    bot.lastCmd["sprint"] = True
+    bot.lastCmd["jump"] = False
+
+    # Use forward movement only.
+    bot.lastCmd["moveX"] = 0.0
+    bot.lastCmd["moveY"] = 1.0
+
+    # Fire if in range and line-of-sight (skip while wandering).
+    spec = room.config.weapon_table.get(bot.weaponId).spec
+    dist = 0.0 if best2 is None else (best2 ** 0.5)
+    fire = False
+    if st.get("wander") is None and dist <= min(28.0, spec.range):
+        origin = [bot.pos[0], bot.pos[1] + room.config.eye_height, bot.pos[2]]
+        direction = [dx, 0.0, dz]
+        # If any wall is closer than target, don't shoot (grid ray; the shot itself is exact).
+        t_wall = room.nav.raycast(origin, direction, spec.range)
+        if t_wall is None or t_wall >= dist:
+            fire = True
+
+    bot.lastCmd["fire"] = fire
+    bot.lastCmd["weaponId"] = "pistol"
+    if fire:
+        room.weapons_active.add(bot_id)
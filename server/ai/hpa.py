@@ -0,0 +1,271 @@
+"""Hierarchical pathfinding (HPA*) over a GridNav grid.
+
+The grid is cut into square clusters. Where two neighbouring clusters share a
+run of walkable border cells we place entrances (one in the middle of short
+runs, one at each end of long ones); each entrance is a pair of abstract nodes,
+one per side, joined by a unit-cost edge. Paths between the entrances of one
+cluster are found by a search confined to that cluster, computed the first time
+a query touches the cluster and cached (fully open clusters are solved
+analytically). A query connects start and goal to the entrances of their
+clusters, runs A* on the small abstract graph, and splices the cached cell
+paths together, so a path across the map costs about as much as a short one.
+
+One `Hierarchy` is built per (map, cell size, pad, cluster size) and shared by
+every room on that map (see `hierarchy_for`).
+"""
+
+from __future__ import annotations
+
+import heapq
+import threading
+
+from server.ai.nav import DIAG, octile
+
+# Entrance runs at least this long get two transitions (one at each end).
+LONG_ENTRANCE = 6
+
+Cell = tuple[int, int]
+
+
+def _line(a: Cell, b: Cell) -> list[Cell]:
+    # Octile-optimal cell path in open space: diagonal steps first, then straight.
+    x, z = a
+    out = [a]
+    while (x, z) != b:
+        x += (b[0] > x) - (b[0] < x)
+        z += (b[1] > z) - (b[1] < z)
+        out.append((x, z))
+    return out
+
+
+class Hierarchy:
+    def __init__(self, nav, cluster_size: int = 16):
+        self.nav = nav
+        self.size = max(4, int(cluster_size))
+        self.cw = (nav.w + self.size - 1) // self.size
+        self.ch = (nav.h + self.size - 1) // self.size
+
+        self.node_cell: list[Cell] = []
+        self.node_of: dict[Cell, int] = {}
+        # node id -> {neighbour id: cost}
+        self.edges: list[dict[int, float]] = []
+        # (a, b) -> cell path a..b inside one cluster (cached, both directions)
+        self._paths: dict[tuple[int, int], list[Cell]] = {}
+        self._cluster_nodes: dict[int, list[int]] = {}
+        self._ready: set[int] = set()
+        # Rooms (and thread-pool planners) on one map share the hierarchy.
+        self._lock = threading.Lock()
+        self._open: list[bool] = []
+
+        self._build()
+
+    # -- construction ----------------------------------------------------
+
+    def cluster_of(self, c: Cell) -> int:
+        return (c[1] // self.size) * self.cw + (c[0] // self.size)
+
+    def _rect(self, cluster: int) -> tuple[int, int, int, int]:
+        cx = cluster % self.cw
+        cz = cluster // self.cw
+        x0 = cx * self.size
+        z0 = cz * self.size
+        return x0, z0, min(self.nav.w, x0 + self.size) - 1, min(self.nav.h, z0 + self.size) - 1
+
+    def _node(self, c: Cell) -> int:
+        n = self.node_of.get(c)
+        if n is None:
+            n = len(self.node_cell)
+            self.node_of[c] = n
+            self.node_cell.append(c)
+            self.edges.append({})
+            self._cluster_nodes.setdefault(self.cluster_of(c), []).append(n)
+        return n
+
+    def _transition(self, a: Cell, b: Cell) -> None:
+        na = self._node(a)
+        nb = self._node(b)
+        cost = 1.0 if (a[0] == b[0] or a[1] == b[1]) else DIAG
+        self.edges[na][nb] = cost
+        self.edges[nb][na] = cost
+
+    def _entrances(self, pairs: list[tuple[Cell, Cell]]) -> None:
+        # `pairs` walks one cluster border; split it into runs where both sides are open.
+        blocked = self.nav.blocked
+        run: list[tuple[Cell, Cell]] = []
+        for i in range(len(pairs) + 1):
+            if i < len(pairs):
+                a, b = pairs[i]
+                if not blocked[a[0]][a[1]] and not blocked[b[0]][b[1]]:
+                    run.append((a, b))
+                    continue
+            if run:
+                if len(run) >= LONG_ENTRANCE:
+                    self._transition(*run[0])
+                    self._transition(*run[-1])
+                else:
+                    self._transition(*run[len(run) // 2])
+                run = []
+
+    def _build(self) -> None:
+        blocked = self.nav.blocked
+        s = self.size
+        for cz in range(self.ch):
+            for cx in range(self.cw):
+                x0, z0, x1, z1 = self._rect(cz * self.cw + cx)
+                self._open.append(not any(blocked[x][z] for x in range(x0, x1 + 1) for z in range(z0, z1 + 1)))
+                # Border with the cluster to the east.
+                if cx + 1 < self.cw:
+                    x = x0 + s - 1
+                    self._entrances([((x, z), (x + 1, z)) for z in range(z0, z1 + 1)])
+                # Border with the cluster to the north.
+                if cz + 1 < self.ch:
+                    z = z0 + s - 1
+                    self._entrances([((x, z), (x, z + 1)) for x in range(x0, x1 + 1)])
+
+    # -- intra-cluster search ---------------------------------------------
+
+    def _search(self, cluster: int, src: Cell, targets: set[Cell]) -> dict[Cell, tuple[float, list[Cell]]]:
+        """Shortest paths from `src` to each reachable target, staying inside `cluster`."""
+        if self._open[cluster]:
+            return {t: (octile(src, t), _line(src, t)) for t in targets}
+
+        x0, z0, x1, z1 = self._rect(cluster)
+        blocked = self.nav.blocked
+        g = {src: 0.0}
+        came: dict[Cell, Cell] = {}
+        openq = [(0.0, src)]
+        done: set[Cell] = set()
+        left = set(targets)
+        out: dict[Cell, tuple[float, list[Cell]]] = {}
+        while openq and left:
+            d, cur = heapq.heappop(openq)
+            if cur in done:
+                continue
+            done.add(cur)
+            if cur in left:
+                left.discard(cur)
+                path = [cur]
+                while path[-1] != src:
+                    path.append(came[path[-1]])
+                path.reverse()
+                out[cur] = (d, path)
+            x, z = cur
+            for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)):
+                nx, nz = x + dx, z + dz
+                if nx < x0 or nx > x1 or nz < z0 or nz > z1 or blocked[nx][nz]:
+                    continue
+                nd = d + (DIAG if dx and dz else 1.0)
+                nb = (nx, nz)
+                if nd < g.get(nb, 1e30):
+                    g[nb] = nd
+                    came[nb] = cur
+                    heapq.heappush(openq, (nd, nb))
+        return out
+
+    def _ensure(self, cluster: int) -> None:
+        # Intra-cluster edges between entrances, computed on first use.
+        if cluster in self._ready:
+            return
+        with self._lock:
+            if cluster in self._ready:
+                return
+            nodes = self._cluster_nodes.get(cluster, [])
+            for i, a in enumerate(nodes):
+                rest = nodes[i + 1 :]
+                if not rest:
+                    break
+                found = self._search(cluster, self.node_cell[a], {self.node_cell[b] for b in rest})
+                for b in rest:
+                    hit = found.get(self.node_cell[b])
+                    if hit is None:
+                        continue
+                    cost, path = hit
+                    self._paths[(a, b)] = path
+                    self._paths[(b, a)] = path[::-1]
+                    self.edges[a][b] = cost
+                    self.edges[b][a] = cost
+            self._ready.add(cluster)
+
+    # -- queries ----------------------------------------------------------
+
+    def plan(self, start: Cell, goal: Cell) -> list[Cell]:
+        """Cell path start..goal (both walkable), or [] if unreachable."""
+        if start == goal:
+            return [start]
+        sc = self.cluster_of(start)
+        gc = self.cluster_of(goal)
+        if sc == gc:
+            hit = self._search(sc, start, {goal}).get(goal)
+            if hit is not None:
+                return hit[1]
+
+        # Temporary abstract nodes for start and goal.
+        s_links = self._search(sc, start, {self.node_cell[n] for n in self._cluster_nodes.get(sc, [])})
+        g_links = self._search(gc, goal, {self.node_cell[n] for n in self._cluster_nodes.get(gc, [])})
+        start_edges = {self.node_of[c]: cost for c, (cost, _) in s_links.items()}
+        goal_edges = {self.node_of[c]: cost for c, (cost, _) in g_links.items()}
+        if not start_edges or not goal_edges:
+            return []
+
+        S, G = -1, -2
+        g_cost: dict[int, float] = {S: 0.0}
+        came: dict[int, int] = {}
+        openq: list[tuple[float, int]] = [(octile(start, goal), S)]
+        closed: set[int] = set()
+        found = False
+        while openq:
+            _, cur = heapq.heappop(openq)
+            if cur == G:
+                found = True
+                break
+            if cur in closed:
+                continue
+            closed.add(cur)
+            if cur == S:
+                nbrs = start_edges.items()
+            else:
+                self._ensure(self.cluster_of(self.node_cell[cur]))
+                nbrs = list(self.edges[cur].items())
+                if cur in goal_edges:
+                    nbrs.append((G, goal_edges[cur]))
+            base = g_cost[cur]
+            for nb, cost in nbrs:
+                ng = base + cost
+                if ng < g_cost.get(nb, 1e30):
+                    g_cost[nb] = ng
+                    came[nb] = cur
+                    h = 0.0 if nb == G else octile(self.node_cell[nb], goal)
+                    heapq.heappush(openq, (ng + h, nb))
+        if not found:
+            return []
+
+        chain = [G]
+        while chain[-1] != S:
+            chain.append(came[chain[-1]])
+        chain.reverse()
+
+        # Refine: splice cell paths for each abstract hop.
+        first = chain[1]
+        path = list(s_links[self.node_cell[first]][1])
+        for a, b in zip(chain[1:-2], chain[2:-1]):
+            seg = self._paths.get((a, b))
+            if seg is None:
+                # Inter-cluster transition: adjacent cells.
+                path.append(self.node_cell[b])
+            else:
+                path.extend(seg[1:])
+        last = chain[-2]
+        path.extend(reversed(g_links[self.node_cell[last]][1][:-1]))
+        return path
+
+
+_HIERARCHIES: dict[tuple[str, float, float, int], Hierarchy] = {}
+
+
+def hierarchy_for(nav, cluster_size: int) -> Hierarchy:
+    """Shared per-map hierarchy (maps are static once loaded)."""
+    key = (nav.map.mapId, nav.cell, nav.pad, int(cluster_size))
+    h = _HIERARCHIES.get(key)
+    if h is None:
+        h = _HIERARCHIES[key] = Hierarchy(nav, cluster_size)
+    return h
@@ -1,17 +1,49 @@
-"""A* over a simple 2D grid (phase1 navigation)."""
+"""A* over a simple 2D grid (phase1 navigation).
+
+Cells are flat integer indices into a grid padded with a blocked border, so
+neighbour steps are plain offsets with no bounds checks. Search state lives in
+preallocated arrays stamped with a per-search generation instead of being
+cleared. The heuristic is octile distance (admissible for 8-way moves with
+1.4 diagonals). `jps=True` swaps neighbour expansion for Jump Point Search,
+which returns paths of the same cost.
+
+`plan(..., smooth=True)` string-pulls the cell path: it keeps only the
+waypoints a straight grid line can't skip, so bots walk straight legs instead
+of zig-zagging from cell center to cell center.
+
+`raycast` walks a ray through the grid cell by cell (DDA) for cheap 2D
+visibility (`line_of_sight`, on a sight grid of unpadded collider footprints)
+and straight-line reachability (`can_walk`, on the padded walk grid). It is
+for bot decisions only; hitscan damage keeps the exact AABB tests.
+
+With `cluster_size > 0`, plans go through a shared per-map HPA* hierarchy
+(server/ai/hpa.py) instead of a capped flat search, and `jps` is unused. The
+server defaults to the flat JPS search (optimal, and faster on map01); HPA*
+is for maps too large for a flat search within the expansion cap.
+"""
 
 from __future__ import annotations
 
 import heapq
 import math
+import threading
 from typing import Any
 
+DIAG = 1.4
+
+
+def octile(a: tuple[int, int], b: tuple[int, int]) -> float:
+    dx = abs(a[0] - b[0])
+    dz = abs(a[1] - b[1])
+    return (dx + dz) + (DIAG - 2.0) * min(dx, dz)
+
 
 class GridNav:
-    def __init__(self, map_data, cell_size: float, pad: float):
+    def __init__(self, map_data, cell_size: float, pad: float, cluster_size: int = 0, jps: bool = False):
         self.map = map_data
         self.cell = float(cell_size)
         self.pad = float(pad)
+        self.jps = bool(jps)
 
         self.minx = map_data.bounds.min[0]
         self.minz = map_data.bounds.min[2]
@@ -20,8 +52,61 @@ class GridNav:
 
         self.w = max(1, int(math.ceil((self.maxx - self.minx) / self.cell)))
         self.h = max(1, int(math.ceil((self.maxz - self.minz) / self.cell)))
-        self.blocked = [[False for _ in range(self.h)] for _ in range(self.w)]
-        self._build()
+        # Flat search grid: index = (ix + 1) * stride + (iz + 1), one blocked cell of border all round.
+        self.stride = self.h + 2
+        n = (self.w + 2) * self.stride
+
+        pre = map_data.nav
+        if pre is not None and (pre.cell, pre.pad, pre.w, pre.h) == (self.cell, self.pad, self.w, self.h):
+            # Compiled map bundle: use its grids (read-only mapped pages) as they are.
+            self.free = pre.free
+            self.clear = pre.clear
+            S = self.stride
+            self.blocked = [[not f for f in self.free[(ix + 1) * S + 1 : (ix + 1) * S + 1 + self.h]] for ix in range(self.w)]
+        else:
+            self.blocked = [[False for _ in range(self.h)] for _ in range(self.w)]
+            self._build()
+            self.free = bytearray(n)
+            for ix in range(self.w):
+                col = self.blocked[ix]
+                base = (ix + 1) * self.stride + 1
+                for iz in range(self.h):
+                    if not col[iz]:
+                        self.free[base + iz] = 1
+            # Sight grid: cells touched by any collider footprint are opaque, whatever its height
+            # (low cover hides targets too; conservative for bot decisions).
+            self.clear = bytearray(b"\x01") * n
+            for a in self.map.colliders:
+                x0 = max(0, int(math.floor((a.min[0] - self.minx) / self.cell)))
+                x1 = min(self.w - 1, int(math.ceil((a.max[0] - self.minx) / self.cell)) - 1)
+                z0 = max(0, int(math.floor((a.min[2] - self.minz) / self.cell)))
+                z1 = min(self.h - 1, int(math.ceil((a.max[2] - self.minz) / self.cell)) - 1)
+                for ix in range(x0, x1 + 1):
+                    base = (ix + 1) * self.stride + 1
+                    for iz in range(z0, z1 + 1):
+                        self.clear[base + iz] = 0
+        S = self.stride
+        self._steps = (
+            (S, 1.0), (-S, 1.0), (1, 1.0), (-1, 1.0),
+            (S + 1, DIAG), (-S + 1, DIAG), (S - 1, DIAG), (-S - 1, DIAG),
+        )  # fmt: skip
+        self._g = [0.0] * n
+        self._came = [-1] * n
+        self._seen = [0] * n
+        self._closed = [0] * n
+        self._gen = 0
+        # The scratch arrays are per grid; thread-pool planners share room grids.
+        self._lock = threading.Lock()
+        # Cells popped by the last flat search (benchmarks/nav.py).
+        self.last_expanded = 0
+        # Straight jump distances per direction, built on first JPS search.
+        self._jumps: dict[int, list[int]] | None = None
+
+        self.hpa = None
+        if cluster_size > 0:
+            from server.ai.hpa import hierarchy_for
+
+            self.hpa = hierarchy_for(self, cluster_size)
 
     def _cell_center(self, ix: int, iz: int) -> tuple[float, float]:
         x = self.minx + (ix + 0.5) * self.cell
@@ -60,17 +145,16 @@ class GridNav:
                         return (x, z)
         return None
 
-    def _heur(self, a: tuple[int, int], b: tuple[int, int]) -> float:
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+    def _index(self, c: tuple[int, int]) -> int:
+        return (c[0] + 1) * self.stride + c[1] + 1
 
-    def _neighbors(self, n: tuple[int, int]):
-        x, z = n
-        for dx, dz in ((1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)):
-            nx, nz = x + dx, z + dz
-            if 0 <= nx < self.w and 0 <= nz < self.h and not self.blocked[nx][nz]:
-                yield (nx, nz)
+    def _unindex(self, i: int) -> tuple[int, int]:
+        x, z = divmod(i, self.stride)
+        return x - 1, z - 1
 
-    def plan(self, start_pos: list[float], goal_pos: list[float], max_nodes: int = 1200) -> list[tuple[float, float]]:
+    def plan(
+        self, start_pos: list[float], goal_pos: list[float], max_nodes: int = 1200, smooth: bool = False
+    ) -> list[tuple[float, float]]:
         start0 = self._to_cell(start_pos)
         goal0 = self._to_cell(goal_pos)
         start = self._nearest_unblocked(start0)
@@ -80,47 +164,356 @@ class GridNav:
         if start == goal:
             x, z = self._cell_center(start[0], start[1])
             return [(x, z)]
+        if self.hpa is not None:
+            cells = self.hpa.plan(start, goal)
+        else:
+            cells = self.plan_cells(start, goal, max_nodes)
+        if smooth:
+            cells = self.smooth_cells(cells)
+        return [self._cell_center(ix, iz) for (ix, iz) in cells]
+
+    def cell_of_xz(self, xz: tuple[float, float]) -> tuple[int, int]:
+        return self._to_cell([xz[0], 0.0, xz[1]])
+
+    def walkable_cell(self, pos: list[float]) -> tuple[int, int] | None:
+        """Nearest unblocked cell to a world position (None if there is none nearby)."""
+        return self._nearest_unblocked(self._to_cell(pos))
+
+    def cells_visible(self, a: tuple[int, int], b: tuple[int, int]) -> bool:
+        """True if the straight line between two cell centers crosses only unblocked cells.
+
+        Conservative at corners: a line through a grid vertex needs both side cells free.
+        """
+        free = self.free
+        ia = self._index(a)
+        if not free[ia]:
+            return False
+        nx = b[0] - a[0]
+        nz = b[1] - a[1]
+        sx = self.stride if nx > 0 else -self.stride
+        sz = 1 if nz > 0 else -1
+        nx = abs(nx)
+        nz = abs(nz)
+        i = ia
+        ix = iz = 0
+        while ix < nx or iz < nz:
+            d = (1 + 2 * ix) * nz - (1 + 2 * iz) * nx
+            if d == 0:
+                if not free[i + sx] or not free[i + sz]:
+                    return False
+                i += sx + sz
+                ix += 1
+                iz += 1
+            elif d < 0:
+                i += sx
+                ix += 1
+            else:
+                i += sz
+                iz += 1
+            if not free[i]:
+                return False
+        return True
 
-        openq: list[tuple[float, tuple[int, int]]] = []
-        heapq.heappush(openq, (0.0, start))
-        came: dict[tuple[int, int], tuple[int, int]] = {}
-        g = {start: 0.0}
+    def smooth_cells(self, cells: list[tuple[int, int]]) -> list[tuple[int, int]]:
+        """String-pull a cell path: from each kept waypoint, jump to the farthest one still in sight."""
+        n = len(cells)
+        if n <= 2:
+            return list(cells)
+        out = [cells[0]]
+        i = 0
+        while i < n - 1:
+            # Gallop forward while visible, then binary search the last visible index.
+            # Visibility along a path is not strictly monotone; this finds a good waypoint, not the farthest.
+            ok = i + 1
+            step = 2
+            bad = n
+            while True:
+                k = i + step
+                if k >= n:
+                    k = n - 1
+                if k <= ok:
+                    break
+                if self.cells_visible(cells[i], cells[k]):
+                    ok = k
+                    if k == n - 1:
+                        break
+                    step *= 2
+                else:
+                    bad = k
+                    break
+            while bad - ok > 1:
+                mid = (ok + bad) // 2
+                if self.cells_visible(cells[i], cells[mid]):
+                    ok = mid
+                else:
+                    bad = mid
+            out.append(cells[ok])
+            i = ok
+        return out
+
+    def raycast(self, origin: list[float], direction: list[float], max_dist: float, walk: bool = False) -> float | None:
+        """Ray parameter `t` (origin + t * direction, XZ only) of the first opaque cell, or None.
 
-        visited = 0
-        while openq and visited < max_nodes:
-            visited += 1
-            _, cur = heapq.heappop(openq)
-            if cur == goal:
+        Uses the sight grid, or the walk grid if `walk`. A ray starting in a
+        blocked cell hits at 0. Leaving the map is a hit only when walking.
+        """
+        grid = self.free if walk else self.clear
+        cell = self.cell
+        ox = (origin[0] - self.minx) / cell
+        oz = (origin[2] - self.minz) / cell
+        ix = int(math.floor(ox))
+        iz = int(math.floor(oz))
+        w = self.w
+        h = self.h
+        if ix < 0 or ix >= w or iz < 0 or iz >= h:
+            return 0.0 if walk else None
+        S = self.stride
+        i = (ix + 1) * S + iz + 1
+        if not grid[i]:
+            return 0.0
+        dx = direction[0] / cell
+        dz = direction[2] / cell
+        inf = math.inf
+        if dx > 0.0:
+            sx, tx, dtx = 1, (ix + 1 - ox) / dx, 1.0 / dx
+        elif dx < 0.0:
+            sx, tx, dtx = -1, (ix - ox) / dx, -1.0 / dx
+        else:
+            sx, tx, dtx = 0, inf, inf
+        if dz > 0.0:
+            sz, tz, dtz = 1, (iz + 1 - oz) / dz, 1.0 / dz
+        elif dz < 0.0:
+            sz, tz, dtz = -1, (iz - oz) / dz, -1.0 / dz
+        else:
+            sz, tz, dtz = 0, inf, inf
+        step_x = sx * S
+        while True:
+            if tx < tz:
+                t = tx
+                ix += sx
+                i += step_x
+                tx += dtx
+            else:
+                t = tz
+                iz += sz
+                i += sz
+                tz += dtz
+            if t > max_dist:
+                return None
+            if ix < 0 or ix >= w or iz < 0 or iz >= h:
+                return t if walk else None
+            if not grid[i]:
+                return t
+
+    def line_of_sight(self, a: list[float], b: list[float]) -> bool:
+        """True if no collider footprint lies between two world positions (XZ)."""
+        return self.raycast(a, [b[0] - a[0], 0.0, b[2] - a[2]], 1.0) is None
+
+    def can_walk(self, a: list[float], b: list[float]) -> bool:
+        """True if a straight walk from a to b stays on unblocked cells."""
+        return self.raycast(a, [b[0] - a[0], 0.0, b[2] - a[2]], 1.0, walk=True) is None
+
+    def advance(self, path: list[tuple[float, float]], index: int, pos: list[float]) -> int:
+        """Index of the waypoint to head for from `pos`: skips ahead while the next one is in sight."""
+        cell = self.walkable_cell(pos)
+        if cell is None:
+            return index
+        last = len(path) - 1
+        while index < last and self.cells_visible(cell, self.cell_of_xz(path[index + 1])):
+            index += 1
+        return index
+
+    def plan_cells(self, start: tuple[int, int], goal: tuple[int, int], max_nodes: int = 1200) -> list[tuple[int, int]]:
+        """Cell path start..goal (both walkable), or [] if not found within `max_nodes` expansions."""
+        s = self._index(start)
+        t = self._index(goal)
+        with self._lock:
+            chain = self._search(s, t, max_nodes, self.jps)
+        if not chain:
+            return []
+        if not self.jps:
+            return [self._unindex(i) for i in chain]
+        # Jump points lie on straight or diagonal lines; fill in the cells between them.
+        out = [self._unindex(chain[0])]
+        for i in chain[1:]:
+            bx, bz = self._unindex(i)
+            x, z = out[-1]
+            while (x, z) != (bx, bz):
+                x += (bx > x) - (bx < x)
+                z += (bz > z) - (bz < z)
+                out.append((x, z))
+        return out
+
+    def _search(self, s: int, t: int, max_nodes: int, jps: bool) -> list[int]:
+        self._gen += 1
+        gen = self._gen
+        g = self._g
+        came = self._came
+        seen = self._seen
+        closed = self._closed
+        free = self.free
+        S = self.stride
+        tx, tz = divmod(t, S)
+        d2 = DIAG - 2.0
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        seen[s] = gen
+        g[s] = 0.0
+        came[s] = -1
+        # (f, h, cell): among equal f, prefer the cell nearer the goal.
+        openq: list[tuple[float, float, int]] = [(0.0, 0.0, s)]
+        expanded = 0
+        found = False
+        while openq:
+            _, _, cur = heappop(openq)
+            if closed[cur] == gen:
+                continue
+            if cur == t:
+                found = True
                 break
-            for nb in self._neighbors(cur):
-                step = 1.0 if (nb[0] == cur[0] or nb[1] == cur[1]) else 1.4
-                ng = g[cur] + step
-                if ng < g.get(nb, 1e30):
+            if expanded >= max_nodes:
+                break
+            closed[cur] = gen
+            expanded += 1
+            gc = g[cur]
+            if jps:
+                succ = self._jump_successors(cur, came[cur], t)
+            else:
+                succ = self._steps
+            for off, cost in succ:
+                nb = off if jps else cur + off
+                if not free[nb] or closed[nb] == gen:
+                    continue
+                ng = gc + cost
+                if seen[nb] != gen or ng < g[nb]:
+                    seen[nb] = gen
                     g[nb] = ng
                     came[nb] = cur
-                    f = ng + self._heur(nb, goal)
-                    heapq.heappush(openq, (f, nb))
-
-        if goal not in came:
+                    x, z = divmod(nb, S)
+                    dx = x - tx if x > tx else tx - x
+                    dz = z - tz if z > tz else tz - z
+                    h = dx + dz + d2 * (dx if dx < dz else dz)
+                    heappush(openq, (ng + h, h, nb))
+        self.last_expanded = expanded
+        if not found:
             return []
+        chain = [t]
+        while chain[-1] != s:
+            chain.append(came[chain[-1]])
+        chain.reverse()
+        return chain
 
-        path = [goal]
-        cur = goal
-        while cur != start:
-            cur = came[cur]
-            path.append(cur)
-        path.reverse()
-        out = [self._cell_center(ix, iz) for (ix, iz) in path]
+    # -- Jump Point Search (diagonal corner cutting allowed, as in plain A*) --
+
+    def _jump_successors(self, cur: int, parent: int, t: int) -> list[tuple[int, float]]:
+        free = self.free
+        S = self.stride
+        if parent < 0:
+            dirs = [(1, 0), (-1, 0), (0, 1), (0, -1), (1, 1), (-1, 1), (1, -1), (-1, -1)]
+        else:
+            cx, cz = divmod(cur, S)
+            px, pz = divmod(parent, S)
+            dx = (cx > px) - (cx < px)
+            dz = (cz > pz) - (cz < pz)
+            if dx and dz:
+                dirs = [(dx, dz), (dx, 0), (0, dz)]
+                if not free[cur - dx * S]:
+                    dirs.append((-dx, dz))
+                if not free[cur - dz]:
+                    dirs.append((dx, -dz))
+            elif dx:
+                dirs = [(dx, 0)]
+                if not free[cur + 1]:
+                    dirs.append((dx, 1))
+                if not free[cur - 1]:
+                    dirs.append((dx, -1))
+            else:
+                dirs = [(0, dz)]
+                if not free[cur + S]:
+                    dirs.append((1, dz))
+                if not free[cur - S]:
+                    dirs.append((-1, dz))
+        out = []
+        for dx, dz in dirs:
+            if dx and dz:
+                jp, n = self._jump_diag(cur, dx * S, dz, t)
+                cost = n * DIAG
+            elif dx:
+                jp, n = self._jump_straight(cur, dx * S, 1, t)
+                cost = float(n)
+            else:
+                jp, n = self._jump_straight(cur, dz, S, t)
+                cost = float(n)
+            if jp >= 0:
+                out.append((jp, cost))
         return out
 
-    def next_direction(self, from_pos: list[float], to_pos: list[float]) -> tuple[float, float]:
-        path = self.plan(from_pos, to_pos)
+    def _build_jumps(self) -> dict[int, list[int]]:
+        # For each free cell and straight step: n > 0 if the next jump point is n
+        # steps away, else -n free steps before a wall. One sweep per direction.
+        free = self.free
+        S = self.stride
+        n = len(free)
+        out: dict[int, list[int]] = {}
+        for step, side in ((S, 1), (-S, 1), (1, S), (-1, S)):
+            dist = [0] * n
+            order = range(n - 1, -1, -1) if step > 0 else range(n)
+            for c in order:
+                if not free[c]:
+                    continue
+                nxt = c + step
+                if not free[nxt]:
+                    dist[c] = 0
+                elif (not free[nxt + side] and free[nxt + side + step]) or (not free[nxt - side] and free[nxt - side + step]):
+                    dist[c] = 1
+                else:
+                    d = dist[nxt]
+                    dist[c] = d + 1 if d > 0 else d - 1
+            out[step] = dist
+        return out
+
+    def _jump_straight(self, cur: int, step: int, side: int, t: int) -> tuple[int, int]:
+        if self._jumps is None:
+            self._jumps = self._build_jumps()
+        n = self._jumps[step][cur]
+        reach = n if n > 0 else -n
+        # The goal stops a jump wherever it lies on the ray.
+        k = (t - cur) // step
+        if 0 < k <= reach and cur + k * step == t:
+            return t, k
+        if n > 0:
+            return cur + n * step, n
+        return -1, 0
+
+    def _jump_diag(self, cur: int, ox: int, oz: int, t: int) -> tuple[int, int]:
+        free = self.free
+        S = self.stride
+        step = ox + oz
+        n = 0
+        while True:
+            cur += step
+            n += 1
+            if not free[cur]:
+                return -1, 0
+            if cur == t:
+                return cur, n
+            if (not free[cur - ox] and free[cur - ox + oz]) or (not free[cur - oz] and free[cur + ox - oz]):
+                return cur, n
+            if self._jump_straight(cur, ox, 1, t)[0] >= 0 or self._jump_straight(cur, oz, S, t)[0] >= 0:
+                return cur, n
+
+    def next_waypoint(self, from_pos: list[float], to_pos: list[float]) -> tuple[float, float]:
+        """XZ point to head for next (the goal itself if there's no usable path)."""
+        path = self.plan(from_pos, to_pos, smooth=True)
         if len(path) < 2:
-            dx = to_pos[0] - from_pos[0]
-            dz = to_pos[2] - from_pos[2]
-        else:
-            dx = path[1][0] - from_pos[0]
-            dz = path[1][1] - from_pos[2]
+            return to_pos[0], to_pos[2]
+        return path[1]
+
+    def next_direction(self, from_pos: list[float], to_pos: list[float]) -> tuple[float, float]:
+        wx, wz = self.next_waypoint(from_pos, to_pos)
+        dx = wx - from_pos[0]
+        dz = wz - from_pos[2]
         l = (dx * dx + dz * dz) ** 0.5
         if l <= 1e-6:
             return 0.0, 0.0
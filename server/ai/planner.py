@@ -0,0 +1,130 @@
+"""Optional off-loop path planning for bots.
+
+With `nav_workers > 0` the service owns one `NavPool` and every room a
+`PathRequests`. A bot's think submits `GridNav.plan` to the pool and steers on
+the newest path it already has. Results are collected at the start of the
+next `step_bots`, so they land one or two ticks after the request and the
+simulation never waits on a planner.
+
+Thread workers (the default) share the room grids. `GridNav.plan` is pure
+Python and holds the GIL, and each grid runs one search at a time, so threads
+only move planning out of the tick, with no extra throughput. Process workers
+rebuild each map's grid once and can plan in parallel, but every request and
+path is pickled across and results land later. With JPS plans costing ~200 us,
+that overhead outweighs the search: `benchmarks.bots --rooms 4 --bots 15` (1
+CPU) gives tick mean/p95 of 1009/1751 us inline, 981/1483 us thread and
+2026/4205 us process.
+"""
+
+from __future__ import annotations
+
+import multiprocessing
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any
+
+from server.ai.nav import GridNav
+from server.game.world import load_map
+
+POOL_MODES = ("thread", "process")
+
+# Worker-side grids, keyed by (map_id, cell_size, pad, cluster_size, jps).
+_NAVS: dict[tuple[str, float, float, int, bool], GridNav] = {}
+
+
+def _plan(
+    map_id: str, cell: float, pad: float, cluster: int, jps: bool, start: list[float], goal: list[float]
+) -> list[tuple[float, float]]:
+    key = (map_id, cell, pad, cluster, jps)
+    nav = _NAVS.get(key)
+    if nav is None:
+        nav = _NAVS[key] = GridNav(load_map(map_id), cell_size=cell, pad=pad, cluster_size=cluster, jps=jps)
+    return nav.plan(start, goal, smooth=True)
+
+
+class NavPool:
+    def __init__(self, workers: int, mode: str = "thread"):
+        if mode not in POOL_MODES:
+            raise ValueError(f"unknown nav pool mode: {mode}")
+        self.workers = max(1, int(workers))
+        self.mode = mode
+        self._executor: Executor
+        if mode == "process":
+            # spawn: forking a process that runs an event loop (and maybe threads) is unsafe.
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="nav")
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+
+    def submit(self, nav: GridNav, start: list[float], goal: list[float]) -> Future:
+        self.submitted += 1
+        start = [start[0], start[1], start[2]]
+        goal = [goal[0], goal[1], goal[2]]
+        if self.mode == "thread":
+            # The grid is read-only after construction; threads can share the room's.
+            return self._executor.submit(nav.plan, start, goal, smooth=True)
+        cluster = nav.hpa.size if nav.hpa is not None else 0
+        return self._executor.submit(_plan, nav.map.mapId, nav.cell, nav.pad, cluster, nav.jps, start, goal)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def payload(self) -> dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "inFlight": self.submitted - self.completed - self.failed,
+        }
+
+
+class PathRequests:
+    """One room's in-flight plans and latest paths, keyed by bot id."""
+
+    def __init__(self, pool: NavPool, nav: GridNav):
+        self.pool = pool
+        self.nav = nav
+        self._pending: dict[str, Future] = {}
+        # key -> [path, index]; index is the waypoint the bot is heading for.
+        self._paths: dict[str, list[Any]] = {}
+
+    def collect(self) -> None:
+        if not self._pending:
+            return
+        for key, fut in list(self._pending.items()):
+            if not fut.done():
+                continue
+            del self._pending[key]
+            try:
+                path = fut.result()
+            except Exception:
+                self.pool.failed += 1
+                continue
+            self.pool.completed += 1
+            self._paths[key] = [path, 1]
+
+    def waypoint(self, key: str, from_pos: list[float], to_pos: list[float]) -> tuple[float, float]:
+        """Request a fresh plan (one in flight per key) and steer on the newest path so far."""
+        if key not in self._pending:
+            self._pending[key] = self.pool.submit(self.nav, from_pos, to_pos)
+        entry = self._paths.get(key)
+        if entry is None or len(entry[0]) < 2:
+            return to_pos[0], to_pos[2]
+        # The path was planned from where the bot was a tick or two ago: skip the
+        # waypoints it can already see past.
+        path = entry[0]
+        entry[1] = self.nav.advance(path, entry[1], from_pos)
+        if entry[1] >= len(path) - 1:
+            return to_pos[0], to_pos[2]
+        return path[entry[1]]
+
+    def forget(self, key: str) -> None:
+        self._pending.pop(key, None)
+        self._paths.pop(key, None)
+
+    def clear(self) -> None:
+        self._pending.clear()
+        self._paths.clear()
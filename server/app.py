@@ -15,7 +15,13 @@ from typing import Any
 
 from aiohttp import web
 
-from server.game.config import ServerConfig
+from server.ai.planner import NavPool
+from server.game import batch
+from server.game.config import ServerConfig, parse_bool
+from server.game.directory import RoomDirectory
+from server.game.matchmaker import Matchmaker
+from server.game.metrics import TickStats
+from server.game.ticker import TickTimer
 from server.net.ws import WsHub
 from server.storage.memory import MemoryStore
 from server.storage.sqlite import SqliteStore
@@ -32,11 +38,16 @@ class GameService:
 
         self.hub = WsHub(self)
         self.rooms = {}
+        self.directory = RoomDirectory(self)
+        self.matchmaker = Matchmaker(self.config.max_players_per_room, policy=self.config.matchmaking_policy)
+        self.nav_pool = NavPool(self.config.nav_workers, self.config.nav_pool_mode) if self.config.nav_workers > 0 else None
 
         self._running = False
         self._tick_task: asyncio.Task | None = None
 
         self._tick = 0
+        self._room_seq = 0
+        self.tick_stats = TickStats(1.0 / float(self.config.simulation_hz))
 
     @property
     def tick(self) -> int:
@@ -61,38 +72,82 @@ class GameService:
                 pass
 
         await self.hub.close_all()
+        self.hub.shutdown_encoder()
+        if self.nav_pool is not None:
+            self.nav_pool.shutdown()
         if self.sqlite:
             self.sqlite.close()
 
+    def _wants_step(self, room, idle_every: int) -> bool:
+        if room.player_count > 0:
+            if room.idle_since is not None:
+                # Someone joined a hibernating room: wake it at full rates.
+                room.idle_since = None
+                room.rates.reset()
+            return True
+        if room.idle_since is None:
+            room.idle_since = self.now()
+        if idle_every <= 0:
+            return False
+        # Bot-only rooms run in slow motion (fixed dt, rare steps); nobody is watching.
+        return ((self._tick + room.rates.phase) % idle_every) == 0
+
+    def _reap_idle_rooms(self) -> None:
+        timeout = float(self.config.room_idle_timeout_sec)
+        if timeout <= 0.0:
+            return
+        now = self.now()
+        for room_id, room in list(self.rooms.items()):
+            if room.idle_since is not None and (now - room.idle_since) >= timeout:
+                self.rooms.pop(room_id, None)
+                self.matchmaker.remove(room_id)
+                self.directory.remove(room_id)
+                room.close()
+
     async def _tick_loop(self) -> None:
         tick_dt = 1.0 / float(self.config.simulation_hz)
-        snap_every = max(1, int(round(self.config.simulation_hz / float(self.config.snapshot_hz))))
+        idle_hz = float(self.config.idle_room_hz)
+        idle_every = max(1, int(round(self.config.simulation_hz / idle_hz))) if idle_hz > 0.0 else 0
 
-        last = time.perf_counter()
-        acc = 0.0
+        timer = TickTimer(self.config.simulation_hz, self.tick_stats)
         while self._running:
-            now = time.perf_counter()
-            acc += now - last
-            last = now
-
-            # Prevent spiral of death.
-            if acc > 0.25:
-                acc = 0.25
-
-            stepped = False
-            while acc >= tick_dt:
-                acc -= tick_dt
+            for _ in range(timer.due()):
                 self._tick += 1
-                stepped = True
-                for room in list(self.rooms.values()):
-                    room.step(self._tick, tick_dt)
-
-                if (self._tick % snap_every) == 0:
-                    for room in list(self.rooms.values()):
-                        await room.broadcast_snapshots(self.hub)
-
-            if not stepped:
-                await asyncio.sleep(0.001)
+                await self._run_tick(tick_dt, idle_every)
+            await timer.sleep()
+
+    async def _run_tick(self, tick_dt: float, idle_every: int) -> None:
+        t0 = time.perf_counter()
+        pressure = self.tick_stats.avg_sec / tick_dt
+        stepping = [room for room in list(self.rooms.values()) if self._wants_step(room, idle_every)]
+        if self.config.batch_rooms and batch.available():
+            groups = batch.group_rooms(stepping)
+        else:
+            groups = [[room] for room in stepping]
+        for group in groups:
+            r0 = time.perf_counter()
+            batch.step_rooms(group, self._tick, tick_dt)
+            # A batched group's cost is shared evenly by its rooms.
+            share = (time.perf_counter() - r0) / len(group)
+            for room in group:
+                room.rates.record_step(share)
+                room.rates.update(room.player_count, pressure)
+
+        # Each room broadcasts at its own (possibly degraded) rate, phase-shifted.
+        for room in list(self.rooms.values()):
+            if not room.rates.is_snapshot_tick(self._tick):
+                continue
+            if room.idle_since is not None:
+                # Nobody to deliver to; drop what idle stepping queued.
+                room.take_events()
+            else:
+                r0 = time.perf_counter()
+                await room.broadcast_snapshots(self.hub)
+                room.rates.record_broadcast(time.perf_counter() - r0)
+        self.tick_stats.record(time.perf_counter() - t0)
+
+        if (self._tick % self.config.simulation_hz) == 0:
+            self._reap_idle_rooms()
 
     def get_or_create_room(self, room_id: str, map_id: str | None = None):
         from server.game.room import Room
@@ -110,15 +165,24 @@ class GameService:
             config=self.config,
             memory=self.memory,
             sqlite=self.sqlite,
+            phase=self._room_seq,
+            on_occupancy=self._room_occupancy_changed,
+            nav_pool=self.nav_pool,
         )
+        self._room_seq += 1
         self.rooms[room_id] = room
+        self._room_occupancy_changed(room)
         return room
 
+    def _room_occupancy_changed(self, room) -> None:
+        self.matchmaker.update(room.room_id, room.map_id, room.human_count)
+        self.directory.update(room)
+
     def matchmake(self, map_id: str | None = None) -> str:
-        # Find any room with capacity.
-        for room in self.rooms.values():
-            if room.map_id == (map_id or room.map_id) and len(room.players) < self.config.max_players_per_room:
-                return room.room_id
+        # Indexed by free human slots; bots don't count (humans replace them).
+        room_id = self.matchmaker.pick(map_id)
+        if room_id is not None:
+            return room_id
         room_id = uuid.uuid4().hex[:8]
         self.get_or_create_room(room_id, map_id=map_id)
         return room_id
@@ -132,6 +196,23 @@ class GameService:
             "snapshotHz": self.config.snapshot_hz,
         }
 
+    def metrics_payload(self) -> dict[str, Any]:
+        return {
+            "uptimeSec": time.time() - self.start_time,
+            # Process CPU (user+sys); sample twice and divide by wall time for utilization.
+            "cpuSec": time.process_time(),
+            "rooms": len(self.rooms),
+            "players": self.directory.humans,
+            "bots": self.directory.bots,
+            "connections": self.hub.connection_count,
+            # From each room's last frozen broadcast state (never the live room).
+            "projectiles": sum(len(r.world.projectiles) for r in self.rooms.values() if r.world is not None),
+            "eventLoop": type(asyncio.get_running_loop()).__module__,
+            "tick": self.tick_stats.payload(),
+            "net": self.hub.metrics(),
+            "nav": self.nav_pool.payload() if self.nav_pool is not None else None,
+        }
+
 
 def _cors_headers(config: ServerConfig, origin: str | None) -> dict[str, str]:
     if not origin:
@@ -189,15 +270,8 @@ def create_app(config: ServerConfig) -> web.Application:
     app.on_cleanup.append(on_cleanup)
 
     async def health(_: web.Request):
-        return web.json_response(
-            {
-                "ok": True,
-                "uptimeSec": time.time() - svc.start_time,
-                "rooms": len(svc.rooms),
-                "players": sum(r.player_count for r in svc.rooms.values()),
-                **svc.version_payload(),
-            }
-        )
+        # Cached; rebuilt at most once per second however often LBs poll.
+        return web.Response(body=svc.directory.health_json(), content_type="application/json")
 
     async def root(_: web.Request):
         return web.json_response(
@@ -207,6 +281,7 @@ def create_app(config: ServerConfig) -> web.Application:
                 **svc.version_payload(),
                 "endpoints": {
                     "health": "/health",
+                    "metrics": "/metrics",
                     "version": "/version",
                     "rooms": "/rooms",
                     "matchmake": "/matchmake",
@@ -220,12 +295,23 @@ def create_app(config: ServerConfig) -> web.Application:
     async def version(_: web.Request):
         return web.json_response(svc.version_payload())
 
-    async def rooms(_: web.Request):
-        return web.json_response(
-            {
-                "rooms": [r.public_info() for r in svc.rooms.values()],
-            }
+    async def metrics(_: web.Request):
+        return web.json_response(svc.metrics_payload())
+
+    async def rooms(request: web.Request):
+        q = request.query
+        try:
+            offset = int(q.get("offset", "0"))
+            limit = int(q.get("limit", "100"))
+        except ValueError:
+            raise web.HTTPBadRequest(text="offset/limit must be integers")
+        body = svc.directory.rooms_json(
+            map_id=q.get("mapId") or None,
+            has_space=parse_bool(q.get("hasSpace"), False),
+            offset=offset,
+            limit=limit,
         )
+        return web.Response(body=body, content_type="application/json")
 
     async def matchmake(request: web.Request):
         body = {}
@@ -261,6 +347,7 @@ def create_app(config: ServerConfig) -> web.Application:
     app.router.add_get("/", root)
     app.router.add_get("/health", health)
     app.router.add_get("/version", version)
+    app.router.add_get("/metrics", metrics)
     app.router.add_get("/rooms", rooms)
     app.router.add_post("/matchmake", matchmake)
     app.router.add_get("/leaderboard", leaderboard)
@@ -271,8 +358,20 @@ def create_app(config: ServerConfig) -> web.Application:
     return app
 
 
+def _install_uvloop(config: ServerConfig) -> bool:
+    if not config.use_uvloop:
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
+
 def main() -> None:
     config = ServerConfig.from_env()
+    _install_uvloop(config)
     app = create_app(config)
     web.run_app(app, host=config.host, port=config.port)
 
@@ -0,0 +1,50 @@
+"""Batched stepping for rooms that share a map (opt-in: `batch_rooms`).
+
+`step_rooms` runs the systems of `Room.step` in the same order for a group of
+rooms on one map with one config. Movement and the projectile broadphase run
+once for the whole group, as NumPy kernels over every room's players and
+rockets, with results written back per player. Bots, weapons, pickups and
+scoring stay per room: they are event-driven and touch few entities.
+Without NumPy the rooms are simply stepped one by one.
+"""
+
+from __future__ import annotations
+
+from server.ai.behavior import step_bots
+from server.game.systems.movement import np, step_movement_batch
+from server.game.systems.powerups import step_powerups
+from server.game.systems.projectiles import step_projectiles_batch
+from server.game.systems.scoring import step_scoring
+from server.game.systems.weapons import step_weapons
+
+
+def available() -> bool:
+    return np is not None
+
+
+def group_rooms(rooms: list) -> list[list]:
+    """Split rooms into groups that can be stepped together (same map, same config object)."""
+    groups: dict[tuple[str, int], list] = {}
+    for room in rooms:
+        groups.setdefault((room.map_id, id(room.config)), []).append(room)
+    return list(groups.values())
+
+
+def step_rooms(rooms: list, server_tick: int, dt: float) -> None:
+    """Step one group from `group_rooms` by one tick (equivalent to `room.step` on each)."""
+    if np is None or len(rooms) == 1:
+        for room in rooms:
+            room.step(server_tick, dt)
+        return
+    for room in rooms:
+        room.server_tick = int(server_tick)
+        room.t += float(dt)
+        step_bots(room, dt)
+    step_movement_batch(rooms, dt)
+    for room in rooms:
+        step_weapons(room, dt)
+    step_projectiles_batch(rooms, dt)
+    for room in rooms:
+        step_powerups(room, dt)
+        step_scoring(room, dt)
+        room._clamp_to_bounds()
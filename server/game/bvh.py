@@ -0,0 +1,82 @@
+"""Bounding volume hierarchy over a map's static colliders.
+
+Stored as flat arrays so it can live in a compiled map bundle (see mapbin.py)
+and be read straight from the mmap:
+
+  bounds  6 floats per node (min xyz, max xyz)
+  nodes   2 ints per node: leaves are (first, count) into `order`; inner nodes
+          are (right child, 0), with the left child stored right after them
+  order   collider indices, grouped by leaf
+
+Built by median split on the longest axis of the collider centers.
+"""
+
+from __future__ import annotations
+
+from array import array
+from typing import Sequence
+
+from server.game.world import AABB
+
+LEAF_SIZE = 4
+
+
+class ColliderBVH:
+    def __init__(self, bounds: Sequence[float], nodes: Sequence[int], order: Sequence[int]):
+        self.bounds = bounds
+        self.nodes = nodes
+        self.order = order
+
+    @property
+    def node_count(self) -> int:
+        return len(self.nodes) // 2
+
+    def query(self, box: AABB, pad: float = 0.0) -> list[int]:
+        """Indices (ascending) of colliders whose boxes may overlap `box` grown by `pad`."""
+        if not self.nodes:
+            return []
+        b, nodes, order = self.bounds, self.nodes, self.order
+        lx, ly, lz = box.min[0] - pad, box.min[1] - pad, box.min[2] - pad
+        hx, hy, hz = box.max[0] + pad, box.max[1] + pad, box.max[2] + pad
+        out: list[int] = []
+        stack = [0]
+        while stack:
+            n = stack.pop()
+            o = n * 6
+            if b[o] > hx or b[o + 3] < lx or b[o + 1] > hy or b[o + 4] < ly or b[o + 2] > hz or b[o + 5] < lz:
+                continue
+            a, count = nodes[n * 2], nodes[n * 2 + 1]
+            if count:
+                out.extend(order[a : a + count])
+            else:
+                stack.append(a)
+                stack.append(n + 1)
+        out.sort()
+        return out
+
+
+def build_bvh(colliders: list[AABB], leaf_size: int = LEAF_SIZE) -> ColliderBVH:
+    bounds = array("d")
+    nodes = array("i")
+    order = array("i")
+
+    def emit(idx: list[int]) -> None:
+        n = len(nodes) // 2
+        lo = [min(colliders[i].min[k] for i in idx) for k in range(3)]
+        hi = [max(colliders[i].max[k] for i in idx) for k in range(3)]
+        bounds.extend(lo + hi)
+        if len(idx) <= leaf_size:
+            nodes.extend((len(order), len(idx)))
+            order.extend(idx)
+            return
+        nodes.extend((0, 0))
+        axis = max(range(3), key=lambda k: hi[k] - lo[k])
+        idx = sorted(idx, key=lambda i: colliders[i].min[axis] + colliders[i].max[axis])
+        mid = len(idx) // 2
+        emit(idx[:mid])
+        nodes[n * 2] = len(nodes) // 2
+        emit(idx[mid:])
+
+    if colliders:
+        emit(list(range(len(colliders))))
+    return ColliderBVH(bounds, nodes, order)
@@ -8,6 +8,13 @@ from dataclasses import dataclass, field
 from typing import Any
 
 
+def parse_bool(v: str | None, default: bool) -> bool:
+    """Env / query-string flag: 1, true, yes or on (any case) is True; missing is `default`."""
+    if v is None:
+        return default
+    return v.strip().lower() in ("1", "true", "yes", "on")
+
+
 @dataclass(frozen=True)
 class WeaponSpec:
     weaponId: str
@@ -24,6 +31,46 @@ class WeaponSpec:
     explosionRadius: float = 0.0
 
 
+@dataclass(frozen=True, slots=True)
+class CompiledWeapon:
+    # Hot-path view of a WeaponSpec: derived values computed once.
+    index: int
+    weaponId: str
+    spec: WeaponSpec
+    hitscan: bool
+    pellets: int
+    fireDelay: float
+    reloadSec: float
+    maxAmmo: int
+    spreadRad: float
+
+
+class WeaponTable:
+    """Weapon specs compiled into an indexed table (rebuilt if `weapons` is replaced)."""
+
+    def __init__(self, weapons: dict[str, WeaponSpec]):
+        self.source = weapons
+        self.by_index: tuple[CompiledWeapon, ...] = tuple(
+            CompiledWeapon(
+                index=i,
+                weaponId=w.weaponId,
+                spec=w,
+                hitscan=w.family == "hitscan",
+                pellets=max(1, int(w.pellets)),
+                fireDelay=1.0 / max(0.1, w.fireRate),
+                reloadSec=float(w.reloadSec),
+                maxAmmo=int(w.maxAmmo),
+                spreadRad=float(w.spreadRad),
+            )
+            for i, w in enumerate(weapons.values())
+        )
+        self.by_id: dict[str, CompiledWeapon] = {w.weaponId: w for w in self.by_index}
+        self.default = self.by_id.get("pistol") or self.by_index[0]
+
+    def get(self, weapon_id: str) -> CompiledWeapon:
+        return self.by_id.get(weapon_id, self.default)
+
+
 @dataclass(frozen=True)
 class MovementCaps:
     accel: float = 45.0
@@ -52,14 +99,43 @@ class ServerConfig:
     simulation_hz: int = 60
     # Client camera follow feels much better with >= 20 Hz snapshots.
     snapshot_hz: int = 30
+    # Use uvloop for the event loop when installed (optional dependency).
+    use_uvloop: bool = False
+
+    # Adaptive per-room rates (snapshot rate is shed first, then bot think rate).
+    adaptive_rates: bool = True
+    room_budget_ms: float = 4.0
+    min_snapshot_hz: int = 10
+    min_bot_think_hz: int = 5
+    adapt_interval_ticks: int = 30
 
     # Rooms
     max_rooms: int = 20
     max_players_per_room: int = 16
+    # fullest: pack humans into the busiest room with space; emptiest: spread them out.
+    matchmaking_policy: str = "fullest"
     default_map_id: str = "map01"
     kills_to_win: int = 25
     round_time_sec: float = 8 * 60.0
     respawn_sec: float = 3.0
+    # Rooms with no humans tick at this rate (0 = suspended) and are reaped after the timeout (0 = never).
+    idle_room_hz: float = 0.0
+    room_idle_timeout_sec: float = 120.0
+    # Step rooms on the same map together (movement/projectile kernels across rooms; needs NumPy).
+    batch_rooms: bool = False
+
+    # Slow clients: skip snapshots while the socket write buffer is above the threshold,
+    # send every Nth snapshot for a while after lagging, evict after sustained lag (0 = never).
+    slow_client_buffer_bytes: int = 32 * 1024
+    slow_client_downgrade_every: int = 3
+    slow_client_recover_sec: float = 5.0
+    slow_client_evict_sec: float = 10.0
+    # Encode snapshot messages on a worker pool (0 = inline on the event loop). thread | process.
+    snapshot_workers: int = 0
+    snapshot_pool_mode: str = "thread"
+    # Event type -> XZ radius (m). Clients farther than this from where the event
+    # happened don't receive it (the acting player always does). Empty = no filtering.
+    event_relevance_radius: dict[str, float] = field(default_factory=lambda: {"miss": 40.0})
 
     # Anti-cheat / validation
     max_input_buffer: int = 120
@@ -77,6 +153,20 @@ class ServerConfig:
     # Bots
     bots_enabled: bool = True
     bot_count: int = 4
+    # Each bot re-decides (targeting, nav, LOS) at this rate, phases staggered across
+    # ticks; in between it steers on its last decision. Thinks that would push a room
+    # past the per-tick AI budget slip to the next tick (0 = no budget).
+    bot_think_hz: int = 10
+    bot_ai_budget_us: float = 1000.0
+    # Flat plans (nav_cluster_size 0) use Jump Point Search: optimal and, on maps this size,
+    # faster than HPA*. A cluster size > 0 routes every plan through HPA* instead (near-optimal;
+    # for maps too large for a flat search within ~1200 expanded nodes).
+    nav_cluster_size: int = 0
+    nav_jps: bool = True
+    # Plan bot paths on a worker pool (0 = inline on the tick). thread | process
+    # (process workers pay pickling per plan; slower than inline on current plans).
+    nav_workers: int = 0
+    nav_pool_mode: str = "thread"
 
     # Persistence
     sqlite_enabled: bool = True
@@ -84,6 +174,7 @@ class ServerConfig:
 
     # Weapon specs
     weapons: dict[str, WeaponSpec] = field(default_factory=dict)
+    _weapon_table: WeaponTable | None = field(default=None, init=False, repr=False, compare=False)
 
     def __post_init__(self):
         if not self.weapons:
@@ -128,25 +219,77 @@ class ServerConfig:
     def weapon(self, weapon_id: str) -> WeaponSpec:
         return self.weapons.get(weapon_id, self.weapons["pistol"])
 
-    @staticmethod
-    def _parse_bool(v: str | None, default: bool) -> bool:
-        if v is None:
-            return default
-        return v.strip().lower() in ("1", "true", "yes", "on")
+    @property
+    def weapon_table(self) -> WeaponTable:
+        t = self._weapon_table
+        if t is None or t.source is not self.weapons:
+            t = self._weapon_table = WeaponTable(self.weapons)
+        return t
 
     @classmethod
     def from_env(cls) -> "ServerConfig":
         cfg = cls()
         cfg.host = os.environ.get("FPS_HOST", cfg.host)
         cfg.port = int(os.environ.get("FPS_PORT", str(cfg.port)))
-        cfg.cors_allow_all = cls._parse_bool(os.environ.get("FPS_CORS_ALLOW_ALL"), cfg.cors_allow_all)
-        cfg.sqlite_enabled = cls._parse_bool(os.environ.get("FPS_SQLITE"), cfg.sqlite_enabled)
-        cfg.bots_enabled = cls._parse_bool(os.environ.get("FPS_BOTS"), cfg.bots_enabled)
+        cfg.cors_allow_all = parse_bool(os.environ.get("FPS_CORS_ALLOW_ALL"), cfg.cors_allow_all)
+        cfg.sqlite_enabled = parse_bool(os.environ.get("FPS_SQLITE"), cfg.sqlite_enabled)
+        cfg.bots_enabled = parse_bool(os.environ.get("FPS_BOTS"), cfg.bots_enabled)
+        cfg.use_uvloop = parse_bool(os.environ.get("FPS_UVLOOP"), cfg.use_uvloop)
+        cfg.adaptive_rates = parse_bool(os.environ.get("FPS_ADAPTIVE_RATES"), cfg.adaptive_rates)
+        if os.environ.get("FPS_ROOM_BUDGET_MS"):
+            try:
+                cfg.room_budget_ms = float(os.environ.get("FPS_ROOM_BUDGET_MS"))
+            except Exception:
+                pass
         if os.environ.get("FPS_BOT_COUNT"):
             try:
                 cfg.bot_count = int(os.environ.get("FPS_BOT_COUNT"))
             except Exception:
                 pass
+        if os.environ.get("FPS_BOT_AI_BUDGET_US"):
+            try:
+                cfg.bot_ai_budget_us = float(os.environ.get("FPS_BOT_AI_BUDGET_US"))
+            except Exception:
+                pass
+        if os.environ.get("FPS_NAV_CLUSTER"):
+            try:
+                cfg.nav_cluster_size = int(os.environ.get("FPS_NAV_CLUSTER"))
+            except Exception:
+                pass
+        cfg.nav_jps = parse_bool(os.environ.get("FPS_NAV_JPS"), cfg.nav_jps)
+        cfg.batch_rooms = parse_bool(os.environ.get("FPS_BATCH_ROOMS"), cfg.batch_rooms)
+        if os.environ.get("FPS_SNAPSHOT_WORKERS"):
+            try:
+                cfg.snapshot_workers = int(os.environ.get("FPS_SNAPSHOT_WORKERS"))
+            except Exception:
+                pass
+        cfg.snapshot_pool_mode = os.environ.get("FPS_SNAPSHOT_POOL", cfg.snapshot_pool_mode)
+        if os.environ.get("FPS_NAV_WORKERS"):
+            try:
+                cfg.nav_workers = int(os.environ.get("FPS_NAV_WORKERS"))
+            except Exception:
+                pass
+        cfg.nav_pool_mode = os.environ.get("FPS_NAV_POOL", cfg.nav_pool_mode)
+        if os.environ.get("FPS_ROOM_IDLE_TIMEOUT"):
+            try:
+                cfg.room_idle_timeout_sec = float(os.environ.get("FPS_ROOM_IDLE_TIMEOUT"))
+            except Exception:
+                pass
+        if os.environ.get("FPS_SLOW_CLIENT_EVICT_SEC"):
+            try:
+                cfg.slow_client_evict_sec = float(os.environ.get("FPS_SLOW_CLIENT_EVICT_SEC"))
+            except Exception:
+                pass
+        relevance = os.environ.get("FPS_EVENT_RELEVANCE")
+        if relevance is not None:
+            # "miss:40,projectile_spawn:60"; an empty value disables filtering.
+            try:
+                cfg.event_relevance_radius = {
+                    k.strip(): float(v) for k, v in (item.split(":", 1) for item in relevance.split(",") if item.strip())
+                }
+            except Exception:
+                pass
+        cfg.matchmaking_policy = os.environ.get("FPS_MATCHMAKING", cfg.matchmaking_policy)
         origins = os.environ.get("FPS_CORS_ORIGINS")
         if origins:
             cfg.cors_allowed_origins = [o.strip() for o in origins.split(",") if o.strip()]
@@ -172,4 +315,6 @@ class ServerConfig:
             except Exception:
                 pass
 
+        # Compile now rather than on the first shot.
+        cfg._weapon_table = WeaponTable(cfg.weapons)
         return cfg
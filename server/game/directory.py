@@ -0,0 +1,95 @@
+"""Room directory: aggregates + cached JSON for /health and /rooms.
+
+Totals (humans, bots) are maintained incrementally from room occupancy
+callbacks. Per-room rows (rates, tick cost) and the encoded responses are
+rebuilt at most once per `ttl` seconds, so pollers hitting these endpoints
+every second cost one dict lookup between rebuilds.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+from typing import Any
+
+MAX_PAGE = 200
+MAX_CACHED_QUERIES = 64
+
+
+class RoomDirectory:
+    def __init__(self, svc, ttl: float = 1.0):
+        self.svc = svc
+        self.ttl = float(ttl)
+
+        self.humans = 0
+        self.bots = 0
+        self._counts: dict[str, tuple[int, int]] = {}
+
+        self._rows: list[dict[str, Any]] = []
+        self._built_at = float("-inf")
+        self._health: bytes | None = None
+        self._pages: dict[tuple[Any, ...], bytes] = {}
+
+    def update(self, room) -> None:
+        old_h, old_b = self._counts.get(room.room_id, (0, 0))
+        h, b = room.human_count, room.bot_count
+        self.humans += h - old_h
+        self.bots += b - old_b
+        self._counts[room.room_id] = (h, b)
+
+    def remove(self, room_id: str) -> None:
+        h, b = self._counts.pop(room_id, (0, 0))
+        self.humans -= h
+        self.bots -= b
+
+    def _refresh(self) -> None:
+        now = time.monotonic()
+        if now - self._built_at < self.ttl:
+            return
+        self._built_at = now
+        self._rows = [r.public_info() for r in self.svc.rooms.values()]
+        self._health = None
+        self._pages.clear()
+
+    def health_json(self) -> bytes:
+        self._refresh()
+        if self._health is None:
+            tick_cost = sum(float(r["rates"]["tickCostMs"]) for r in self._rows)
+            self._health = json.dumps(
+                {
+                    "ok": True,
+                    "uptimeSec": time.time() - self.svc.start_time,
+                    "rooms": len(self._rows),
+                    "players": self.humans,
+                    "bots": self.bots,
+                    "tickCostMs": tick_cost,
+                    **self.svc.version_payload(),
+                }
+            ).encode("utf-8")
+        return self._health
+
+    def rooms_json(self, map_id: str | None = None, has_space: bool = False, offset: int = 0, limit: int = 100) -> bytes:
+        self._refresh()
+        offset = max(0, int(offset))
+        limit = max(1, min(MAX_PAGE, int(limit)))
+        key = (map_id, has_space, offset, limit)
+        body = self._pages.get(key)
+        if body is not None:
+            return body
+
+        rows = self._rows
+        if map_id is not None:
+            rows = [r for r in rows if r["mapId"] == map_id]
+        if has_space:
+            rows = [r for r in rows if r["humans"] < r["maxPlayers"]]
+        body = json.dumps(
+            {
+                "rooms": rows[offset : offset + limit],
+                "total": len(rows),
+                "offset": offset,
+                "limit": limit,
+            }
+        ).encode("utf-8")
+        if len(self._pages) < MAX_CACHED_QUERIES:
+            self._pages[key] = body
+        return body
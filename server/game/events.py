@@ -0,0 +1,60 @@
+"""Room event records and per-broadcast fan-out.
+
+Systems push `Event`s during the tick; `EventBatch` takes everything queued
+since the last snapshot broadcast and turns it into the JSON array each
+connection receives. Events every client gets are encoded once per broadcast
+and shared; only relevance-filtered and per-player events are joined per
+connection.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from typing import Any
+
+from server.game.protocol import encode
+
+
+@dataclass(slots=True)
+class Event:
+    type: str
+    payload: dict[str, Any]
+    # World XZ position the event happened at (relevance filtering only; never sent).
+    origin: tuple[float, float] | None = None
+    # Player the event is about; always delivered to them regardless of distance.
+    actor: str | None = None
+    _json: str | None = field(default=None, repr=False, compare=False)
+
+    def json(self) -> str:
+        if self._json is None:
+            self._json = encode({"type": self.type, "payload": self.payload})
+        return self._json
+
+
+class EventBatch:
+    def __init__(self, events: list[Event], personal: dict[str, list[Event]], radius: dict[str, float]):
+        self.personal = personal
+        shared: list[str] = []
+        self.local: list[tuple[Event, float]] = []
+        for ev in events:
+            r = radius.get(ev.type)
+            if r is None or ev.origin is None:
+                shared.append(ev.json())
+            else:
+                self.local.append((ev, r * r))
+        self.shared = ",".join(shared)
+
+    def json_for(self, player_id: str, pos: list[float] | None) -> str:
+        """JSON array of the events `player_id` should see (pos=None: no filtering)."""
+        parts = [self.shared] if self.shared else []
+        for ev, r2 in self.local:
+            if pos is not None and ev.actor != player_id:
+                dx = ev.origin[0] - pos[0]
+                dz = ev.origin[1] - pos[2]
+                if dx * dx + dz * dz > r2:
+                    continue
+            parts.append(ev.json())
+        mine = self.personal.get(player_id)
+        if mine:
+            parts.extend(ev.json() for ev in mine)
+        return "[" + ",".join(parts) + "]"
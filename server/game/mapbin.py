@@ -0,0 +1,118 @@
+"""Compiled map bundles (`<map_id>.mapbin`, written by tools/export_map.py --compile).
+
+Layout (little-endian):
+
+  header   magic b"FPSMAPB\\0", u32 version, u32 section count
+  table    per section: 4-byte tag, u64 offset, u64 size (offsets 8-byte aligned)
+  META     JSON: mapId, source (sha256 of the map JSON), bounds, pickups, nav params
+  COLL     f64 x 6 per collider (min xyz, max xyz)
+  SPWN     f64 x 3 per spawn
+  BVHB     f64 x 6 per BVH node  \\
+  BVHN     i32 x 2 per BVH node   > see bvh.py
+  BVHO     i32 per collider      /
+  NAVW     u8 per cell of GridNav's padded walk grid (1 = walkable)
+  NAVS     u8 per cell of GridNav's padded sight grid (1 = clear)
+
+The nav grids are stored a byte per cell, exactly as GridNav searches them, so
+a room uses the mapped pages as they are instead of rasterizing colliders.
+`read_bundle` maps the file read-only; every room and worker process on one
+host shares the same pages.
+"""
+
+from __future__ import annotations
+
+import json
+import mmap
+import struct
+import sys
+from typing import Any
+
+from server.game.bvh import ColliderBVH
+from server.game.world import AABB, MapData, PrebuiltNav
+
+MAGIC = b"FPSMAPB\0"
+VERSION = 1
+
+_HEADER = struct.Struct("<8sII")
+_ENTRY = struct.Struct("<4sQQ")
+
+
+class BundleError(Exception):
+    pass
+
+
+def write_bundle(path: str, map_data: MapData, source_sha256: str, bvh: ColliderBVH, nav=None) -> int:
+    """Write `map_data` (+ BVH, + a GridNav's grids) to `path`; returns the file size."""
+    meta: dict[str, Any] = {
+        "mapId": map_data.mapId,
+        "source": source_sha256,
+        "bounds": [list(map_data.bounds.min), list(map_data.bounds.max)],
+        "pickups": map_data.pickups,
+        "nav": None,
+    }
+    coll = struct.pack(f"<{6 * len(map_data.colliders)}d", *(v for a in map_data.colliders for v in (*a.min, *a.max)))
+    spawns = struct.pack(f"<{3 * len(map_data.spawns)}d", *(v for s in map_data.spawns for v in s))
+    sections = [
+        (b"COLL", coll),
+        (b"SPWN", spawns),
+        (b"BVHB", struct.pack(f"<{len(bvh.bounds)}d", *bvh.bounds)),
+        (b"BVHN", struct.pack(f"<{len(bvh.nodes)}i", *bvh.nodes)),
+        (b"BVHO", struct.pack(f"<{len(bvh.order)}i", *bvh.order)),
+    ]
+    if nav is not None:
+        meta["nav"] = {"cell": nav.cell, "pad": nav.pad, "w": nav.w, "h": nav.h}
+        sections += [(b"NAVW", bytes(nav.free)), (b"NAVS", bytes(nav.clear))]
+    sections.insert(0, (b"META", json.dumps(meta, separators=(",", ":")).encode("utf-8")))
+
+    offset = _HEADER.size + _ENTRY.size * len(sections)
+    table = []
+    body = bytearray()
+    for tag, data in sections:
+        pad = -(offset + len(body)) % 8
+        body += b"\0" * pad
+        table.append(_ENTRY.pack(tag, offset + len(body), len(data)))
+        body += data
+    with open(path, "wb") as f:
+        f.write(_HEADER.pack(MAGIC, VERSION, len(sections)))
+        f.write(b"".join(table))
+        f.write(body)
+    return offset + len(body)
+
+
+def read_bundle(path: str) -> tuple[MapData, str]:
+    """Map `path` and return (map data, sha256 of the JSON it was compiled from)."""
+    if sys.byteorder != "little":  # pragma: no cover
+        raise BundleError("bundles are little-endian")
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(mm)
+    if len(view) < _HEADER.size:
+        raise BundleError(f"{path}: truncated")
+    magic, version, count = _HEADER.unpack_from(view, 0)
+    if magic != MAGIC or version != VERSION:
+        raise BundleError(f"{path}: not a version {VERSION} map bundle")
+    sec: dict[bytes, memoryview] = {}
+    for i in range(count):
+        tag, off, size = _ENTRY.unpack_from(view, _HEADER.size + i * _ENTRY.size)
+        if off + size > len(view):
+            raise BundleError(f"{path}: section {tag!r} out of range")
+        sec[tag] = view[off : off + size]
+
+    meta = json.loads(bytes(sec[b"META"]))
+    coll = sec[b"COLL"].cast("d")
+    spawns = sec[b"SPWN"].cast("d")
+    lo, hi = meta["bounds"]
+    nav = None
+    if meta.get("nav") is not None:
+        n = meta["nav"]
+        nav = PrebuiltNav(cell=n["cell"], pad=n["pad"], w=n["w"], h=n["h"], free=sec[b"NAVW"], clear=sec[b"NAVS"])
+    map_data = MapData(
+        mapId=meta["mapId"],
+        bounds=AABB(min=list(lo), max=list(hi)),
+        colliders=[AABB(min=list(coll[i : i + 3]), max=list(coll[i + 3 : i + 6])) for i in range(0, len(coll), 6)],
+        spawns=[list(spawns[i : i + 3]) for i in range(0, len(spawns), 3)],
+        pickups=meta["pickups"],
+        bvh=ColliderBVH(sec[b"BVHB"].cast("d"), sec[b"BVHN"].cast("i"), sec[b"BVHO"].cast("i")),
+        nav=nav,
+    )
+    return map_data, meta["source"]
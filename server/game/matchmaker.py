@@ -0,0 +1,63 @@
+"""Room placement index: per-map rooms bucketed by free human slots.
+
+Bots never count against capacity (a joining human replaces one), so a room's
+free slots are `max_players - humans`. Rooms report changes through
+`update`; `pick` looks at no more than max_players buckets, whatever the room count.
+"""
+
+from __future__ import annotations
+
+POLICIES = ("fullest", "emptiest")
+
+
+class Matchmaker:
+    def __init__(self, max_players: int, policy: str = "fullest"):
+        if policy not in POLICIES:
+            raise ValueError(f"unknown matchmaking policy: {policy}")
+        self.max_players = int(max_players)
+        self.policy = policy
+        # map_id -> free slots -> room ids (dict used as an insertion-ordered set).
+        self._buckets: dict[str, list[dict[str, None]]] = {}
+        self._where: dict[str, tuple[str, int]] = {}
+
+    def _map_buckets(self, map_id: str) -> list[dict[str, None]]:
+        b = self._buckets.get(map_id)
+        if b is None:
+            b = [{} for _ in range(self.max_players + 1)]
+            self._buckets[map_id] = b
+        return b
+
+    def update(self, room_id: str, map_id: str, humans: int) -> None:
+        free = max(0, min(self.max_players, self.max_players - int(humans)))
+        cur = self._where.get(room_id)
+        if cur == (map_id, free):
+            return
+        if cur is not None:
+            self._buckets[cur[0]][cur[1]].pop(room_id, None)
+        self._map_buckets(map_id)[free][room_id] = None
+        self._where[room_id] = (map_id, free)
+
+    def remove(self, room_id: str) -> None:
+        cur = self._where.pop(room_id, None)
+        if cur is not None:
+            self._buckets[cur[0]][cur[1]].pop(room_id, None)
+
+    def free_slots(self, room_id: str) -> int:
+        cur = self._where.get(room_id)
+        return 0 if cur is None else cur[1]
+
+    def pick(self, map_id: str | None = None) -> str | None:
+        """Room id with at least one free slot per the policy, or None."""
+        maps = [map_id] if map_id is not None else list(self._buckets.keys())
+        if self.policy == "fullest":
+            order = range(1, self.max_players + 1)
+        else:
+            order = range(self.max_players, 0, -1)
+        for free in order:
+            for m in maps:
+                buckets = self._buckets.get(m)
+                if buckets is None:
+                    continue
+                for room_id in buckets[free]:
+                    return room_id
+        return None
@@ -0,0 +1,64 @@
+"""Tick timing counters (exposed via /metrics)."""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+LATE_BUCKETS_MS = (0.5, 1.0, 2.0, 4.0, 8.0, 16.0)
+
+
+class TickStats:
+    def __init__(self, budget_sec: float):
+        self.budget = float(budget_sec)
+        self.ticks = 0
+        self.overruns = 0
+        self.dropped_sec = 0.0
+        self.last_sec = 0.0
+        self.max_sec = 0.0
+        self.avg_sec = 0.0
+
+        # Wakeup lateness vs. the scheduled tick deadline.
+        self.late_avg_sec = 0.0
+        self.late_max_sec = 0.0
+        self.late_hist = [0] * (len(LATE_BUCKETS_MS) + 1)
+
+    def record(self, elapsed: float) -> None:
+        # One simulation tick: every room stepped (+ snapshots on snapshot ticks).
+        self.ticks += 1
+        self.last_sec = elapsed
+        if elapsed > self.max_sec:
+            self.max_sec = elapsed
+        if elapsed > self.budget:
+            self.overruns += 1
+        # EWMA over roughly the last second of ticks.
+        self.avg_sec += (elapsed - self.avg_sec) * 0.05
+
+    def drop(self, sec: float) -> None:
+        # Simulation time discarded by the spiral-of-death clamp.
+        self.dropped_sec += sec
+
+    def record_late(self, late: float) -> None:
+        if late > self.late_max_sec:
+            self.late_max_sec = late
+        self.late_avg_sec += (late - self.late_avg_sec) * 0.05
+        ms = late * 1000.0
+        i = 0
+        while i < len(LATE_BUCKETS_MS) and ms > LATE_BUCKETS_MS[i]:
+            i += 1
+        self.late_hist[i] += 1
+
+    def payload(self) -> dict[str, Any]:
+        labels = [f"le{b:g}ms" for b in LATE_BUCKETS_MS] + [f"gt{LATE_BUCKETS_MS[-1]:g}ms"]
+        return {
+            "ticks": self.ticks,
+            "overruns": self.overruns,
+            "budgetMs": self.budget * 1000.0,
+            "lastMs": self.last_sec * 1000.0,
+            "avgMs": self.avg_sec * 1000.0,
+            "maxMs": self.max_sec * 1000.0,
+            "droppedSec": self.dropped_sec,
+            "lateAvgMs": self.late_avg_sec * 1000.0,
+            "lateMaxMs": self.late_max_sec * 1000.0,
+            "lateHist": dict(zip(labels, self.late_hist)),
+        }
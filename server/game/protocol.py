@@ -2,21 +2,53 @@
 
 Wire format:
   {"type": "input", "data": {...}}
+  {"type": "input", "data": {"inputs": [{...}, {...}]}}   (bundled, oldest first)
+
+Outgoing messages are compact JSON, encoded with orjson when it is installed.
 """
 
 from __future__ import annotations
 
 import json
+import math
 from dataclasses import dataclass
 from typing import Any
 
+try:  # Optional: faster encoding (same compact JSON; NaN/inf become null).
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
 
 class ProtocolError(Exception):
     pass
 
 
+if orjson is not None:
+
+    def encode(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+
+else:  # pragma: no cover
+
+    def encode(obj: Any) -> str:
+        return json.dumps(obj, separators=(",", ":"))
+
+
 def dumps(msg_type: str, data: dict[str, Any]) -> str:
-    return json.dumps({"type": msg_type, "data": data}, separators=(",", ":"))
+    return encode({"type": msg_type, "data": data})
+
+
+def dumps_with(msg_type: str, data: dict[str, Any], key: str, raw_json: str) -> str:
+    """Like dumps, with `data[key]` spliced in from already-encoded JSON."""
+    text = dumps(msg_type, data)
+    sep = "" if not data else ","
+    return f"{text[:-2]}{sep}{json.dumps(key)}:{raw_json}}}}}"
+
+
+def encode_snapshots(jobs: list[tuple[dict[str, Any], str]]) -> list[str]:
+    """Snapshot messages for (payload, events JSON) pairs; also the encode-pool entry point."""
+    return [dumps_with("snapshot", payload, "events", events) for payload, events in jobs]
 
 
 def loads(text: str) -> tuple[str, dict[str, Any]]:
@@ -92,46 +124,51 @@ class Join:
         return cls(roomId=room_id, matchmake=matchmake, playerName=name[:24], wantDeltas=want_deltas)
 
 
-@dataclass
-class Input:
-    seq: int
-    dt: float
-    moveX: float
-    moveY: float
-    jump: bool
-    sprint: bool
-    yaw: float
-    pitch: float
-    fire: bool
-    weaponId: str
-    reload: bool
-
-    @classmethod
-    def parse(cls, data: dict[str, Any]) -> "Input":
-        seq = _int(data.get("seq"), default=-1)
-        if seq < 0:
-            raise ProtocolError("input.seq required")
-        dt = _num(data.get("dt"), default=0.016)
-        move_x = max(-1.0, min(1.0, _num(data.get("moveX"), default=0.0)))
-        move_y = max(-1.0, min(1.0, _num(data.get("moveY"), default=0.0)))
-        yaw = _num(data.get("yaw"), default=0.0)
-        pitch = _num(data.get("pitch"), default=0.0)
-        weapon_id = data.get("weaponId")
-        if not isinstance(weapon_id, str) or not weapon_id:
-            weapon_id = "pistol"
-        return cls(
-            seq=seq,
-            dt=dt,
-            moveX=move_x,
-            moveY=move_y,
-            jump=_bool(data.get("jump")),
-            sprint=_bool(data.get("sprint")),
-            yaw=yaw,
-            pitch=pitch,
-            fire=_bool(data.get("fire")),
-            weaponId=weapon_id,
-            reload=_bool(data.get("reload")),
-        )
+MAX_INPUT_BUNDLE = 8
+
+
+def parse_input(data: dict[str, Any]) -> dict[str, Any]:
+    """Validate one input and build the command record `Room.apply_input` stores.
+
+    Angles are normalized here (yaw wrapped to [-pi, pi), pitch clamped) so the
+    record can be handed to the room as-is.
+    """
+    seq = _int(data.get("seq"), default=-1)
+    if seq < 0:
+        raise ProtocolError("input.seq required")
+    move_x = _num(data.get("moveX"), default=0.0)
+    move_y = _num(data.get("moveY"), default=0.0)
+    pitch = _num(data.get("pitch"), default=0.0)
+    weapon_id = data.get("weaponId")
+    if not isinstance(weapon_id, str) or not weapon_id:
+        weapon_id = "pistol"
+    return {
+        "seq": seq,
+        "dt": _num(data.get("dt"), default=0.016),
+        "moveX": -1.0 if move_x < -1.0 else 1.0 if move_x > 1.0 else move_x,
+        "moveY": -1.0 if move_y < -1.0 else 1.0 if move_y > 1.0 else move_y,
+        "jump": _bool(data.get("jump")),
+        "sprint": _bool(data.get("sprint")),
+        "yaw": (_num(data.get("yaw"), default=0.0) + math.pi) % math.tau - math.pi,
+        "pitch": -1.4 if pitch < -1.4 else 1.4 if pitch > 1.4 else pitch,
+        "fire": _bool(data.get("fire")),
+        "weaponId": weapon_id,
+        "reload": _bool(data.get("reload")),
+    }
+
+
+def parse_inputs(data: dict[str, Any]) -> list[dict[str, Any]]:
+    """One input, or a bundle `{"inputs": [...]}` ordered oldest to newest.
+
+    Bundles may repeat recently sent inputs for loss redundancy; callers drop
+    anything at or below the last applied seq.
+    """
+    bundle = data.get("inputs")
+    if bundle is None:
+        return [parse_input(data)]
+    if not isinstance(bundle, list) or not bundle:
+        raise ProtocolError("input.inputs must be a non-empty list")
+    return [parse_input(d) for d in bundle[-MAX_INPUT_BUNDLE:] if isinstance(d, dict)]
 
 
 @dataclass
@@ -156,6 +193,3 @@ class Ping:
     @classmethod
     def parse(cls, data: dict[str, Any]) -> "Ping":
         return cls(t=_num(data.get("t"), default=0.0))
-
-
-VALID_C2S = {"hello", "join", "input", "chat", "leave", "ping"}
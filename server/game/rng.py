@@ -0,0 +1,48 @@
+"""Counter-based deterministic RNG for per-event randomness (shot spread, bot wander).
+
+`CounterRng(key)` yields the SplitMix64 sequence for `key`: constructing one is
+a single attribute store, and the same key gives the same numbers in every process
+(unlike `hash(str)`, which is salted per interpreter).
+"""
+
+from __future__ import annotations
+
+import zlib
+
+_M64 = 0xFFFFFFFFFFFFFFFF
+_GOLDEN = 0x9E3779B97F4A7C15
+
+
+def stable_id(s: str) -> int:
+    """32-bit hash of an id that is stable across processes and restarts."""
+    return zlib.crc32(s.encode("utf-8"))
+
+
+def mix_key(*parts: int) -> int:
+    """Combine integers (seed, id hash, tick, ...) into one 64-bit key."""
+    k = 0
+    for x in parts:
+        k = _mix64((k ^ (int(x) & _M64)) + _GOLDEN)
+    return k
+
+
+def _mix64(z: int) -> int:
+    z &= _M64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & _M64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & _M64
+    return z ^ (z >> 31)
+
+
+class CounterRng:
+    __slots__ = ("_state",)
+
+    def __init__(self, key: int):
+        self._state = int(key) & _M64
+
+    def next_u64(self) -> int:
+        self._state = (self._state + _GOLDEN) & _M64
+        return _mix64(self._state)
+
+    def random(self) -> float:
+        """Uniform float in [0, 1) (same contract as random.Random.random)."""
+        return (self.next_u64() >> 11) * (1.0 / 9007199254740992.0)
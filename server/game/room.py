@@ -9,9 +9,12 @@ from dataclasses import dataclass
 from typing import Any
 
 from server.game.config import ServerConfig
+from server.game.events import Event, EventBatch
+from server.game.scheduler import RoomRates
 from server.game.world import MapData, clamp, load_map, v3
+from server.game.worldstate import WorldState, freeze
 from server.game.systems.movement import step_movement
-from server.game.systems.weapons import step_weapons
+from server.game.systems.weapons import WEAPON_IDLE, step_weapons, wants_weapon_step
 from server.game.systems.projectiles import step_projectiles
 from server.game.systems.powerups import step_powerups
 from server.game.systems.scoring import step_scoring
@@ -37,6 +40,7 @@ class Player:
     lastFireAt: float
     reloadingUntil: float
     onGround: bool
+    weaponState: int = WEAPON_IDLE
 
     kills: int = 0
     deaths: int = 0
@@ -71,6 +75,9 @@ class Room:
         config: ServerConfig,
         memory,
         sqlite,
+        phase: int = 0,
+        on_occupancy=None,
+        nav_pool=None,
     ):
         self.room_id = room_id
         self.map_id = map_id
@@ -87,12 +94,26 @@ class Room:
         self.pickups: dict[str, Pickup] = {}
         self.bots: set[str] = set()
         self.bot_state: dict[str, dict[str, Any]] = {}
-
-        self._events: list[dict[str, Any]] = []
-        self._events_for: dict[str, list[dict[str, Any]]] = {}
+        # Bot think staggering (phase counter) and thinks pushed past the AI budget.
+        self.bot_seq = 0
+        self.bot_thinks_deferred = 0
+        # Players whose weapon is not idle (see systems/weapons.py).
+        self.weapons_active: set[str] = set()
+        # O(1) occupancy; `on_occupancy(room)` fires whenever it changes.
+        self.human_count = 0
+        self._on_occupancy = on_occupancy
+
+        # Queued since the last snapshot broadcast.
+        self._events: list[Event] = []
+        self._events_for: dict[str, list[Event]] = {}
 
         self.t: float = 0.0
         self.server_tick: int = 0
+        # Frozen state of the last snapshot broadcast (see worldstate.py).
+        self.world: WorldState | None = None
+        self.rates = RoomRates(config, phase=phase)
+        # Wall time the room last became empty of humans (None while occupied).
+        self.idle_since: float | None = None
 
         self._round_started_at = 0.0
         self._round_ends_at = 0.0
@@ -102,21 +123,53 @@ class Room:
         self._ensure_bots()
 
         from server.ai.nav import GridNav
-
-        self.nav = GridNav(self.map, cell_size=1.0, pad=self.config.player_radius)
+        from server.ai.planner import PathRequests
+
+        self.nav = GridNav(
+            self.map,
+            cell_size=1.0,
+            pad=self.config.player_radius,
+            cluster_size=self.config.nav_cluster_size,
+            jps=self.config.nav_jps,
+        )
+        # Async bot planning (None: bots plan inline on self.nav).
+        self.paths = PathRequests(nav_pool, self.nav) if nav_pool is not None else None
 
     @property
     def player_count(self) -> int:
-        return len([p for p in self.players.values() if not p.playerId.startswith("bot_")])
+        return self.human_count
+
+    @property
+    def bot_count(self) -> int:
+        return len(self.bots)
 
     def public_info(self) -> dict[str, Any]:
         return {
             "roomId": self.room_id,
             "mapId": self.map_id,
             "players": len(self.players),
+            "humans": self.human_count,
+            "bots": len(self.bots),
             "maxPlayers": self.config.max_players_per_room,
+            "rates": self.rates.payload(),
+            "hibernating": self.idle_since is not None,
+            "botThinksDeferred": self.bot_thinks_deferred,
         }
 
+    def close(self) -> None:
+        # Drop per-room state eagerly; the room is no longer referenced by the service.
+        self.players.clear()
+        self.projectiles.clear()
+        self.pickups.clear()
+        self.bots.clear()
+        self.bot_state.clear()
+        self.weapons_active.clear()
+        if self.paths is not None:
+            self.paths.clear()
+        self._events = []
+        self._events_for.clear()
+        self.nav = None
+
     def _init_pickups(self) -> None:
         for p in self.map.pickups:
             pid = p.get("pickupId") or uuid.uuid4().hex[:10]
@@ -132,14 +185,14 @@ class Room:
         if not self.config.bots_enabled:
             return
         max_bots = max(0, min(int(self.config.bot_count), self.config.max_players_per_room - 1))
-        while len(self.bots) < max_bots:
+        while len(self.bots) < max_bots and len(self.players) < self.config.max_players_per_room:
             bot_id = f"bot_{uuid.uuid4().hex[:8]}"
             self.bots.add(bot_id)
             self._spawn_player(bot_id, name=f"Bot {len(self.bots)}")
 
     def _spawn_player(self, player_id: str, name: str) -> Player:
         spawn = self.rng.choice(self.map.spawns) if self.map.spawns else v3(0.0, 0.0, 0.0)
-        ammo = {wid: self.config.weapon(wid).maxAmmo for wid in self.config.weapons.keys()}
+        ammo = {w.weaponId: w.maxAmmo for w in self.config.weapon_table.by_index}
         p = Player(
             playerId=player_id,
             name=name,
@@ -176,29 +229,63 @@ class Room:
         if player_id in self.players:
             return self.players[player_id]
         if len(self.players) >= self.config.max_players_per_room:
-            raise ValueError("room full")
+            # Bots only hold seats until a human wants one.
+            if not self.bots:
+                raise ValueError("room full")
+            self._remove_bot(next(iter(self.bots)))
         p = self._spawn_player(player_id, name)
+        self.human_count += 1
         self._push_event("join", {"playerId": p.playerId, "name": p.name})
         if not self._round_active:
             self._start_round()
+        self._occupancy_changed()
         return p
 
     def remove_player(self, player_id: str) -> None:
+        if player_id in self.bots:
+            self._remove_bot(player_id)
+            return
         p = self.players.pop(player_id, None)
+        if p:
+            self.human_count -= 1
+            self._push_event("leave", {"playerId": p.playerId, "name": p.name})
+            # Backfill the seat with a bot (up to bot_count).
+            self._ensure_bots()
+            self._occupancy_changed()
+
+    def _remove_bot(self, bot_id: str) -> None:
+        self.bots.discard(bot_id)
+        self.bot_state.pop(bot_id, None)
+        if self.paths is not None:
+            self.paths.forget(bot_id)
+        p = self.players.pop(bot_id, None)
         if p:
             self._push_event("leave", {"playerId": p.playerId, "name": p.name})
 
+    def _occupancy_changed(self) -> None:
+        if self._on_occupancy is not None:
+            self._on_occupancy(self)
+
     def _start_round(self) -> None:
         self._round_active = True
         self._round_started_at = 0.0
         self._round_ends_at = self.config.round_time_sec
         self._push_event("round_start", {"roomId": self.room_id, "mapId": self.map_id})
 
-    def queue_event_for(self, player_id: str, event: dict[str, Any]) -> None:
-        self._events_for.setdefault(player_id, []).append(event)
+    def queue_event_for(self, player_id: str, event_type: str, payload: dict[str, Any]) -> None:
+        # Bots have no connection to drain their queue.
+        if player_id in self.bots:
+            return
+        self._events_for.setdefault(player_id, []).append(Event(event_type, payload))
 
-    def _push_event(self, event_type: str, payload: dict[str, Any]) -> None:
-        self._events.append({"type": event_type, "payload": payload})
+    def _push_event(
+        self,
+        event_type: str,
+        payload: dict[str, Any],
+        origin: list[float] | None = None,
+        actor: str | None = None,
+    ) -> None:
+        self._events.append(Event(event_type, payload, None if origin is None else (origin[0], origin[2]), actor))
 
     def apply_input(self, player_id: str, cmd: dict[str, Any]) -> None:
         p = self.players.get(player_id)
@@ -206,6 +293,8 @@ class Room:
             return
         # Store last command; room step uses it (server fixed tick).
         p.lastCmd = cmd
+        if wants_weapon_step(p, cmd):
+            self.weapons_active.add(player_id)
 
     def step(self, server_tick: int, dt: float) -> None:
         self.server_tick = int(server_tick)
@@ -219,7 +308,9 @@ class Room:
         step_projectiles(self, dt)
         step_powerups(self, dt)
         step_scoring(self, dt)
+        self._clamp_to_bounds()
 
+    def _clamp_to_bounds(self) -> None:
         # Keep within bounds (simple clamp)
         bmin, bmax = self.map.bounds.min, self.map.bounds.max
         for p in self.players.values():
@@ -238,101 +329,70 @@ class Room:
         p.alive = True
         p.respawnAt = 0.0
         p.reloadingUntil = 0.0
+        p.weaponState = WEAPON_IDLE
         p.onGround = False
         self._push_event("respawn", {"playerId": p.playerId})
 
-    def _snapshot_for(self, player_id: str) -> dict[str, Any]:
+    def freeze_world(self) -> WorldState:
+        """Freeze what clients see now; kept as `self.world` until the next call."""
+        self.world = freeze(self)
+        return self.world
+
+    def _snapshot_for(self, player_id: str, world: WorldState | None = None) -> dict[str, Any]:
         you = self.players.get(player_id)
         if not you:
             return {}
+        if world is None:
+            world = self.freeze_world()
+        me = world.player(player_id)
+        if me is None:
+            # Joined after the freeze; shows up from the next broadcast.
+            return {}
 
-        others = []
-        for pid, p in self.players.items():
-            if pid == player_id:
-                continue
-            others.append(
-                {
-                    "playerId": p.playerId,
-                    "name": p.name,
-                    "pos": p.pos,
-                    "vel": p.vel,
-                    "yaw": p.yaw,
-                    "pitch": p.pitch,
-                    "hp": p.hp,
-                    "armor": p.armor,
-                    "weaponId": p.weaponId,
-                    "alive": p.alive,
-                    "kills": p.kills,
-                    "deaths": p.deaths,
-                    "score": p.score,
-                }
-            )
-
-        projs = []
-        for pr in self.projectiles.values():
-            projs.append(
-                {
-                    "projectileId": pr.projectileId,
-                    "ownerId": pr.ownerId,
-                    "weaponId": pr.weaponId,
-                    "pos": pr.pos,
-                    "vel": pr.vel,
-                    "radius": pr.radius,
-                }
-            )
-
-        picks = []
-        for pk in self.pickups.values():
-            picks.append(
-                {
-                    "pickupId": pk.pickupId,
-                    "kind": pk.kind,
-                    "pos": pk.pos,
-                    "available": pk.available,
-                }
-            )
-
-        events = []
-        events.extend(self._events)
-        events.extend(self._events_for.pop(player_id, []))
+        cmd = you.lastCmd or {}
         return {
             "you": {
-                "playerId": you.playerId,
-                "pos": you.pos,
-                "vel": you.vel,
-                "yaw": you.yaw,
-                "pitch": you.pitch,
-                "hp": you.hp,
-                "armor": you.armor,
-                "weaponId": you.weaponId,
-                "ammo": you.ammo.get(you.weaponId, 0),
-                "alive": you.alive,
-                "kills": you.kills,
-                "deaths": you.deaths,
-                "score": you.score,
+                "playerId": me["playerId"],
+                "pos": me["pos"],
+                "vel": me["vel"],
+                "yaw": me["yaw"],
+                "pitch": me["pitch"],
+                "hp": me["hp"],
+                "armor": me["armor"],
+                "weaponId": me["weaponId"],
+                "ammo": you.ammo.get(me["weaponId"], 0),
+                "alive": me["alive"],
+                "kills": me["kills"],
+                "deaths": me["deaths"],
+                "score": me["score"],
                 "lastSeq": you.lastInputSeq,
                 "cmd": {
-                    "moveX": float((you.lastCmd or {}).get("moveX", 0.0)),
-                    "moveY": float((you.lastCmd or {}).get("moveY", 0.0)),
-                    "sprint": bool((you.lastCmd or {}).get("sprint", False)),
-                    "jump": bool((you.lastCmd or {}).get("jump", False)),
+                    "moveX": float(cmd.get("moveX", 0.0)),
+                    "moveY": float(cmd.get("moveY", 0.0)),
+                    "sprint": bool(cmd.get("sprint", False)),
+                    "jump": bool(cmd.get("jump", False)),
                 },
             },
-            "others": others,
-            "projectiles": projs,
-            "pickups": picks,
-            "events": events,
+            "others": world.others(player_id),
+            "projectiles": world.projectiles,
+            "pickups": world.pickups,
         }
 
-    async def broadcast_snapshots(self, hub) -> None:
-        # Clear global event queue once per snapshot broadcast.
-        # Per-player events are popped in _snapshot_for.
-        global_events = self._events
+    def take_events(self) -> EventBatch:
+        # Hand everything queued since the last broadcast to one batch; queues restart empty.
+        batch = EventBatch(self._events, self._events_for, self.config.event_relevance_radius)
         self._events = []
+        self._events_for = {}
+        return batch
 
-        # Snapshot per connection (because "you" differs and per-player events).
+    async def broadcast_snapshots(self, hub) -> None:
+        batch = self.take_events()
+        # Snapshot per connection ("you" and per-player events differ).
+        # One frozen world per broadcast, shared by every connection's snapshot.
+        world = self.freeze_world()
+        items = []
         for conn in hub.connections_in_room(self.room_id):
-            snap = self._snapshot_for(conn.player_id)
-            # restore global events for next conn; _snapshot_for reads per-player queue only.
-            snap["events"] = list(global_events) + list(snap.get("events", []))
-            await hub.send_snapshot(conn, room=self, snapshot=snap)
+            snap = self._snapshot_for(conn.player_id, world)
+            me = world.player(conn.player_id)
+            items.append((conn, snap, batch.json_for(conn.player_id, me["pos"] if me is not None else None)))
+        await hub.send_snapshots(self, items)
@@ -0,0 +1,116 @@
+"""Per-room adaptive snapshot / bot-think rates.
+
+Each room carries a `RoomRates` that tracks its own cost and picks a
+degradation level. Levels shed work in a fixed order: snapshot rate first,
+then bot think rate. Simulation rate is never reduced here (movement and
+projectiles are not dt-robust).
+
+Rooms with no humans jump straight to the lowest rates; nobody is watching.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+from server.game.config import ServerConfig
+
+
+def _ladder(cfg: ServerConfig) -> list[tuple[int, int]]:
+    # (snap_every, bot_every) in simulation ticks, cheapest last.
+    sim = max(1, int(cfg.simulation_hz))
+    base_snap = max(1, int(round(sim / float(cfg.snapshot_hz))))
+    min_snap = max(base_snap, int(round(sim / float(max(1, min(cfg.min_snapshot_hz, cfg.snapshot_hz))))))
+    base_bot = max(1, int(round(sim / float(max(1, min(cfg.bot_think_hz, sim))))))
+    min_bot = max(base_bot, int(round(sim / float(max(1, min(cfg.min_bot_think_hz, sim))))))
+
+    steps: list[tuple[int, int]] = [(base_snap, base_bot)]
+    snap = base_snap
+    while snap < min_snap:
+        snap = min(min_snap, snap * 2)
+        steps.append((snap, base_bot))
+    bot = base_bot
+    while bot < min_bot:
+        bot = min(min_bot, bot * 2)
+        steps.append((snap, bot))
+    return steps
+
+
+class RoomRates:
+    def __init__(self, cfg: ServerConfig, phase: int = 0):
+        self.cfg = cfg
+        self.enabled = bool(cfg.adaptive_rates)
+        self.ladder = _ladder(cfg)
+        self.level = 0
+        # Offsets this room's snapshot ticks so rooms don't all encode on the same tick.
+        self.phase = int(phase)
+
+        self.step_avg = 0.0
+        self.broadcast_avg = 0.0
+        self._since_change = 0
+
+    @property
+    def snap_every(self) -> int:
+        return self.ladder[self.level][0]
+
+    @property
+    def bot_every(self) -> int:
+        # Ticks between two thinks of the same bot.
+        return self.ladder[self.level][1]
+
+    @property
+    def cost_per_tick(self) -> float:
+        # Snapshot encoding amortized over the ticks between broadcasts.
+        return self.step_avg + self.broadcast_avg / float(self.snap_every)
+
+    def reset(self) -> None:
+        # Back to full rates immediately (e.g. a human joined a hibernating room).
+        self.level = 0
+        self._since_change = 0
+
+    def is_snapshot_tick(self, tick: int) -> bool:
+        return ((tick + self.phase) % self.snap_every) == 0
+
+    def record_step(self, elapsed: float) -> None:
+        self.step_avg += (elapsed - self.step_avg) * 0.1
+
+    def record_broadcast(self, elapsed: float) -> None:
+        self.broadcast_avg += (elapsed - self.broadcast_avg) * 0.2
+
+    def update(self, humans: int, pressure: float) -> None:
+        """Re-pick the level. `pressure` is process tick cost / tick budget."""
+        if not self.enabled:
+            self.level = 0
+            return
+        top = len(self.ladder) - 1
+        if humans <= 0:
+            self.level = top
+            self._since_change = 0
+            return
+
+        self._since_change += 1
+        if self._since_change < self.cfg.adapt_interval_ticks:
+            return
+
+        budget = self.cfg.room_budget_ms / 1000.0
+        # Under process-wide load, tighten every room's budget so the most
+        # expensive rooms shed work first instead of all hitching together.
+        if pressure > 0.8:
+            budget *= 0.8 / pressure
+
+        cost = self.cost_per_tick
+        if cost > budget and self.level < top:
+            self.level += 1
+            self._since_change = 0
+        elif cost < budget * 0.5 and self.level > 0:
+            self.level -= 1
+            self._since_change = 0
+
+    def payload(self) -> dict[str, Any]:
+        sim = float(self.cfg.simulation_hz)
+        return {
+            "simulationHz": sim,
+            "snapshotHz": sim / self.snap_every,
+            "botThinkHz": sim / self.bot_every,
+            "level": self.level,
+            "tickCostMs": self.cost_per_tick * 1000.0,
+        }
@@ -11,6 +11,14 @@ from typing import Iterable
 
 from server.game.world import AABB, v3_add, v3_dot, v3_mul, v3_sub, v3_len, v3_norm
 
+try:  # Optional: vectorized multi-ray tests.
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Below this many ray/shape tests NumPy's per-call overhead outweighs the loop.
+NUMPY_MIN_TESTS = 32
+
 
 def closest_point_aabb(p: list[float], a: AABB) -> list[float]:
     return [
@@ -116,3 +124,220 @@ def first_obstacle_hit(origin: list[float], direction: list[float], colliders: I
         if best is None or t < best:
             best = t
     return best
+
+
+def rays_bounds(origin: list[float], dirs: list[list[float]], max_dist: float) -> AABB:
+    """AABB around every ray segment origin -> origin + d * max_dist."""
+    lo = list(origin)
+    hi = list(origin)
+    for d in dirs:
+        for i in range(3):
+            e = origin[i] + d[i] * max_dist
+            if e < lo[i]:
+                lo[i] = e
+            elif e > hi[i]:
+                hi[i] = e
+    return AABB(min=lo, max=hi)
+
+
+def aabb_overlaps(a: AABB, b: AABB, pad: float = 0.0) -> bool:
+    return (
+        a.min[0] - pad <= b.max[0]
+        and a.max[0] + pad >= b.min[0]
+        and a.min[1] - pad <= b.max[1]
+        and a.max[1] + pad >= b.min[1]
+        and a.min[2] - pad <= b.max[2]
+        and a.max[2] + pad >= b.min[2]
+    )
+
+
+def rays_first_obstacle(origin: list[float], dirs: list[list[float]], colliders: list[AABB], max_dist: float) -> list[float]:
+    """Per ray: distance to the first collider, or max_dist if none is closer."""
+    if not colliders:
+        return [max_dist] * len(dirs)
+    if np is None or len(dirs) * len(colliders) < NUMPY_MIN_TESTS:
+        out = []
+        for d in dirs:
+            t = first_obstacle_hit(origin, d, colliders, max_dist)
+            out.append(max_dist if t is None else t)
+        return out
+
+    o = np.asarray(origin, dtype=np.float64)
+    d = np.asarray(dirs, dtype=np.float64)
+    # Axis-parallel rays: a tiny signed component stands in for the slab special case.
+    d = np.where(np.abs(d) < 1e-9, np.copysign(1e-9, d), d)
+    inv = 1.0 / d  # (n, 3)
+    mn = np.asarray([a.min for a in colliders], dtype=np.float64)  # (m, 3)
+    mx = np.asarray([a.max for a in colliders], dtype=np.float64)
+    t1 = (mn[None, :, :] - o) * inv[:, None, :]  # (n, m, 3)
+    t2 = (mx[None, :, :] - o) * inv[:, None, :]
+    tmin = np.minimum(t1, t2).max(axis=2)
+    tmax = np.maximum(t1, t2).min(axis=2)
+    t = np.where(tmin >= 0.0, tmin, tmax)
+    t = np.where((tmin <= tmax) & (tmax >= 0.0) & (t <= max_dist), t, max_dist)
+    return t.min(axis=1).tolist()
+
+
+def rays_nearest_sphere(
+    origin: list[float],
+    dirs: list[list[float]],
+    centers: list[list[float]],
+    radii: list[float],
+    max_ts: list[float],
+) -> list[tuple[int, float] | None]:
+    """Per ray: (sphere index, distance) of the nearest sphere within that ray's max_t.
+
+    Ties go to the lower index.
+    """
+    if not centers:
+        return [None] * len(dirs)
+    if np is None or len(dirs) * len(centers) < NUMPY_MIN_TESTS:
+        out: list[tuple[int, float] | None] = []
+        for d, max_t in zip(dirs, max_ts):
+            best = None
+            for i, (c, r) in enumerate(zip(centers, radii)):
+                t = ray_sphere(origin, d, c, r)
+                if t is not None and t <= max_t and (best is None or t < best[1]):
+                    best = (i, t)
+            out.append(best)
+        return out
+
+    o = np.asarray(origin, dtype=np.float64)
+    d = np.asarray(dirs, dtype=np.float64)  # (n, 3)
+    oc = o - np.asarray(centers, dtype=np.float64)  # (k, 3)
+    r = np.asarray(radii, dtype=np.float64)
+    b = 2.0 * (d @ oc.T)  # (n, k)
+    c = (oc * oc).sum(axis=1) - r * r  # (k,)
+    disc = b * b - 4.0 * c
+    s = np.sqrt(np.maximum(disc, 0.0))
+    t1 = (-b - s) * 0.5
+    t2 = (-b + s) * 0.5
+    t = np.where(t1 >= 0.0, t1, t2)
+    limit = np.asarray(max_ts, dtype=np.float64)[:, None]
+    t = np.where((disc >= 0.0) & (t >= 0.0) & (t <= limit), t, np.inf)
+    idx = t.argmin(axis=1)
+    best_t = t[np.arange(len(dirs)), idx]
+    return [None if bt == math.inf else (int(i), bt) for i, bt in zip(idx.tolist(), best_t.tolist())]
+
+
+# Swept (continuous) tests. Motion is the segment p0 -> p0 + delta; results are
+# the fraction t in [0, 1] of first contact (0 if already touching), or None.
+
+
+def _segment_slab(p0: list[float], delta: list[float], mn: list[float], mx: list[float]) -> float | None:
+    tmin = 0.0
+    tmax = 1.0
+    for i in range(3):
+        o = p0[i]
+        d = delta[i]
+        if abs(d) < 1e-12:
+            if o < mn[i] or o > mx[i]:
+                return None
+            continue
+        inv = 1.0 / d
+        t1 = (mn[i] - o) * inv
+        t2 = (mx[i] - o) * inv
+        if t1 > t2:
+            t1, t2 = t2, t1
+        if t1 > tmin:
+            tmin = t1
+        if t2 < tmax:
+            tmax = t2
+        if tmin > tmax:
+            return None
+    return tmin
+
+
+def _segment_sphere(w: list[float], n: list[float], nn: float, r2: float) -> float | None:
+    # w = p0 - center; |w + t n|^2 = r^2, first root in [0, 1].
+    b = v3_dot(w, n)
+    c = v3_dot(w, w) - r2
+    if c <= 0.0:
+        return 0.0
+    if b >= 0.0 or nn <= 1e-18:
+        return None
+    disc = b * b - nn * c
+    if disc < 0.0:
+        return None
+    t = (-b - disc ** 0.5) / nn
+    return t if t <= 1.0 else None
+
+
+def segment_capsule(p0: list[float], delta: list[float], c0: list[float], c1: list[float], radius: float) -> float | None:
+    """First t where p0 + t*delta is within `radius` of segment c0-c1."""
+    axis = v3_sub(c1, c0)
+    aa = v3_dot(axis, axis)
+    nn = v3_dot(delta, delta)
+    r2 = radius * radius
+    w = v3_sub(p0, c0)
+
+    if aa <= 1e-18:
+        return _segment_sphere(w, delta, nn, r2)
+
+    # Already inside?
+    s = min(1.0, max(0.0, v3_dot(w, axis) / aa))
+    q = [w[0] - axis[0] * s, w[1] - axis[1] * s, w[2] - axis[2] * s]
+    if v3_dot(q, q) <= r2:
+        return 0.0
+
+    # Infinite cylinder: drop the axial components, solve |wp + t np|^2 = r^2.
+    wa = v3_dot(w, axis) / aa
+    na = v3_dot(delta, axis) / aa
+    wp = [w[0] - axis[0] * wa, w[1] - axis[1] * wa, w[2] - axis[2] * wa]
+    np_ = [delta[0] - axis[0] * na, delta[1] - axis[1] * na, delta[2] - axis[2] * na]
+    a = v3_dot(np_, np_)
+    best = None
+    if a > 1e-18:
+        b = v3_dot(wp, np_)
+        c = v3_dot(wp, wp) - r2
+        disc = b * b - a * c
+        if disc >= 0.0:
+            t = (-b - disc ** 0.5) / a
+            if 0.0 <= t <= 1.0:
+                s = wa + t * na
+                if 0.0 <= s <= 1.0:
+                    best = t
+
+    # End caps.
+    for t in (_segment_sphere(w, delta, nn, r2), _segment_sphere(v3_sub(p0, c1), delta, nn, r2)):
+        if t is not None and (best is None or t < best):
+            best = t
+    return best
+
+
+def swept_sphere_capsule(
+    p0: list[float], delta: list[float], radius: float, c0: list[float], c1: list[float], cap_radius: float
+) -> float | None:
+    return segment_capsule(p0, delta, c0, c1, radius + cap_radius)
+
+
+def swept_sphere_aabb(p0: list[float], delta: list[float], radius: float, a: AABB) -> float | None:
+    """First contact of a moving sphere with a box (exact at rounded edges and corners)."""
+    mn = [a.min[0] - radius, a.min[1] - radius, a.min[2] - radius]
+    mx = [a.max[0] + radius, a.max[1] + radius, a.max[2] + radius]
+    t = _segment_slab(p0, delta, mn, mx)
+    if t is None:
+        return None
+
+    # Which side of the real box the center is on at that time, per axis.
+    p = [p0[0] + delta[0] * t, p0[1] + delta[1] * t, p0[2] + delta[2] * t]
+    side = [(-1 if p[i] < a.min[i] else 1 if p[i] > a.max[i] else 0) for i in range(3)]
+    outside = sum(1 for x in side if x)
+    if outside <= 1:
+        return t  # face region: the expanded box is exact there
+
+    # Edge/corner region: the swept sphere must hit the rounded edge capsules.
+    corner = [a.min[i] if side[i] < 0 else a.max[i] if side[i] > 0 else a.min[i] for i in range(3)]
+    best = None
+    for i in range(3):
+        if outside == 2 and side[i] != 0:
+            continue
+        other = list(corner)
+        if outside == 2:
+            other[i] = a.max[i]
+        else:
+            other[i] = a.max[i] if side[i] < 0 else a.min[i]
+        ti = segment_capsule(p0, delta, corner, other, radius)
+        if ti is not None and (best is None or ti < best):
+            best = ti
+    return best
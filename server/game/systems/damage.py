@@ -27,10 +27,8 @@ def apply_damage(room, attacker_id: str, victim_id: str, base_damage: float, *,
 
     room.queue_event_for(
         attacker_id,
-        {
-            "type": "hit",
-            "payload": {"attackerId": attacker_id, "victimId": victim_id, "headshot": headshot, "damage": dmg},
-        },
+        "hit",
+        {"attackerId": attacker_id, "victimId": victim_id, "headshot": headshot, "damage": dmg},
     )
     room._push_event("damage", {"attackerId": attacker_id, "victimId": victim_id, "damage": dmg, "headshot": headshot})
 
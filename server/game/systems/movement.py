@@ -1,4 +1,9 @@
-"""Server-side movement sim + constraints."""
+"""Server-side movement sim + constraints.
+
+`step_movement_batch` runs the same integration for the players of several
+rooms at once (rooms sharing one map and config, see server/game/batch.py),
+as NumPy array kernels with one pass per collider.
+"""
 
 from __future__ import annotations
 
@@ -6,6 +11,14 @@ import math
 
 from server.game.systems.collision import resolve_sphere_vs_aabb_xz
 
+try:  # Optional: batched movement across rooms.
+    import numpy as np
+except ImportError:  # pragma: no cover
+    np = None
+
+# Below this many moving players the per-player loop beats building arrays.
+BATCH_MIN_PLAYERS = 16
+
 
 def _wrap_angle_rad(a: float) -> float:
     # Wrap to [-pi, pi]
@@ -19,106 +32,265 @@ def _wrap_angle_rad(a: float) -> float:
 def step_movement(room, dt: float) -> None:
     cfg = room.config
     caps = cfg.movement
+    colliders = room.map.colliders
 
     for p in room.players.values():
         if not p.alive:
             if p.respawnAt and room.t >= p.respawnAt:
                 room.respawn_player(p.playerId)
             continue
+        _move(p, cfg, caps, colliders, dt)
 
-        cmd = p.lastCmd or {}
 
-        p.yaw = _wrap_angle_rad(float(cmd.get("yaw", p.yaw)))
-        p.pitch = max(-1.4, min(1.4, float(cmd.get("pitch", p.pitch))))
+def _move(p, cfg, caps, colliders, dt: float) -> None:
+    cmd = p.lastCmd or {}
 
-        # Keep command angles normalized too (helps server-side validation).
-        if p.lastCmd is not None:
-            p.lastCmd["yaw"] = p.yaw
-            p.lastCmd["pitch"] = p.pitch
-
-        move_x = float(cmd.get("moveX", 0.0))
-        move_y = float(cmd.get("moveY", 0.0))
-        sprint = bool(cmd.get("sprint", False))
-        jump = bool(cmd.get("jump", False))
-
-        # Wish direction in world XZ.
-        # Convention: yaw=0 faces -Z; positive yaw rotates LEFT (matches Three.js).
-        sy = math.sin(p.yaw)
-        cy = math.cos(p.yaw)
-        fwd = (-sy, -cy)
-        right = (cy, -sy)
-        wish_x = right[0] * move_x + fwd[0] * move_y
-        wish_z = right[1] * move_x + fwd[1] * move_y
-        wish_len = (wish_x * wish_x + wish_z * wish_z) ** 0.5
-        if wish_len > 1e-6:
-            wish_x /= wish_len
-            wish_z /= wish_len
-        else:
-            wish_x = 0.0
-            wish_z = 0.0
-
-        max_speed = caps.maxSpeedSprint if sprint else caps.maxSpeedWalk
-
-        # Ground check.
-        radius = cfg.player_radius
-        on_ground = p.pos[1] <= radius + 1e-3
-        if on_ground:
-            p.pos[1] = radius
-            if p.vel[1] < 0.0:
-                p.vel[1] = 0.0
-
-        # Friction
-        if on_ground:
-            vx, vz = p.vel[0], p.vel[2]
-            sp = (vx * vx + vz * vz) ** 0.5
-            if sp > 1e-6:
-                drop = sp * caps.friction * dt
-                ns = max(0.0, sp - drop)
-                scale = ns / sp
-                p.vel[0] *= scale
-                p.vel[2] *= scale
-
-        # Acceleration
-        accel = caps.accel * (1.0 if on_ground else caps.airControl)
-        p.vel[0] += wish_x * accel * dt
-        p.vel[2] += wish_z * accel * dt
-
-        # Clamp XZ speed
+    p.yaw = _wrap_angle_rad(float(cmd.get("yaw", p.yaw)))
+    p.pitch = max(-1.4, min(1.4, float(cmd.get("pitch", p.pitch))))
+
+    # Keep command angles normalized too (helps server-side validation).
+    if p.lastCmd is not None:
+        p.lastCmd["yaw"] = p.yaw
+        p.lastCmd["pitch"] = p.pitch
+
+    move_x = float(cmd.get("moveX", 0.0))
+    move_y = float(cmd.get("moveY", 0.0))
+    sprint = bool(cmd.get("sprint", False))
+    jump = bool(cmd.get("jump", False))
+
+    # Wish direction in world XZ.
+    # Convention: yaw=0 faces -Z; positive yaw rotates LEFT (matches Three.js).
+    sy = math.sin(p.yaw)
+    cy = math.cos(p.yaw)
+    fwd = (-sy, -cy)
+    right = (cy, -sy)
+    wish_x = right[0] * move_x + fwd[0] * move_y
+    wish_z = right[1] * move_x + fwd[1] * move_y
+    wish_len = (wish_x * wish_x + wish_z * wish_z) ** 0.5
+    if wish_len > 1e-6:
+        wish_x /= wish_len
+        wish_z /= wish_len
+    else:
+        wish_x = 0.0
+        wish_z = 0.0
+
+    max_speed = caps.maxSpeedSprint if sprint else caps.maxSpeedWalk
+
+    # Ground check.
+    radius = cfg.player_radius
+    on_ground = p.pos[1] <= radius + 1e-3
+    if on_ground:
+        p.pos[1] = radius
+        if p.vel[1] < 0.0:
+            p.vel[1] = 0.0
+
+    # Friction
+    if on_ground:
         vx, vz = p.vel[0], p.vel[2]
         sp = (vx * vx + vz * vz) ** 0.5
-        if sp > max_speed:
-            s = max_speed / sp
-            p.vel[0] *= s
-            p.vel[2] *= s
-
-        # Jump
-        if jump and on_ground:
-            p.vel[1] = caps.jumpSpeed
-            on_ground = False
-
-        # Gravity
-        p.vel[1] -= caps.gravity * dt
-
-        # Integrate
-        p.pos[0] += p.vel[0] * dt
-        p.pos[1] += p.vel[1] * dt
-        p.pos[2] += p.vel[2] * dt
-
-        # Floor
-        if p.pos[1] < radius:
-            p.pos[1] = radius
-            if p.vel[1] < 0.0:
-                p.vel[1] = 0.0
-            on_ground = True
-
-        # Obstacles
-        collided = False
-        for a in room.map.colliders:
-            p.pos, hit = resolve_sphere_vs_aabb_xz(p.pos, radius, a)
-            collided = collided or hit
-        if collided:
-            # If we hit something, damp XZ a bit to avoid jitter.
-            p.vel[0] *= 0.75
-            p.vel[2] *= 0.75
-
-        p.onGround = on_ground
+        if sp > 1e-6:
+            drop = sp * caps.friction * dt
+            ns = max(0.0, sp - drop)
+            scale = ns / sp
+            p.vel[0] *= scale
+            p.vel[2] *= scale
+
+    # Acceleration
+    accel = caps.accel * (1.0 if on_ground else caps.airControl)
+    p.vel[0] += wish_x * accel * dt
+    p.vel[2] += wish_z * accel * dt
+
+    # Clamp XZ speed
+    vx, vz = p.vel[0], p.vel[2]
+    sp = (vx * vx + vz * vz) ** 0.5
+    if sp > max_speed:
+        s = max_speed / sp
+        p.vel[0] *= s
+        p.vel[2] *= s
+
+    # Jump
+    if jump and on_ground:
+        p.vel[1] = caps.jumpSpeed
+        on_ground = False
+
+    # Gravity
+    p.vel[1] -= caps.gravity * dt
+
+    # Integrate
+    p.pos[0] += p.vel[0] * dt
+    p.pos[1] += p.vel[1] * dt
+    p.pos[2] += p.vel[2] * dt
+
+    # Floor
+    if p.pos[1] < radius:
+        p.pos[1] = radius
+        if p.vel[1] < 0.0:
+            p.vel[1] = 0.0
+        on_ground = True
+
+    # Obstacles
+    collided = False
+    for a in colliders:
+        p.pos, hit = resolve_sphere_vs_aabb_xz(p.pos, radius, a)
+        collided = collided or hit
+    if collided:
+        # If we hit something, damp XZ a bit to avoid jitter.
+        p.vel[0] *= 0.75
+        p.vel[2] *= 0.75
+
+    p.onGround = on_ground
+
+
+def step_movement_batch(rooms: list, dt: float) -> None:
+    """`step_movement` for rooms that share one map and config, vectorized over all their players."""
+    cfg = rooms[0].config
+    caps = cfg.movement
+    colliders = rooms[0].map.colliders
+
+    movers = []
+    for room in rooms:
+        for p in room.players.values():
+            if not p.alive:
+                if p.respawnAt and room.t >= p.respawnAt:
+                    room.respawn_player(p.playerId)
+                continue
+            movers.append(p)
+    if np is None or len(movers) < BATCH_MIN_PLAYERS:
+        for p in movers:
+            _move(p, cfg, caps, colliders, dt)
+        return
+
+    # Gather (SoA).
+    cmds = [p.lastCmd or {} for p in movers]
+    yaw = np.array([float(c.get("yaw", p.yaw)) for c, p in zip(cmds, movers)])
+    pitch = np.array([float(c.get("pitch", p.pitch)) for c, p in zip(cmds, movers)])
+    move_x = np.array([float(c.get("moveX", 0.0)) for c in cmds])
+    move_y = np.array([float(c.get("moveY", 0.0)) for c in cmds])
+    sprint = np.array([bool(c.get("sprint", False)) for c in cmds])
+    jump = np.array([bool(c.get("jump", False)) for c in cmds])
+    pos = np.array([p.pos for p in movers], dtype=np.float64)
+    vel = np.array([p.vel for p in movers], dtype=np.float64)
+    px, py, pz = pos[:, 0], pos[:, 1], pos[:, 2]
+    vx, vy, vz = vel[:, 0], vel[:, 1], vel[:, 2]
+
+    # Same steps, in the same order, as _move.
+    while True:
+        m = yaw > math.pi
+        if not m.any():
+            break
+        yaw[m] -= math.tau
+    while True:
+        m = yaw < -math.pi
+        if not m.any():
+            break
+        yaw[m] += math.tau
+    pitch = np.maximum(-1.4, np.minimum(1.4, pitch))
+
+    sy = np.sin(yaw)
+    cy = np.cos(yaw)
+    wish_x = cy * move_x + (-sy) * move_y
+    wish_z = (-sy) * move_x + (-cy) * move_y
+    wish_len = np.sqrt(wish_x * wish_x + wish_z * wish_z)
+    has_wish = wish_len > 1e-6
+    wish_len = np.where(has_wish, wish_len, 1.0)
+    wish_x = np.where(has_wish, wish_x / wish_len, 0.0)
+    wish_z = np.where(has_wish, wish_z / wish_len, 0.0)
+
+    max_speed = np.where(sprint, caps.maxSpeedSprint, caps.maxSpeedWalk)
+
+    radius = cfg.player_radius
+    on_ground = py <= radius + 1e-3
+    py = np.where(on_ground, radius, py)
+    vy = np.where(on_ground & (vy < 0.0), 0.0, vy)
+
+    sp = np.sqrt(vx * vx + vz * vz)
+    fric = on_ground & (sp > 1e-6)
+    sp = np.where(fric, sp, 1.0)
+    scale = np.where(fric, np.maximum(0.0, sp - sp * caps.friction * dt) / sp, 1.0)
+    vx = vx * scale
+    vz = vz * scale
+
+    accel = np.where(on_ground, caps.accel * 1.0, caps.accel * caps.airControl)
+    vx = vx + wish_x * accel * dt
+    vz = vz + wish_z * accel * dt
+
+    sp = np.sqrt(vx * vx + vz * vz)
+    over = sp > max_speed
+    scale = np.where(over, max_speed / np.where(over, sp, 1.0), 1.0)
+    vx = vx * scale
+    vz = vz * scale
+
+    jumped = jump & on_ground
+    vy = np.where(jumped, caps.jumpSpeed, vy)
+    on_ground = on_ground & ~jumped
+
+    vy = vy - caps.gravity * dt
+
+    px = px + vx * dt
+    py = py + vy * dt
+    pz = pz + vz * dt
+
+    below = py < radius
+    py = np.where(below, radius, py)
+    vy = np.where(below & (vy < 0.0), 0.0, vy)
+    on_ground = on_ground | below
+
+    # Obstacles: resolve_sphere_vs_aabb_xz, one collider at a time across all players.
+    collided = np.zeros(len(movers), dtype=bool)
+    r2 = radius * radius
+    for a in colliders:
+        dx = px - np.minimum(np.maximum(px, a.min[0]), a.max[0])
+        dz = pz - np.minimum(np.maximum(pz, a.min[2]), a.max[2])
+        d2 = dx * dx + dz * dz
+        hit = (py >= a.min[1] - radius) & (py <= a.max[1] + radius) & (d2 <= r2)
+        if not hit.any():
+            continue
+        inside = hit & (d2 < 1e-9)
+        out = hit & ~inside
+        dist = np.sqrt(np.where(out, d2, 1.0))
+        inv = 1.0 / dist
+        push = radius - dist
+        px = np.where(out, px + dx * inv * push, px)
+        pz = np.where(out, pz + dz * inv * push, pz)
+        if inside.any():
+            # Center is inside; push out along the nearest XZ face (left, right, back, front).
+            left = np.abs(px - a.min[0])
+            right = np.abs(a.max[0] - px)
+            back = np.abs(pz - a.min[2])
+            front = np.abs(a.max[2] - pz)
+            m = np.minimum(np.minimum(left, right), np.minimum(back, front))
+            is_x = (m == left) | (m == right)
+            nx = np.where(m == left, 1.0, np.where(m == right, -1.0, 0.0))
+            nz = np.where(is_x, 0.0, np.where(m == back, 1.0, -1.0))
+            px = np.where(inside, px + nx * radius, px)
+            pz = np.where(inside, pz + nz * radius, pz)
+        collided |= hit
+    damp = np.where(collided, 0.75, 1.0)
+    vx = vx * damp
+    vz = vz * damp
+
+    # Scatter.
+    for p, yw, pt, x, y, z, ux, uy, uz, og in zip(
+        movers,
+        yaw.tolist(),
+        pitch.tolist(),
+        px.tolist(),
+        py.tolist(),
+        pz.tolist(),
+        vx.tolist(),
+        vy.tolist(),
+        vz.tolist(),
+        on_ground.tolist(),
+    ):
+        p.yaw = yw
+        p.pitch = pt
+        if p.lastCmd is not None:
+            p.lastCmd["yaw"] = yw
+            p.lastCmd["pitch"] = pt
+        p.pos[0] = x
+        p.pos[1] = y
+        p.pos[2] = z
+        p.vel[0] = ux
+        p.vel[1] = uy
+        p.vel[2] = uz
+        p.onGround = og
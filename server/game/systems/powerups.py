@@ -32,17 +32,17 @@ def step_powerups(room, dt: float) -> None:
                 before = p.hp
                 p.hp = min(100.0, p.hp + 35.0)
                 if p.hp != before:
-                    room.queue_event_for(p.playerId, {"type": "pickup", "payload": {"kind": "health", "amount": p.hp - before}})
+                    room.queue_event_for(p.playerId, "pickup", {"kind": "health", "amount": p.hp - before})
             elif pk.kind == "armor":
                 before = p.armor
                 p.armor = min(75.0, p.armor + 25.0)
                 if p.armor != before:
-                    room.queue_event_for(p.playerId, {"type": "pickup", "payload": {"kind": "armor", "amount": p.armor - before}})
+                    room.queue_event_for(p.playerId, "pickup", {"kind": "armor", "amount": p.armor - before})
             elif pk.kind == "ammo":
                 wid = p.weaponId
-                spec = room.config.weapon(wid)
-                p.ammo[wid] = min(spec.maxAmmo, int(p.ammo.get(wid, 0)) + max(1, spec.maxAmmo // 2))
-                room.queue_event_for(p.playerId, {"type": "pickup", "payload": {"kind": "ammo", "weaponId": wid}})
+                w = room.config.weapon_table.get(wid)
+                p.ammo[wid] = min(w.maxAmmo, int(p.ammo.get(wid, 0)) + max(1, w.maxAmmo // 2))
+                room.queue_event_for(p.playerId, "pickup", {"kind": "ammo", "weaponId": wid})
 
             pk.available = False
             pk.respawnAt = room.t + 18.0
@@ -1,17 +1,24 @@
-"""Hitscan + projectile updates."""
+"""Hitscan + projectile updates.
+
+`step_projectiles_batch` steps the rockets of several rooms sharing one map
+(server/game/batch.py) with a single NumPy broadphase.
+"""
 
 from __future__ import annotations
 
 import math
 import uuid
 
-from server.game.systems.collision import first_obstacle_hit, ray_sphere, sphere_intersects_aabb
+from server.game.systems.collision import aabb_overlaps, np, swept_sphere_aabb, swept_sphere_capsule
 from server.game.systems.damage import apply_damage
-from server.game.world import v3_add, v3_dot, v3_mul, v3_sub, v3_len, v3_norm
+from server.game.world import AABB, v3_sub, v3_len
+
+# Below this many rockets in a batch the per-rocket loop beats building arrays.
+BATCH_MIN_ROCKETS = 8
 
 
 def spawn_rocket(room, owner_id: str, origin: list[float], direction: list[float], weapon_id: str) -> None:
-    spec = room.config.weapon(weapon_id)
+    spec = room.config.weapon_table.get(weapon_id).spec
     pid = uuid.uuid4().hex[:10]
     from server.game.room import Projectile
 
@@ -24,15 +31,20 @@ def spawn_rocket(room, owner_id: str, origin: list[float], direction: list[float
         radius=spec.projectileRadius,
         ttl=4.0,
     )
-    room._push_event("projectile_spawn", {"projectileId": pid, "ownerId": owner_id, "weaponId": weapon_id})
+    room._push_event(
+        "projectile_spawn",
+        {"projectileId": pid, "ownerId": owner_id, "weaponId": weapon_id},
+        origin=origin,
+        actor=owner_id,
+    )
 
 
 def _explode(room, owner_id: str, pos: list[float], weapon_id: str) -> None:
-    spec = room.config.weapon(weapon_id)
+    spec = room.config.weapon_table.get(weapon_id).spec
     r = float(spec.explosionRadius or 0.0)
     if r <= 0.0:
         return
-    room._push_event("explosion", {"pos": pos, "radius": r, "weaponId": weapon_id})
+    room._push_event("explosion", {"pos": pos, "radius": r, "weaponId": weapon_id}, origin=pos, actor=owner_id)
 
     for pid, p in room.players.items():
         if not p.alive:
@@ -50,41 +62,176 @@ def _explode(room, owner_id: str, pos: list[float], weapon_id: str) -> None:
 
 
 def step_projectiles(room, dt: float) -> None:
+    # Swept tests: a rocket collides with whatever its path this tick touches first,
+    # so fast rockets / long ticks don't tunnel through thin walls or players.
     to_delete = []
     for pid, pr in room.projectiles.items():
         pr.ttl -= dt
         if pr.ttl <= 0.0:
             to_delete.append(pid)
             continue
-
-        # Integrate.
-        pr.vel[1] -= 3.0 * dt
-        pr.pos[0] += pr.vel[0] * dt
-        pr.pos[1] += pr.vel[1] * dt
-        pr.pos[2] += pr.vel[2] * dt
-
-        # Collide with obstacles.
-        hit = False
-        for a in room.map.colliders:
-            if sphere_intersects_aabb(pr.pos, pr.radius, a):
-                hit = True
-                break
-
-        # Collide with players.
-        if not hit:
-            for pid2, p in room.players.items():
-                if not p.alive or pid2 == pr.ownerId:
-                    continue
-                d = v3_sub(p.pos, pr.pos)
-                d[1] = 0.0
-                if v3_dot(d, d) <= (room.config.player_radius + pr.radius) ** 2:
-                    hit = True
-                    break
-
-        if hit:
-            _explode(room, pr.ownerId, pr.pos, pr.weaponId)
-            room._push_event("projectile_hit", {"projectileId": pr.projectileId, "pos": pr.pos, "weaponId": pr.weaponId})
+        p0, delta, sweep = _sweep(pr, dt)
+        t_hit = _first_hit(room, pr, p0, delta, sweep, room.map.colliders, room.players.items())
+        if _land(room, pr, p0, delta, t_hit):
             to_delete.append(pid)
 
     for pid in to_delete:
         room.projectiles.pop(pid, None)
+
+
+def _sweep(pr, dt: float) -> tuple[list[float], list[float], AABB]:
+    # Apply gravity; return start, displacement and the swept bounds for this tick.
+    pr.vel[1] -= 3.0 * dt
+    p0 = [pr.pos[0], pr.pos[1], pr.pos[2]]
+    delta = [pr.vel[0] * dt, pr.vel[1] * dt, pr.vel[2] * dt]
+    r = pr.radius
+    sweep = AABB(
+        min=[min(p0[i], p0[i] + delta[i]) - r for i in range(3)],
+        max=[max(p0[i], p0[i] + delta[i]) + r for i in range(3)],
+    )
+    return p0, delta, sweep
+
+
+def _first_hit(room, pr, p0: list[float], delta: list[float], sweep: AABB, colliders, players) -> float | None:
+    # Earliest contact (fraction of `delta`) with `colliders` or `players` ((id, Player) pairs).
+    pr_r = room.config.player_radius
+    # Player capsule: feet to head, radius player_radius.
+    cap_top = max(pr_r, room.config.player_height - pr_r)
+    r = pr.radius
+
+    # Collide with obstacles.
+    t_hit = None
+    for a in colliders:
+        if not aabb_overlaps(a, sweep):
+            continue
+        t = swept_sphere_aabb(p0, delta, r, a)
+        if t is not None and (t_hit is None or t < t_hit):
+            t_hit = t
+
+    # Collide with players.
+    for pid2, p in players:
+        if not p.alive or pid2 == pr.ownerId:
+            continue
+        x, y, z = p.pos
+        if (
+            x + pr_r < sweep.min[0]
+            or x - pr_r > sweep.max[0]
+            or z + pr_r < sweep.min[2]
+            or z - pr_r > sweep.max[2]
+            or y + cap_top + pr_r < sweep.min[1]
+            or y > sweep.max[1]
+        ):
+            continue
+        t = swept_sphere_capsule(p0, delta, r, [x, y + pr_r, z], [x, y + cap_top, z], pr_r)
+        if t is not None and (t_hit is None or t < t_hit):
+            t_hit = t
+    return t_hit
+
+
+def _land(room, pr, p0: list[float], delta: list[float], t_hit: float | None) -> bool:
+    # Integrate (up to the first contact); explode on contact. True if the rocket is spent.
+    s = 1.0 if t_hit is None else t_hit
+    pr.pos[0] = p0[0] + delta[0] * s
+    pr.pos[1] = p0[1] + delta[1] * s
+    pr.pos[2] = p0[2] + delta[2] * s
+
+    if t_hit is None:
+        return False
+    _explode(room, pr.ownerId, pr.pos, pr.weaponId)
+    room._push_event(
+        "projectile_hit",
+        {"projectileId": pr.projectileId, "pos": pr.pos, "weaponId": pr.weaponId},
+        origin=pr.pos,
+        actor=pr.ownerId,
+    )
+    return True
+
+
+def step_projectiles_batch(rooms: list, dt: float) -> None:
+    """`step_projectiles` for rooms sharing one map, vectorized over every room's rockets.
+
+    Gravity, integration and the broadphase (sweep bounds vs. every collider
+    and vs. the capsule bounds of players in the rocket's own room) run as
+    array ops. The exact swept tests then run, in rocket order, only for
+    rockets whose sweep touched something.
+    """
+    live = []
+    for room in rooms:
+        to_delete = []
+        for pid, pr in room.projectiles.items():
+            pr.ttl -= dt
+            if pr.ttl <= 0.0:
+                to_delete.append(pid)
+                continue
+            live.append((room, pid, pr))
+        for pid in to_delete:
+            room.projectiles.pop(pid, None)
+    if not live:
+        return
+
+    colliders = rooms[0].map.colliders
+    if np is None or len(live) < BATCH_MIN_ROCKETS:
+        for room, pid, pr in live:
+            p0, delta, sweep = _sweep(pr, dt)
+            if _land(room, pr, p0, delta, _first_hit(room, pr, p0, delta, sweep, colliders, room.players.items())):
+                room.projectiles.pop(pid, None)
+        return
+
+    n = len(live)
+    pos = np.array([pr.pos for _, _, pr in live], dtype=np.float64)
+    vel = np.array([pr.vel for _, _, pr in live], dtype=np.float64)
+    rad = np.array([pr.radius for _, _, pr in live], dtype=np.float64)[:, None]
+    vel[:, 1] -= 3.0 * dt
+    delta = vel * dt
+    end = pos + delta
+    smin = np.minimum(pos, end) - rad
+    smax = np.maximum(pos, end) + rad
+    near = np.zeros(n, dtype=bool)
+
+    # Sweep bounds vs. colliders.
+    if colliders:
+        cmin = np.array([a.min for a in colliders])
+        cmax = np.array([a.max for a in colliders])
+        near |= ((cmin[None, :, :] <= smax[:, None, :]) & (cmax[None, :, :] >= smin[:, None, :])).all(axis=2).any(axis=1)
+
+    # Sweep bounds vs. capsule bounds of the players in the rocket's room: one row per (rocket, player) pair.
+    room_index = {id(room): ri for ri, room in enumerate(rooms)}
+    alive = [[p for p in room.players.values() if p.alive] for room in rooms]
+    counts = np.array([len(a) for a in alive])
+    if counts.sum():
+        ppos = np.array([p.pos for a in alive for p in a], dtype=np.float64)
+        starts = np.cumsum(counts) - counts
+        sroom = np.array([room_index[id(room)] for room, _, _ in live])
+        per = counts[sroom]
+        rk = np.repeat(np.arange(n), per)
+        pj = np.repeat(starts[sroom], per) + (np.arange(per.sum()) - np.repeat(np.cumsum(per) - per, per))
+        pr_r = rooms[0].config.player_radius
+        cap_top = max(pr_r, rooms[0].config.player_height - pr_r)
+        lo = smin[rk]
+        hi = smax[rk]
+        q = ppos[pj]
+        touch = (
+            (q[:, 0] + pr_r >= lo[:, 0])
+            & (q[:, 0] - pr_r <= hi[:, 0])
+            & (q[:, 2] + pr_r >= lo[:, 2])
+            & (q[:, 2] - pr_r <= hi[:, 2])
+            & (q[:, 1] + cap_top + pr_r >= lo[:, 1])
+            & (q[:, 1] <= hi[:, 1])
+        )
+        near[rk[touch]] = True
+
+    # Scatter the free flights; exact tests (and explosions) in rocket order for the rest.
+    for (room, pid, pr), vy, p0, d, e, hit in zip(
+        live, vel[:, 1].tolist(), pos.tolist(), delta.tolist(), end.tolist(), near.tolist()
+    ):
+        pr.vel[1] = vy
+        if not hit:
+            pr.pos[0], pr.pos[1], pr.pos[2] = e
+            continue
+        r = pr.radius
+        sweep = AABB(
+            min=[min(p0[i], p0[i] + d[i]) - r for i in range(3)],
+            max=[max(p0[i], p0[i] + d[i]) + r for i in range(3)],
+        )
+        if _land(room, pr, p0, d, _first_hit(room, pr, p0, d, sweep, colliders, room.players.items())):
+            room.projectiles.pop(pid, None)
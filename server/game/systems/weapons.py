@@ -3,13 +3,24 @@
 from __future__ import annotations
 
 import math
-import random
 
-from server.game.systems.collision import first_obstacle_hit, ray_sphere
+from server.game.systems.collision import (
+    aabb_overlaps,
+    rays_bounds,
+    rays_first_obstacle,
+    rays_nearest_sphere,
+    sphere_intersects_aabb,
+)
 from server.game.systems.damage import apply_damage
+from server.game.rng import CounterRng, mix_key, stable_id
 from server.game.systems.projectiles import spawn_rocket
 from server.game.world import v3_add, v3_dot, v3_mul, v3_norm
 
+# Player.weaponState. Only players in room.weapons_active (not idle) are stepped.
+WEAPON_IDLE = 0
+WEAPON_FIRING = 1
+WEAPON_RELOADING = 2
+
 
 def _cross(a: list[float], b: list[float]) -> list[float]:
     return [
@@ -29,7 +40,7 @@ def _dir_from_yaw_pitch(yaw: float, pitch: float) -> list[float]:
     return v3_norm([-sy * cp, -sp, -cy * cp])
 
 
-def _apply_spread(base_dir: list[float], spread_rad: float, rng: random.Random) -> list[float]:
+def _apply_spread(base_dir: list[float], spread_rad: float, rng: CounterRng) -> list[float]:
     if spread_rad <= 0.0:
         return base_dir
     # Uniform cone sample around base_dir.
@@ -55,109 +66,130 @@ def _apply_spread(base_dir: list[float], spread_rad: float, rng: random.Random)
     return v3_norm(d)
 
 
-def _hitscan(room, shooter_id: str, origin: list[float], direction: list[float], weapon_id: str) -> None:
-    spec = room.config.weapon(weapon_id)
-
-    # Obstacle distance.
-    t_wall = first_obstacle_hit(origin, direction, room.map.colliders, spec.range)
-    max_t = spec.range if t_wall is None else t_wall
-
-    # Player hit (body sphere + head sphere).
-    best_t = None
-    best_pid = None
-    best_head = False
+def _hitscan(room, shooter_id: str, origin: list[float], dirs: list[list[float]], weapon_id: str) -> None:
+    # All pellets of one shot together: candidates are gathered and intersected once.
+    spec = room.config.weapon_table.get(weapon_id).spec
+    cfg = room.config
+    bounds = rays_bounds(origin, dirs, spec.range)
+
+    # Obstacle distance per pellet (only colliders the pellet segments can reach).
+    colliders = [a for a in room.map.colliders_near(bounds) if aabb_overlaps(a, bounds)]
+    max_ts = rays_first_obstacle(origin, dirs, colliders, spec.range)
+
+    # Player hit (head sphere + body sphere per candidate; head listed first so ties go to it).
+    pids: list[str] = []
+    centers: list[list[float]] = []
+    radii: list[float] = []
+    head_r = cfg.player_radius * 0.55
+    # Sphere around the body center that encloses both hit spheres.
+    reach = max(cfg.player_radius, (1.55 - 0.9) + head_r)
     for pid, p in room.players.items():
         if pid == shooter_id or not p.alive:
             continue
-
         body_center = [p.pos[0], p.pos[1] + 0.9, p.pos[2]]
-        head_center = [p.pos[0], p.pos[1] + 1.55, p.pos[2]]
-        body_t = ray_sphere(origin, direction, body_center, room.config.player_radius)
-        head_t = ray_sphere(origin, direction, head_center, room.config.player_radius * 0.55)
-
-        t = None
-        head = False
-        if head_t is not None:
-            t = head_t
-            head = True
-        if body_t is not None and (t is None or body_t < t):
-            t = body_t
-            head = False
-
-        if t is None or t > max_t:
+        if not sphere_intersects_aabb(body_center, reach, bounds):
+            continue
+        pids.append(pid)
+        centers.append([p.pos[0], p.pos[1] + 1.55, p.pos[2]])
+        radii.append(head_r)
+        centers.append(body_center)
+        radii.append(cfg.player_radius)
+
+    # Pellets resolve in order, each with its own damage, knockback and events, as if
+    # fired one by one. A victim killed by an earlier pellet drops out, and the
+    # remaining pellets are re-tested so they can go on to whoever is behind.
+    hits = rays_nearest_sphere(origin, dirs, centers, radii, max_ts)
+    for k, d in enumerate(dirs):
+        hit = hits[k]
+        if hit is not None and not room.players[pids[hit[0] // 2]].alive:
+            live = [j for j, pid in enumerate(pids) if room.players[pid].alive]
+            pids = [pids[j] for j in live]
+            centers = [c for j in live for c in centers[j * 2 : j * 2 + 2]]
+            radii = [r for j in live for r in radii[j * 2 : j * 2 + 2]]
+            hits[k:] = rays_nearest_sphere(origin, dirs[k:], centers, radii, max_ts[k:])
+            hit = hits[k]
+        if hit is None:
+            room._push_event("miss", {"attackerId": shooter_id, "weaponId": weapon_id}, origin=origin, actor=shooter_id)
             continue
+        i, t = hit
+        head = i % 2 == 0
+        hit_pos = [origin[0] + d[0] * t, origin[1] + d[1] * t, origin[2] + d[2] * t]
+        apply_damage(room, shooter_id, pids[i // 2], spec.damage, headshot=head, hit_pos=hit_pos)
+        room._push_event(
+            "hit",
+            {"attackerId": shooter_id, "victimId": pids[i // 2], "weaponId": weapon_id, "headshot": head},
+            origin=origin,
+            actor=shooter_id,
+        )
 
-        if best_t is None or t < best_t:
-            best_t = t
-            best_pid = pid
-            best_head = head
 
-    if best_pid is not None:
-        hit_pos = [origin[0] + direction[0] * best_t, origin[1] + direction[1] * best_t, origin[2] + direction[2] * best_t]
-        apply_damage(room, shooter_id, best_pid, spec.damage, headshot=best_head, hit_pos=hit_pos)
-        room._push_event("hit", {"attackerId": shooter_id, "victimId": best_pid, "weaponId": weapon_id, "headshot": best_head})
-    else:
-        room._push_event("miss", {"attackerId": shooter_id, "weaponId": weapon_id})
+def wants_weapon_step(p, cmd: dict) -> bool:
+    """Whether a new command needs the weapon system (fire, reload or a switch)."""
+    return bool(cmd.get("fire") or cmd.get("reload")) or cmd.get("weaponId", p.weaponId) != p.weaponId
 
 
 def step_weapons(room, dt: float) -> None:
+    active = room.weapons_active
+    if not active:
+        return
     cfg = room.config
+    table = cfg.weapon_table
 
-    for p in room.players.values():
-        if not p.alive:
+    for pid in list(active):
+        p = room.players.get(pid)
+        if p is None or not p.alive:
+            # Respawn resets the weapon state; the next command re-activates.
+            active.discard(pid)
             continue
 
-        cmd = p.lastCmd or {}
-        want_weapon = str(cmd.get("weaponId", p.weaponId))
-        if want_weapon in cfg.weapons:
+        cmd = p.lastCmd
+        want_weapon = cmd.get("weaponId", p.weaponId)
+        if want_weapon != p.weaponId and want_weapon in table.by_id:
             p.weaponId = want_weapon
-
-        spec = cfg.weapon(p.weaponId)
+        w = table.get(p.weaponId)
 
         # Finish reload.
-        if p.reloadingUntil and room.t >= p.reloadingUntil:
-            p.ammo[p.weaponId] = spec.maxAmmo
+        if p.weaponState == WEAPON_RELOADING:
+            if room.t < p.reloadingUntil:
+                continue
+            p.ammo[p.weaponId] = w.maxAmmo
             p.reloadingUntil = 0.0
-            room.queue_event_for(p.playerId, {"type": "reload_done", "payload": {"weaponId": p.weaponId}})
-
-        if bool(cmd.get("reload", False)) and not p.reloadingUntil:
-            if p.ammo.get(p.weaponId, 0) < spec.maxAmmo:
-                p.reloadingUntil = room.t + spec.reloadSec
-                room.queue_event_for(p.playerId, {"type": "reload", "payload": {"weaponId": p.weaponId}})
+            p.weaponState = WEAPON_IDLE
+            room.queue_event_for(p.playerId, "reload_done", {"weaponId": p.weaponId})
+
+        if cmd.get("reload"):
+            if p.ammo.get(p.weaponId, 0) < w.maxAmmo:
+                p.weaponState = WEAPON_RELOADING
+                p.reloadingUntil = room.t + w.reloadSec
+                room.queue_event_for(p.playerId, "reload", {"weaponId": p.weaponId})
             continue
 
-        if p.reloadingUntil:
+        if not cmd.get("fire"):
+            p.weaponState = WEAPON_IDLE
+            active.discard(pid)
             continue
+        p.weaponState = WEAPON_FIRING
 
-        fire = bool(cmd.get("fire", False))
-        if not fire:
+        # Fire rate gate (current weapon's delay; a switch doesn't inherit the old one's).
+        if room.t - p.lastFireAt < w.fireDelay:
             continue
-
-        ammo = int(p.ammo.get(p.weaponId, 0))
+        ammo = p.ammo.get(p.weaponId, 0)
         if ammo <= 0:
             continue
 
-        # Fire rate gate.
-        delay = 1.0 / max(0.1, spec.fireRate)
-        if (room.t - p.lastFireAt) < delay:
-            continue
-
         # Consume ammo and fire.
         p.lastFireAt = room.t
         p.ammo[p.weaponId] = ammo - 1
 
-        # Deterministic spread.
-        seed = (room.seed ^ (hash(p.playerId) & 0xFFFFFFFF) ^ (room.server_tick * 2654435761)) & 0xFFFFFFFF
-        rng = random.Random(seed)
+        # Deterministic spread (same room seed, player and tick -> same pellets).
+        rng = CounterRng(mix_key(room.seed, stable_id(p.playerId), room.server_tick))
         base_dir = _dir_from_yaw_pitch(p.yaw, p.pitch)
         origin = [p.pos[0], p.pos[1] + cfg.eye_height, p.pos[2]]
 
-        if spec.family == "hitscan":
-            for _ in range(int(spec.pellets)):
-                d = _apply_spread(base_dir, spec.spreadRad, rng)
-                _hitscan(room, p.playerId, origin, d, p.weaponId)
+        if w.hitscan:
+            dirs = [_apply_spread(base_dir, w.spreadRad, rng) for _ in range(w.pellets)]
+            _hitscan(room, p.playerId, origin, dirs, p.weaponId)
         else:
-            d = base_dir
-            spawn_rocket(room, p.playerId, origin, d, p.weaponId)
+            spawn_rocket(room, p.playerId, origin, base_dir, p.weaponId)
 
-        room.queue_event_for(p.playerId, {"type": "fire", "payload": {"weaponId": p.weaponId}})
+        room.queue_event_for(p.playerId, "fire", {"weaponId": p.weaponId})
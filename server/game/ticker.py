@@ -0,0 +1,43 @@
+"""Fixed-rate tick clock that sleeps until the next deadline.
+
+Deadlines are absolute (start + n * dt), so sleep jitter never accumulates
+into drift: a late wakeup just shortens the following sleep.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+
+from server.game.metrics import TickStats
+
+
+class TickTimer:
+    def __init__(self, hz: float, stats: TickStats, max_catchup_sec: float = 0.25):
+        self.dt = 1.0 / float(hz)
+        self.stats = stats
+        # Spiral-of-death guard: never run more than this much simulation time in one go.
+        self.max_catchup = max(1, int(max_catchup_sec / self.dt))
+        self.next_at = time.perf_counter() + self.dt
+
+    def due(self) -> int:
+        """Number of ticks to run now (0 if the next deadline hasn't passed)."""
+        now = time.perf_counter()
+        late = now - self.next_at
+        if late < 0.0:
+            return 0
+        self.stats.record_late(late)
+
+        n = int(late / self.dt) + 1
+        if n > self.max_catchup:
+            self.stats.drop((n - self.max_catchup) * self.dt)
+            # Skip the dropped ticks entirely; keep the phase of the schedule.
+            self.next_at += (n - self.max_catchup) * self.dt
+            n = self.max_catchup
+        self.next_at += n * self.dt
+        return n
+
+    async def sleep(self) -> None:
+        delay = self.next_at - time.perf_counter()
+        # Behind schedule: still yield once so socket I/O isn't starved.
+        await asyncio.sleep(delay if delay > 0.0 else 0.0)
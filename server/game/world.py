@@ -2,10 +2,14 @@
 
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 from dataclasses import dataclass
-from typing import Any
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from server.game.bvh import ColliderBVH
 
 
 def v3(x: float, y: float, z: float) -> list[float]:
@@ -54,6 +58,18 @@ class AABB:
         return cls(min=[cx - hx, cy - hy, cz - hz], max=[cx + hx, cy + hy, cz + hz])
 
 
+@dataclass
+class PrebuiltNav:
+    """GridNav's padded walk and sight grids, compiled into a map bundle."""
+
+    cell: float
+    pad: float
+    w: int
+    h: int
+    free: Any
+    clear: Any
+
+
 @dataclass
 class MapData:
     mapId: str
@@ -61,16 +77,57 @@ class MapData:
     colliders: list[AABB]
     spawns: list[list[float]]
     pickups: list[dict[str, Any]]
+    bvh: ColliderBVH | None = None
+    nav: PrebuiltNav | None = None
+
+    def colliders_near(self, box: AABB) -> list[AABB]:
+        """Colliders that may overlap `box`, in map order (BVH when there is one)."""
+        if self.bvh is None:
+            return self.colliders
+        colliders = self.colliders
+        return [colliders[i] for i in self.bvh.query(box)]
+
+
+# Maps are static once loaded; rooms (and worker processes) share one copy.
+_MAPS: dict[str, MapData] = {}
+
+
+def maps_dir() -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(__file__)), "maps")
 
 
 def load_map(map_id: str) -> MapData:
-    here = os.path.dirname(os.path.abspath(__file__))
-    maps_dir = os.path.join(here, "maps")
-    path = os.path.join(maps_dir, f"{map_id}.json")
+    """Map `map_id`: the compiled bundle when it is up to date with the JSON, else the JSON."""
+    m = _MAPS.get(map_id)
+    if m is None:
+        m = _MAPS[map_id] = _load(map_id)
+    return m
+
+
+def _load(map_id: str) -> MapData:
+    from server.game import mapbin
+
+    path = os.path.join(maps_dir(), f"{map_id}.json")
+    bundle = os.path.join(maps_dir(), f"{map_id}.mapbin")
     if not os.path.exists(path):
+        if os.path.exists(bundle):
+            return mapbin.read_bundle(bundle)[0]
         raise FileNotFoundError(path)
-    with open(path, "r", encoding="utf-8") as f:
-        data = json.load(f)
+    with open(path, "rb") as f:
+        raw = f.read()
+    if os.path.exists(bundle):
+        try:
+            m, source = mapbin.read_bundle(bundle)
+        except (mapbin.BundleError, KeyError, ValueError):
+            m, source = None, None
+        if m is not None and source == hashlib.sha256(raw).hexdigest():
+            return m
+        # Stale or unreadable bundle: the JSON wins.
+    return parse_map(json.loads(raw), map_id)
+
+
+def parse_map(data: dict[str, Any], map_id: str) -> MapData:
+    from server.game.bvh import build_bvh
 
     bounds = AABB.from_center_size(
         data["bounds"]["center"][0],
@@ -91,4 +148,11 @@ def load_map(map_id: str) -> MapData:
     spawns = [v3(*p) for p in data.get("spawns", [])]
     pickups = list(data.get("pickups", []))
 
-    return MapData(mapId=data.get("mapId", map_id), bounds=bounds, colliders=colliders, spawns=spawns, pickups=pickups)
+    return MapData(
+        mapId=data.get("mapId", map_id),
+        bounds=bounds,
+        colliders=colliders,
+        spawns=spawns,
+        pickups=pickups,
+        bvh=build_bvh(colliders),
+    )
@@ -0,0 +1,85 @@
+"""Frozen per-broadcast world state.
+
+`freeze(room)` copies what clients can see out of the live room once per
+snapshot tick. Each entity record is built once and shared by every
+connection's snapshot, vectors become tuples and the collections are tuples,
+so nothing in it aliases a list the simulation mutates later. The delta cache,
+the encode pool and metrics can keep or read it without copying again.
+
+Records stay plain dicts so the encoders take them as they are; treat them as
+read-only.
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, Mapping
+
+
+@dataclass(frozen=True, slots=True)
+class WorldState:
+    tick: int
+    t: float
+    # Public player records, room order ("others" in a snapshot).
+    players: tuple[dict[str, Any], ...]
+    # player id -> index into `players`
+    index: Mapping[str, int]
+    projectiles: tuple[dict[str, Any], ...]
+    pickups: tuple[dict[str, Any], ...]
+
+    def player(self, player_id: str) -> dict[str, Any] | None:
+        i = self.index.get(player_id)
+        return self.players[i] if i is not None else None
+
+    def others(self, player_id: str) -> list[dict[str, Any]]:
+        return [rec for rec in self.players if rec["playerId"] != player_id]
+
+
+def freeze(room) -> WorldState:
+    players = tuple(
+        {
+            "playerId": p.playerId,
+            "name": p.name,
+            "pos": tuple(p.pos),
+            "vel": tuple(p.vel),
+            "yaw": p.yaw,
+            "pitch": p.pitch,
+            "hp": p.hp,
+            "armor": p.armor,
+            "weaponId": p.weaponId,
+            "alive": p.alive,
+            "kills": p.kills,
+            "deaths": p.deaths,
+            "score": p.score,
+        }
+        for p in room.players.values()
+    )
+    projectiles = tuple(
+        {
+            "projectileId": pr.projectileId,
+            "ownerId": pr.ownerId,
+            "weaponId": pr.weaponId,
+            "pos": tuple(pr.pos),
+            "vel": tuple(pr.vel),
+            "radius": pr.radius,
+        }
+        for pr in room.projectiles.values()
+    )
+    pickups = tuple(
+        {
+            "pickupId": pk.pickupId,
+            "kind": pk.kind,
+            "pos": tuple(pk.pos),
+            "available": pk.available,
+        }
+        for pk in room.pickups.values()
+    )
+    return WorldState(
+        tick=room.server_tick,
+        t=room.t,
+        players=players,
+        index=MappingProxyType({rec["playerId"]: i for i, rec in enumerate(players)}),
+        projectiles=projectiles,
+        pickups=pickups,
+    )
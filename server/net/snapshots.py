@@ -1,9 +1,16 @@
-"""Snapshot cache + (light) delta compression."""
+"""Snapshot cache + (light) delta compression, and the optional encode pool."""
 
 from __future__ import annotations
 
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Any
 
+from server.game import protocol
+
+ENCODE_POOL_MODES = ("thread", "process")
+
 
 def _diff_fields(prev: dict[str, Any], cur: dict[str, Any], fields: list[str]) -> dict[str, Any]:
     out = {}
@@ -55,8 +62,41 @@ class SnapshotCache:
             "others": cur.get("others", []),
             "projectiles": cur.get("projectiles", []),
             "pickups": cur.get("pickups", []),
-            "events": cur.get("events", []),
         }
         # Note: delta for others/projectiles/pickups is full lists for simplicity.
         self._last_by_player[player_id] = cur
         return {"mode": "delta", **delta}
+
+
+class EncodePool:
+    """Encodes a broadcast's snapshot messages off the event loop (thread or process workers).
+
+    The tick loop awaits each room's broadcast before stepping again, so the
+    snapshot dicts handed over are not mutated while a worker encodes them.
+    Process workers get pickled copies. Neither json nor orjson releases the
+    GIL, so thread workers free the loop thread but don't add throughput.
+    """
+
+    def __init__(self, workers: int, mode: str = "thread"):
+        if mode not in ENCODE_POOL_MODES:
+            raise ValueError(f"unknown snapshot pool mode: {mode}")
+        self.workers = max(1, int(workers))
+        self.mode = mode
+        self._executor: Executor
+        if mode == "process":
+            self._executor = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        else:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="snap")
+        self.batches = 0
+        self.messages = 0
+
+    async def encode(self, jobs: list[tuple[dict[str, Any], str]]) -> list[str]:
+        self.batches += 1
+        self.messages += len(jobs)
+        return await asyncio.wrap_future(self._executor.submit(protocol.encode_snapshots, jobs))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def payload(self) -> dict[str, Any]:
+        return {"mode": self.mode, "workers": self.workers, "batches": self.batches, "messages": self.messages}
@@ -3,17 +3,20 @@
 from __future__ import annotations
 
 import asyncio
-import math
 import time
 import uuid
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Any, Iterable
 
 from aiohttp import WSMsgType, web
 
 from server.game import protocol
 from server.net.rate_limit import TokenBucket
-from server.net.snapshots import SnapshotCache
+from server.net.snapshots import EncodePool, SnapshotCache
+
+# Events held for a connection whose snapshots are being skipped; past this many
+# characters the oldest batches are dropped (a client this far behind is usually evicted).
+MAX_HELD_EVENT_CHARS = 64 * 1024
 
 
 @dataclass
@@ -31,12 +34,51 @@ class Connection:
     input_bucket: TokenBucket
     chat_bucket: TokenBucket
 
+    # Backpressure tracking (see WsHub.send_snapshots); times are time.monotonic().
+    transport: Any = None
+    last_write_at: float = 0.0
+    lag_since: float | None = None
+    degraded_until: float = 0.0
+    snaps_sent: int = 0
+    snaps_skipped: int = 0
+    # Event batches (JSON array bodies) from skipped snapshots, sent with the next one.
+    held_events: list[str] = field(default_factory=list)
+    held_chars: int = 0
+
+    def write_buffer_size(self) -> int:
+        t = self.transport
+        if t is None:
+            return 0
+        try:
+            return int(t.get_write_buffer_size())
+        except Exception:
+            return 0
+
 
 class WsHub:
     def __init__(self, svc):
         self.svc = svc
         self._conns: dict[str, Connection] = {}
+        # room_id -> members, kept in sync with Connection.room_id.
+        self._by_room: dict[str, dict[str, Connection]] = {}
+        self._evicted = 0
+        self._snaps_skipped = 0
+        self._event_batches_dropped = 0
         self._snapshot_cache = SnapshotCache()
+        workers = svc.config.snapshot_workers
+        self._encoder = EncodePool(workers, svc.config.snapshot_pool_mode) if workers > 0 else None
+        self._handlers = {
+            "input": self._on_input,
+            "ping": self._on_ping,
+            "hello": self._on_hello,
+            "join": self._on_join,
+            "chat": self._on_chat,
+            "leave": self._on_leave,
+        }
+
+    @property
+    def connection_count(self) -> int:
+        return len(self._conns)
 
     def _origin_allowed(self, origin: str | None) -> bool:
         cfg = self.svc.config
@@ -66,8 +108,10 @@ class WsHub:
             want_deltas=True,
             input_bucket=TokenBucket(rate_per_sec=120.0, burst=240.0),
             chat_bucket=TokenBucket(rate_per_sec=1.5, burst=3.0),
+            transport=request.transport,
+            last_write_at=time.monotonic(),
         )
-        self._conns[conn_id] = conn
+        self._register(conn)
 
         await ws.send_str(protocol.dumps("info", {"server": self.svc.version_payload()}))
 
@@ -84,134 +128,161 @@ class WsHub:
     async def _on_text(self, conn: Connection, text: str) -> None:
         try:
             msg_type, data = protocol.loads(text)
+            handler = self._handlers.get(msg_type)
+            if handler is None:
+                await conn.ws.send_str(protocol.dumps("error", {"message": "invalid type"}))
+                return
+            await handler(conn, data)
         except protocol.ProtocolError as e:
             await conn.ws.send_str(protocol.dumps("error", {"message": str(e)}))
-            return
-
-        if msg_type not in protocol.VALID_C2S:
-            await conn.ws.send_str(protocol.dumps("error", {"message": "invalid type"}))
-            return
 
-        if msg_type == "hello":
-            h = protocol.Hello.parse(data)
-            conn.hello_version = h.clientVersion
-            await conn.ws.send_str(
-                protocol.dumps(
-                    "version",
-                    {
-                        "ok": True,
-                        **self.svc.version_payload(),
-                    },
-                )
+    async def _on_hello(self, conn: Connection, data: dict[str, Any]) -> None:
+        h = protocol.Hello.parse(data)
+        conn.hello_version = h.clientVersion
+        await conn.ws.send_str(
+            protocol.dumps(
+                "version",
+                {
+                    "ok": True,
+                    **self.svc.version_payload(),
+                },
             )
-            return
+        )
 
-        if msg_type == "join":
-            j = protocol.Join.parse(data)
-            conn.player_name = j.playerName
-            # Always send full snapshots; simplifies client correctness.
-            conn.want_deltas = False
-            room_id = j.roomId
-            if j.matchmake or not room_id:
-                room_id = self.svc.matchmake()
-            room = self.svc.get_or_create_room(room_id)
+    async def _on_join(self, conn: Connection, data: dict[str, Any]) -> None:
+        j = protocol.Join.parse(data)
+        conn.player_name = j.playerName
+        # Always send full snapshots; simplifies client correctness.
+        conn.want_deltas = False
+        room_id = j.roomId
+        if j.matchmake or not room_id:
+            room_id = self.svc.matchmake()
+        room = self.svc.get_or_create_room(room_id)
+        try:
             room.add_player(conn.player_id, conn.player_name)
-            conn.room_id = room_id
-            self._snapshot_cache.clear(conn.player_id)
-
-            await conn.ws.send_str(
-                protocol.dumps(
-                    "welcome",
-                    {
-                        "playerId": conn.player_id,
-                        "tickrate": self.svc.config.simulation_hz,
-                        "roomId": room.room_id,
-                        "seed": room.seed,
-                        "mapId": room.map_id,
-                    },
-                )
-            )
+        except ValueError as e:
+            await conn.ws.send_str(protocol.dumps("error", {"message": str(e)}))
             return
+        self._set_room(conn, room_id)
+        self._snapshot_cache.clear(conn.player_id)
 
-        if msg_type == "leave":
-            await self._disconnect(conn)
-            return
+        await conn.ws.send_str(
+            protocol.dumps(
+                "welcome",
+                {
+                    "playerId": conn.player_id,
+                    "tickrate": self.svc.config.simulation_hz,
+                    "roomId": room.room_id,
+                    "seed": room.seed,
+                    "mapId": room.map_id,
+                },
+            )
+        )
 
-        if msg_type == "ping":
-            p = protocol.Ping.parse(data)
-            await conn.ws.send_str(protocol.dumps("pong", {"t": p.t, "serverTime": time.time()}))
-            return
+    async def _on_leave(self, conn: Connection, data: dict[str, Any]) -> None:
+        await self._disconnect(conn)
+
+    async def _on_ping(self, conn: Connection, data: dict[str, Any]) -> None:
+        p = protocol.Ping.parse(data)
+        await conn.ws.send_str(protocol.dumps("pong", {"t": p.t, "serverTime": time.time()}))
 
+    async def _joined_room(self, conn: Connection):
         # Must be joined for input/chat.
         if not conn.room_id:
             await conn.ws.send_str(protocol.dumps("error", {"message": "not joined"}))
-            return
-
+            return None
         room = self.svc.rooms.get(conn.room_id)
         if not room:
             await conn.ws.send_str(protocol.dumps("error", {"message": "room missing"}))
-            return
+            return None
+        return room
 
-        if msg_type == "chat":
-            if not conn.chat_bucket.allow():
-                return
-            c = protocol.Chat.parse(data)
-            room._push_event("chat", {"from": conn.player_name, "text": c.text})
+    async def _on_chat(self, conn: Connection, data: dict[str, Any]) -> None:
+        room = await self._joined_room(conn)
+        if not room:
             return
+        if not conn.chat_bucket.allow():
+            return
+        c = protocol.Chat.parse(data)
+        room._push_event("chat", {"from": conn.player_name, "text": c.text})
 
-        if msg_type == "input":
-            if not conn.input_bucket.allow():
-                return
-            inp = protocol.Input.parse(data)
-            # Validate dt & input order window.
-            if inp.dt < 0.0 or inp.dt > self.svc.config.max_dt:
-                return
+    async def _on_input(self, conn: Connection, data: dict[str, Any]) -> None:
+        # Hot path: one frame may carry several inputs (plus redundant resends).
+        if conn.room_id is None:
+            await conn.ws.send_str(protocol.dumps("error", {"message": "not joined"}))
+            return
+        bucket = conn.input_bucket
+        room = self.svc.rooms.get(conn.room_id)
+        pl = room.players.get(conn.player_id) if room else None
+        if not pl:
+            return
 
-            pl = room.players.get(conn.player_id)
-            if not pl:
-                return
+        # Accept client aim angles (server authoritative sim still validates movement).
+        # parse_inputs only normalizes them; stricter turn-rate limits can be
+        # reintroduced later without breaking client movement alignment.
+        max_dt = self.svc.config.max_dt
+        last_seq = pl.lastInputSeq
+        latest = None
+        fire = jump = reload = False
+        for cmd in protocol.parse_inputs(data):
+            # Duplicate/out-of-order (or a redundant resend); ignore.
+            if cmd["seq"] <= last_seq:
+                continue
+            dt = cmd["dt"]
+            if dt < 0.0 or dt > max_dt:
+                continue
+            # The rate limit is per input, not per frame (a frame carries up to MAX_INPUT_BUNDLE).
+            if not bucket.allow():
+                break
+            last_seq = cmd["seq"]
+            latest = cmd
+            fire = fire or cmd["fire"]
+            jump = jump or cmd["jump"]
+            reload = reload or cmd["reload"]
+        if latest is None:
+            # Nothing new (resends only, or out of tokens): the frame itself costs one.
+            bucket.allow()
+            return
 
-            # Accept client aim angles (server authoritative sim still validates movement).
-            # For dev feel we only normalize angles here; stricter turn-rate limits can be
-            # reintroduced later without breaking client movement alignment.
-            yaw = (float(inp.yaw) + math.pi) % (math.tau) - math.pi
-            pitch = max(-1.4, min(1.4, float(inp.pitch)))
+        # Only the newest command is kept; don't lose a press from an older one in the bundle.
+        latest["fire"] = fire
+        latest["jump"] = jump
+        latest["reload"] = reload
+        pl.lastInputSeq = last_seq
+        room.apply_input(conn.player_id, latest)
 
-            # Sequence window.
-            if inp.seq <= pl.lastInputSeq - self.svc.config.input_seq_window:
-                return
-            if inp.seq <= pl.lastInputSeq:
-                # Duplicate/out-of-order; ignore.
-                return
+    def _register(self, conn: Connection) -> None:
+        self._conns[conn.conn_id] = conn
+        if conn.room_id:
+            self._by_room.setdefault(conn.room_id, {})[conn.conn_id] = conn
 
-            pl.lastInputSeq = inp.seq
-            # Apply as last command.
-            room.apply_input(
-                conn.player_id,
-                {
-                    "seq": inp.seq,
-                    "moveX": inp.moveX,
-                    "moveY": inp.moveY,
-                    "jump": inp.jump,
-                    "sprint": inp.sprint,
-                    "yaw": yaw,
-                    "pitch": pitch,
-                    "fire": inp.fire,
-                    "weaponId": inp.weaponId,
-                    "reload": inp.reload,
-                },
-            )
+    def _set_room(self, conn: Connection, room_id: str | None) -> None:
+        old = conn.room_id
+        if old == room_id:
             return
+        if old:
+            members = self._by_room.get(old)
+            if members is not None:
+                members.pop(conn.conn_id, None)
+                if not members:
+                    self._by_room.pop(old, None)
+            # Re-joining elsewhere: don't leave a ghost player behind.
+            room = self.svc.rooms.get(old)
+            if room:
+                room.remove_player(conn.player_id)
+        conn.room_id = room_id
+        # Held events belong to the room being left.
+        conn.held_events.clear()
+        conn.held_chars = 0
+        if room_id:
+            self._by_room.setdefault(room_id, {})[conn.conn_id] = conn
 
     async def _disconnect(self, conn: Connection) -> None:
         # Idempotent.
         if conn.conn_id not in self._conns:
             return
         self._conns.pop(conn.conn_id, None)
-        if conn.room_id:
-            room = self.svc.rooms.get(conn.room_id)
-            if room:
-                room.remove_player(conn.player_id)
+        self._set_room(conn, None)
         self._snapshot_cache.clear(conn.player_id)
         try:
             await conn.ws.close()
@@ -223,20 +294,137 @@ class WsHub:
             await self._disconnect(c)
 
     def connections_in_room(self, room_id: str) -> Iterable[Connection]:
+        members = self._by_room.get(room_id)
+        if not members:
+            return ()
+        # Copy: callers await between sends and members may disconnect meanwhile.
+        return tuple(members.values())
+
+    def _admit_snapshot(self, conn: Connection, now: float) -> bool:
+        """Backpressure gate: False means skip this snapshot for this connection."""
+        cfg = self.svc.config
+        if conn.write_buffer_size() > cfg.slow_client_buffer_bytes:
+            if conn.lag_since is None:
+                conn.lag_since = now
+            evict_after = cfg.slow_client_evict_sec
+            if evict_after > 0.0 and (now - conn.lag_since) >= evict_after:
+                self._evict(conn)
+            # Skip rather than await a drain that would stall every other client.
+            return False
+
+        if conn.lag_since is not None:
+            conn.lag_since = None
+            conn.degraded_until = now + cfg.slow_client_recover_sec
+        if now < conn.degraded_until:
+            # Recently lagging: lower snapshot rate until the link proves itself.
+            every = max(1, int(cfg.slow_client_downgrade_every))
+            return ((conn.snaps_sent + conn.snaps_skipped) % every) == 0
+        return True
+
+    def _evict(self, conn: Connection) -> None:
+        self._evicted += 1
+        # Abort instead of a close handshake the client is too far behind to answer;
+        # handle()'s read loop ends and runs _disconnect.
+        if conn.transport is not None:
+            conn.transport.abort()
+        else:
+            asyncio.ensure_future(self._disconnect(conn))
+
+    async def send_snapshots(self, room, items: list[tuple[Connection, dict[str, Any], str]]) -> None:
+        """One room broadcast: (connection, snapshot, events JSON) per member.
+
+        Admission and delta bookkeeping run here; encoding runs inline or, with
+        snapshot_workers > 0, as one batch on the encode pool.
+        """
+        now = time.monotonic()
+        jobs = []
+        conns = []
+        for conn, snapshot, events_json in items:
+            if not self._admit_snapshot(conn, now):
+                conn.snaps_skipped += 1
+                self._snaps_skipped += 1
+                self._hold_events(conn, events_json)
+                continue
+            if conn.held_events:
+                # Deliver what skipped snapshots carried (kills, respawns, reloads), oldest first.
+                if events_json != "[]":
+                    conn.held_events.append(events_json[1:-1])
+                events_json = "[" + ",".join(conn.held_events) + "]"
+                conn.held_events.clear()
+                conn.held_chars = 0
+            payload = self._snapshot_cache.make(
+                player_id=conn.player_id,
+                server_tick=self.svc.tick,
+                snapshot={
+                    "roomId": room.room_id,
+                    "mapId": room.map_id,
+                    "seed": room.seed,
+                    **snapshot,
+                },
+                want_delta=conn.want_deltas,
+            )
+            # Events are pre-encoded by the room (shared across connections) and never cached.
+            jobs.append((payload, events_json))
+            conns.append(conn)
+        if not jobs:
+            return
+        if self._encoder is not None:
+            texts = await self._encoder.encode(jobs)
+        else:
+            texts = protocol.encode_snapshots(jobs)
+        for conn, text in zip(conns, texts):
+            if conn.conn_id not in self._conns:
+                # Left (or was evicted) while we were encoding or sending.
+                continue
+            await conn.ws.send_str(text)
+            conn.snaps_sent += 1
+            conn.last_write_at = now
+
+    def _hold_events(self, conn: Connection, events_json: str) -> None:
+        if events_json == "[]":
+            return
+        body = events_json[1:-1]
+        conn.held_events.append(body)
+        conn.held_chars += len(body)
+        while conn.held_chars > MAX_HELD_EVENT_CHARS and len(conn.held_events) > 1:
+            dropped = conn.held_events.pop(0)
+            conn.held_chars -= len(dropped)
+            self._event_batches_dropped += 1
+
+    def shutdown_encoder(self) -> None:
+        if self._encoder is not None:
+            self._encoder.shutdown()
+
+    def metrics(self) -> dict[str, Any]:
+        now = time.monotonic()
+        lagging = 0
+        degraded = 0
+        rows = []
         for c in self._conns.values():
-            if c.room_id == room_id:
-                yield c
-
-    async def send_snapshot(self, conn: Connection, room, snapshot: dict[str, Any]) -> None:
-        payload = self._snapshot_cache.make(
-            player_id=conn.player_id,
-            server_tick=self.svc.tick,
-            snapshot={
-                "roomId": room.room_id,
-                "mapId": room.map_id,
-                "seed": room.seed,
-                **snapshot,
-            },
-            want_delta=conn.want_deltas,
-        )
-        await conn.ws.send_str(protocol.dumps("snapshot", payload))
+            buf = c.write_buffer_size()
+            if c.lag_since is not None:
+                lagging += 1
+            elif now < c.degraded_until:
+                degraded += 1
+            rows.append((buf, now - c.last_write_at, c))
+        rows.sort(key=lambda r: (r[0], r[1]), reverse=True)
+        return {
+            "connections": len(self._conns),
+            "lagging": lagging,
+            "degraded": degraded,
+            "evicted": self._evicted,
+            "snapshotsSkipped": self._snaps_skipped,
+            "heldEventBatchesDropped": self._event_batches_dropped,
+            "encoder": self._encoder.payload() if self._encoder is not None else None,
+            "slowest": [
+                {
+                    "connId": c.conn_id,
+                    "roomId": c.room_id,
+                    "bufferBytes": buf,
+                    "sinceWriteSec": since,
+                    "lagSec": (now - c.lag_since) if c.lag_since is not None else 0.0,
+                    "snapshotsSkipped": c.snaps_skipped,
+                }
+                for buf, since, c in rows[:5]
+            ],
+        }
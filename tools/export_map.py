@@ -1,24 +1,176 @@
-"""Very small helper to author server map JSON.
+"""Very small helper to author server map JSON, and compile it for the server.
 
 This is a placeholder pipeline script to keep the repo aligned with the spec.
 For real production, you'd export from Blender and enrich with pickups/spawns.
 
 Input (example):
   python tools/export_map.py --out server/game/maps/map01.json
+  python tools/export_map.py --compile map01
+  python tools/export_map.py --compile map01 --validate
+
+--compile writes server/game/maps/<map_id>.mapbin next to the JSON: packed
+colliders, spawns and pickups, a collider BVH and the bot nav grids for the
+given cell size and pad (see server/game/mapbin.py). The server maps the bundle
+when it matches the JSON and falls back to the JSON otherwise, so re-run this
+after editing a map.
+
+Before bundling, colliders are simplified (unless --no-optimize): boxes inside
+another box are dropped and boxes that share a face with the same cross-section
+are merged, so runtime loops over fewer AABBs. The JSON keeps the authored
+boxes. --validate checks that the merged set blocks exactly the same volume
+and rasterizes to the same nav grids, and exits non-zero if not.
 """
 
 from __future__ import annotations
 
 import argparse
+import hashlib
 import json
 import os
+import sys
+
+
+def _repo_root() -> str:
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+Box = tuple[float, float, float, float, float, float]  # min xyz, max xyz
+
+
+def _contains(a: Box, b: Box) -> bool:
+    return a[0] <= b[0] and a[1] <= b[1] and a[2] <= b[2] and a[3] >= b[3] and a[4] >= b[4] and a[5] >= b[5]
+
+
+def _drop_contained(boxes: list[Box]) -> list[Box]:
+    keep: list[Box] = []
+    # Biggest first, so a box is only tested against boxes that could hold it.
+    for b in sorted(dict.fromkeys(boxes), key=lambda b: -(b[3] - b[0]) * (b[4] - b[1]) * (b[5] - b[2])):
+        if not any(_contains(k, b) for k in keep):
+            keep.append(b)
+    return keep
+
+
+def _merge_axis(boxes: list[Box], k: int) -> list[Box]:
+    # Boxes with identical extents on the other two axes whose extents on axis k
+    # touch or overlap: their union is one box.
+    o1, o2 = [i for i in range(3) if i != k]
+    groups: dict[tuple[float, ...], list[Box]] = {}
+    for b in boxes:
+        groups.setdefault((b[o1], b[o1 + 3], b[o2], b[o2 + 3]), []).append(b)
+    out: list[Box] = []
+    for group in groups.values():
+        group.sort(key=lambda b: b[k])
+        cur = list(group[0])
+        for b in group[1:]:
+            if b[k] <= cur[k + 3]:
+                cur[k + 3] = max(cur[k + 3], b[k + 3])
+            else:
+                out.append(tuple(cur))
+                cur = list(b)
+        out.append(tuple(cur))
+    return out
+
+
+def merge_colliders(boxes: list[Box]) -> list[Box]:
+    """Same blocked volume in fewer boxes: contained boxes dropped, boxes that
+    share a face (or overlap) with the same cross-section merged.
+
+    New boxes only take coordinates from the input, so the result is exact.
+    Output keeps authored order (by the first input box each one covers).
+    """
+    authored = list(boxes)
+    while True:
+        n = len(boxes)
+        boxes = _drop_contained(boxes)
+        for k in range(3):
+            boxes = _merge_axis(boxes, k)
+        if len(boxes) == n:
+            break
+    first = {b: min(i for i, a in enumerate(authored) if _contains(b, a)) for b in boxes}
+    return sorted(boxes, key=first.__getitem__)
+
+
+def same_volume(a: list[Box], b: list[Box]) -> tuple[float, float, float] | None:
+    """None if `a` and `b` block exactly the same space, else a point only one of them blocks.
+
+    Every coordinate either set uses splits space into cells no box boundary
+    crosses; each cell's center is tested against both sets.
+    """
+    xs = sorted({v for box in a + b for v in (box[0], box[3])})
+    ys = sorted({v for box in a + b for v in (box[1], box[4])})
+    zs = sorted({v for box in a + b for v in (box[2], box[5])})
+    for x0, x1 in zip(xs, xs[1:]):
+        x = (x0 + x1) * 0.5
+        sa = [box for box in a if box[0] < x < box[3]]
+        sb = [box for box in b if box[0] < x < box[3]]
+        for z0, z1 in zip(zs, zs[1:]):
+            z = (z0 + z1) * 0.5
+            ra = [box for box in sa if box[2] < z < box[5]]
+            rb = [box for box in sb if box[2] < z < box[5]]
+            if not ra and not rb:
+                continue
+            for y0, y1 in zip(ys, ys[1:]):
+                y = (y0 + y1) * 0.5
+                if any(box[1] < y < box[4] for box in ra) != any(box[1] < y < box[4] for box in rb):
+                    return (x, y, z)
+    return None
+
+
+def _compile(map_id: str, cell: float, pad: float | None, optimize: bool, validate: bool) -> int:
+    sys.path.insert(0, _repo_root())
+    from server.ai.nav import GridNav
+    from server.game.bvh import build_bvh
+    from server.game.config import ServerConfig
+    from server.game.mapbin import write_bundle
+    from server.game.world import AABB, maps_dir, parse_map
+
+    src = os.path.join(maps_dir(), f"{map_id}.json")
+    with open(src, "rb") as f:
+        raw = f.read()
+    map_data = parse_map(json.loads(raw), map_id)
+    pad = ServerConfig().player_radius if pad is None else pad
+    if optimize:
+        authored = [(*a.min, *a.max) for a in map_data.colliders]
+        merged = merge_colliders(authored)
+        print(f"Colliders: {len(authored)} -> {len(merged)}")
+        if validate:
+            bad = same_volume(authored, merged)
+            if bad is not None:
+                print(f"Validation FAILED: blocked volume differs at {bad}")
+                return 1
+            before = GridNav(map_data, cell_size=cell, pad=pad)
+        map_data.colliders = [AABB(min=list(b[:3]), max=list(b[3:])) for b in merged]
+    bvh = build_bvh(map_data.colliders)
+    nav = GridNav(map_data, cell_size=cell, pad=pad)
+    if optimize and validate:
+        if before.free != nav.free or before.clear != nav.clear:
+            print("Validation FAILED: nav grids differ")
+            return 1
+        print("Validation OK: same blocked volume, same nav grids")
+    out = os.path.join(maps_dir(), f"{map_id}.mapbin")
+    size = write_bundle(out, map_data, hashlib.sha256(raw).hexdigest(), bvh, nav)
+    print(
+        f"Wrote {out} ({size} bytes: {len(map_data.colliders)} colliders, {bvh.node_count} BVH nodes, "
+        f"{nav.w}x{nav.h} nav cells)"
+    )
+    return 0
 
 
 def main() -> int:
     ap = argparse.ArgumentParser()
-    ap.add_argument("--out", required=True)
+    ap.add_argument("--out", default=None, help="write a template map JSON here")
+    ap.add_argument("--compile", default=None, metavar="MAP_ID", help="compile server/game/maps/MAP_ID.json to a bundle")
+    ap.add_argument("--cell", type=float, default=1.0, help="nav cell size (m) baked into the bundle")
+    ap.add_argument("--pad", type=float, default=None, help="nav pad (m); default: the server's player radius")
+    ap.add_argument("--no-optimize", action="store_true", help="bundle the colliders exactly as authored")
+    ap.add_argument("--validate", action="store_true", help="check the merged colliders block the same volume")
     args = ap.parse_args()
 
+    if args.compile:
+        return _compile(args.compile, args.cell, args.pad, optimize=not args.no_optimize, validate=args.validate)
+    if not args.out:
+        ap.error("one of --out or --compile is required")
+
     out = os.path.abspath(args.out)
     os.makedirs(os.path.dirname(out), exist_ok=True)
 
@@ -0,0 +1,388 @@
+"""Headless load test: N simulated WebSocket clients against a local server.
+
+Each client runs hello/join, streams `input` at a fixed rate with a scripted
+movement/fire pattern and reads `snapshot` frames. One run is made per
+(rooms, clients) combination so capacity can be tracked as load grows.
+
+Usage:
+  python tools/loadtest.py --clients 8,16,32 --rooms 1,2 --duration 10
+  python tools/loadtest.py --url ws://127.0.0.1:8765/ws --clients 12 --out loadtest.json
+
+Without --url a fresh `python -m server.app` is started for every run
+(sqlite disabled) and stopped afterwards.
+
+Output (JSON, stdout or --out):
+  {"tool": "loadtest", "format": 1, "runs": [{"rooms", "clients", "server": {...}, "snapshots": {...}, "clientStats": {...}}]}
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from typing import Any
+
+import aiohttp
+
+FORMAT_VERSION = 1
+
+
+def _repo_root() -> str:
+    return os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+
+def _int_list(s: str) -> list[int]:
+    return [int(x) for x in s.split(",") if x.strip()]
+
+
+def _free_port() -> int:
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.bind(("127.0.0.1", 0))
+        return int(s.getsockname()[1])
+
+
+def _percentile(vals: list[float], q: float) -> float:
+    if not vals:
+        return 0.0
+    vals = sorted(vals)
+    k = max(0, min(len(vals) - 1, int(round(q * (len(vals) - 1)))))
+    return vals[k]
+
+
+def _script_cmd(pattern: str, t: float, phase: float, rng: random.Random) -> dict[str, Any]:
+    # Scripted movement; yaw/pitch in radians, move axes in [-1, 1].
+    if pattern == "idle":
+        return {"moveX": 0.0, "moveY": 0.0, "yaw": phase, "pitch": 0.0}
+    if pattern == "strafe":
+        return {"moveX": 1.0 if math.sin(t * 1.5 + phase) >= 0.0 else -1.0, "moveY": 0.0, "yaw": phase, "pitch": 0.0}
+    if pattern == "random":
+        return {
+            "moveX": rng.uniform(-1.0, 1.0),
+            "moveY": rng.uniform(-1.0, 1.0),
+            "yaw": rng.uniform(-math.pi, math.pi),
+            "pitch": rng.uniform(-0.3, 0.3),
+        }
+    # circle
+    return {"moveX": 0.0, "moveY": 1.0, "yaw": (t * 0.8 + phase) % math.tau - math.pi, "pitch": 0.0}
+
+
+class SimClient:
+    def __init__(self, idx: int, room_id: str, args: argparse.Namespace):
+        self.idx = idx
+        self.room_id = room_id
+        self.args = args
+        self.rng = random.Random(idx)
+        self.phase = self.rng.uniform(-math.pi, math.pi)
+
+        self.joined = False
+        self.error: str | None = None
+        self.bytes_rx = 0
+        self.frames_rx = 0
+        self.snap_times: list[float] = []
+        self.inputs_tx = 0
+
+    async def run(self, session: aiohttp.ClientSession, url: str, stop_at: float, measure_from: float) -> None:
+        try:
+            async with session.ws_connect(url, max_msg_size=0) as ws:
+                await ws.send_str(json.dumps({"type": "hello", "data": {"clientVersion": "loadtest"}}))
+                await ws.send_str(
+                    json.dumps(
+                        {"type": "join", "data": {"roomId": self.room_id, "playerName": f"lt{self.idx}", "wantDeltas": False}}
+                    )
+                )
+                reader = asyncio.create_task(self._read(ws, measure_from))
+                try:
+                    await self._send_inputs(ws, stop_at)
+                finally:
+                    reader.cancel()
+                    try:
+                        await reader
+                    except asyncio.CancelledError:
+                        pass
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+
+    async def _read(self, ws: aiohttp.ClientWebSocketResponse, measure_from: float) -> None:
+        async for msg in ws:
+            if msg.type != aiohttp.WSMsgType.TEXT:
+                if msg.type in (aiohttp.WSMsgType.CLOSED, aiohttp.WSMsgType.ERROR):
+                    break
+                continue
+            now = time.perf_counter()
+            # Cheap type sniff; full parse is not needed for capacity numbers.
+            head = msg.data[:24]
+            if '"snapshot"' in head:
+                if now >= measure_from:
+                    self.bytes_rx += len(msg.data)
+                    self.frames_rx += 1
+                    self.snap_times.append(now)
+            elif '"welcome"' in head:
+                self.joined = True
+            elif '"error"' in head and not self.joined:
+                self.error = msg.data[:200]
+        if not self.joined and self.error is None:
+            self.error = "closed before welcome"
+
+    async def _send_inputs(self, ws: aiohttp.ClientWebSocketResponse, stop_at: float) -> None:
+        dt = 1.0 / float(self.args.input_hz)
+        seq = 0
+        start = time.perf_counter()
+        next_at = start
+        while not ws.closed:
+            now = time.perf_counter()
+            if now >= stop_at:
+                break
+            if self.joined:
+                cmd = _script_cmd(self.args.pattern, now - start, self.phase, self.rng)
+                fire = self.rng.random() < self.args.fire
+                await ws.send_str(
+                    json.dumps(
+                        {
+                            "type": "input",
+                            "data": {
+                                "seq": seq,
+                                "dt": dt,
+                                "jump": False,
+                                "sprint": True,
+                                "fire": fire,
+                                "weaponId": self.args.weapon,
+                                "reload": False,
+                                **cmd,
+                            },
+                        },
+                        separators=(",", ":"),
+                    )
+                )
+                seq += 1
+                self.inputs_tx += 1
+            next_at += dt
+            await asyncio.sleep(max(0.0, next_at - time.perf_counter()))
+
+
+async def _get_metrics(session: aiohttp.ClientSession, http_base: str) -> dict[str, Any] | None:
+    try:
+        async with session.get(f"{http_base}/metrics") as r:
+            if r.status != 200:
+                return None
+            return await r.json()
+    except Exception:
+        return None
+
+
+async def _wait_ready(http_base: str, timeout: float) -> None:
+    deadline = time.perf_counter() + timeout
+    async with aiohttp.ClientSession() as session:
+        while time.perf_counter() < deadline:
+            try:
+                async with session.get(f"{http_base}/health") as r:
+                    if r.status == 200:
+                        return
+            except Exception:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"server at {http_base} not ready after {timeout:.0f}s")
+
+
+def _summarize_server(before: dict[str, Any] | None, after: dict[str, Any] | None, wall: float) -> dict[str, Any]:
+    if not before or not after:
+        return {"available": False}
+    tb, ta = before.get("tick", {}), after.get("tick", {})
+    ticks = int(ta.get("ticks", 0)) - int(tb.get("ticks", 0))
+    overruns = int(ta.get("overruns", 0)) - int(tb.get("overruns", 0))
+    cpu = float(after.get("cpuSec", 0.0)) - float(before.get("cpuSec", 0.0))
+    return {
+        "available": True,
+        "cpuPercent": 100.0 * cpu / wall if wall > 0 else 0.0,
+        "ticks": ticks,
+        "tickOverruns": overruns,
+        "tickOverrunRatio": (overruns / ticks) if ticks else 0.0,
+        "tickAvgMs": float(ta.get("avgMs", 0.0)),
+        "tickMaxMs": float(ta.get("maxMs", 0.0)),
+        "droppedSimSec": float(ta.get("droppedSec", 0.0)) - float(tb.get("droppedSec", 0.0)),
+        # Sampled at window start; clients have disconnected by the final sample.
+        "rooms": before.get("rooms"),
+        "players": before.get("players"),
+        "final": after,
+    }
+
+
+def _summarize_clients(clients: list[SimClient], window: float, snapshot_hz: float | None) -> tuple[dict[str, Any], dict[str, Any]]:
+    gaps: list[float] = []
+    per_rate: list[float] = []
+    per_bytes: list[int] = []
+    for c in clients:
+        ts = c.snap_times
+        gaps.extend((b - a) for a, b in zip(ts, ts[1:]))
+        per_rate.append(len(ts) / window if window > 0 else 0.0)
+        per_bytes.append(c.bytes_rx)
+
+    gaps_ms = [g * 1000.0 for g in gaps]
+    expected_ms = (1000.0 / snapshot_hz) if snapshot_hz else None
+    snaps = {
+        "expectedIntervalMs": expected_ms,
+        "intervalMeanMs": statistics.fmean(gaps_ms) if gaps_ms else 0.0,
+        "intervalP50Ms": _percentile(gaps_ms, 0.50),
+        "intervalP95Ms": _percentile(gaps_ms, 0.95),
+        "intervalP99Ms": _percentile(gaps_ms, 0.99),
+        "intervalMaxMs": max(gaps_ms) if gaps_ms else 0.0,
+        "jitterStdevMs": statistics.pstdev(gaps_ms) if len(gaps_ms) > 1 else 0.0,
+        "ratePerClientHz": statistics.fmean(per_rate) if per_rate else 0.0,
+    }
+    joined = [c for c in clients if c.joined]
+    cl = {
+        "requested": len(clients),
+        "joined": len(joined),
+        "errors": sorted({c.error for c in clients if c.error}),
+        "inputsSent": sum(c.inputs_tx for c in clients),
+        "bytesPerClientMean": statistics.fmean(per_bytes) if per_bytes else 0.0,
+        "bytesPerClientMax": max(per_bytes) if per_bytes else 0,
+        "bytesPerClientPerSec": (statistics.fmean(per_bytes) / window) if per_bytes and window > 0 else 0.0,
+    }
+    return snaps, cl
+
+
+async def _run_once(url: str, http_base: str, rooms: int, n_clients: int, args: argparse.Namespace) -> dict[str, Any]:
+    async with aiohttp.ClientSession() as session:
+        info = await _get_metrics(session, http_base)
+        snapshot_hz = None
+        try:
+            async with session.get(f"{http_base}/version") as r:
+                snapshot_hz = float((await r.json()).get("snapshotHz"))
+        except Exception:
+            pass
+
+        clients = [SimClient(i, f"{args.room_prefix}{i % rooms}", args) for i in range(n_clients)]
+        t_start = time.perf_counter()
+        measure_from = t_start + args.warmup
+        stop_at = measure_from + args.duration
+
+        tasks = []
+        for c in clients:
+            tasks.append(asyncio.create_task(c.run(session, url, stop_at, measure_from)))
+            if args.ramp > 0.0:
+                await asyncio.sleep(args.ramp / max(1, n_clients))
+
+        await asyncio.sleep(max(0.0, measure_from - time.perf_counter()))
+        before = await _get_metrics(session, http_base)
+        w0 = time.perf_counter()
+        await asyncio.gather(*tasks)
+        after = await _get_metrics(session, http_base)
+        wall = time.perf_counter() - w0
+
+    snaps, cl = _summarize_clients(clients, args.duration, snapshot_hz)
+    return {
+        "rooms": rooms,
+        "clients": n_clients,
+        "durationSec": args.duration,
+        "server": _summarize_server(before, after, wall),
+        "snapshots": snaps,
+        "clientStats": cl,
+        "serverAtStart": info,
+    }
+
+
+def _spawn_server(port: int, args: argparse.Namespace) -> subprocess.Popen:
+    env = dict(os.environ)
+    env["FPS_HOST"] = "127.0.0.1"
+    env["FPS_PORT"] = str(port)
+    env["FPS_SQLITE"] = "false"
+    env["FPS_BOTS"] = "true" if args.bots else "false"
+    return subprocess.Popen(
+        [sys.executable, "-m", "server.app"],
+        cwd=_repo_root(),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL if not args.server_logs else None,
+    )
+
+
+async def _main_async(args: argparse.Namespace) -> dict[str, Any]:
+    runs = []
+    for rooms in _int_list(args.rooms):
+        for n in _int_list(args.clients):
+            proc = None
+            if args.url:
+                url = args.url
+            else:
+                port = _free_port()
+                proc = _spawn_server(port, args)
+                url = f"ws://127.0.0.1:{port}/ws"
+            http_base = url.replace("wss://", "https://").replace("ws://", "http://").rsplit("/ws", 1)[0]
+            try:
+                await _wait_ready(http_base, timeout=15.0)
+                run = await _run_once(url, http_base, rooms, n, args)
+            finally:
+                if proc is not None:
+                    proc.terminate()
+                    try:
+                        proc.wait(timeout=5.0)
+                    except subprocess.TimeoutExpired:
+                        proc.kill()
+            runs.append(run)
+            print(
+                f"rooms={rooms} clients={n} joined={run['clientStats']['joined']} "
+                f"cpu={run['server'].get('cpuPercent', 0.0):.1f}% "
+                f"overruns={run['server'].get('tickOverruns', 0)} "
+                f"snapP95={run['snapshots']['intervalP95Ms']:.1f}ms",
+                file=sys.stderr,
+            )
+
+    return {
+        "tool": "loadtest",
+        "format": FORMAT_VERSION,
+        "timestamp": time.time(),
+        "config": {
+            "inputHz": args.input_hz,
+            "pattern": args.pattern,
+            "fire": args.fire,
+            "weaponId": args.weapon,
+            "durationSec": args.duration,
+            "warmupSec": args.warmup,
+            "bots": args.bots,
+            "external": bool(args.url),
+        },
+        "runs": runs,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default=None, help="ws:// URL of a running server (default: spawn one per run)")
+    ap.add_argument("--clients", default="8", help="comma-separated client counts, e.g. 8,16,32")
+    ap.add_argument("--rooms", default="1", help="comma-separated room counts; clients are spread round-robin")
+    ap.add_argument("--duration", type=float, default=10.0, help="measured seconds per run")
+    ap.add_argument("--warmup", type=float, default=2.0, help="unmeasured seconds after connecting")
+    ap.add_argument("--ramp", type=float, default=1.0, help="seconds over which clients connect")
+    ap.add_argument("--input-hz", type=float, default=60.0)
+    ap.add_argument("--pattern", choices=("circle", "strafe", "random", "idle"), default="circle")
+    ap.add_argument("--fire", type=float, default=0.2, help="probability an input has fire=true")
+    ap.add_argument("--weapon", default="pistol")
+    ap.add_argument("--room-prefix", default="lt")
+    ap.add_argument("--bots", action=argparse.BooleanOptionalAction, default=True)
+    ap.add_argument("--server-logs", action="store_true", help="show spawned server stderr")
+    ap.add_argument("--out", default=None, help="write JSON here instead of stdout")
+    args = ap.parse_args()
+
+    result = asyncio.run(_main_async(args))
+    text = json.dumps(result, indent=2)
+    if args.out:
+        out = os.path.abspath(args.out)
+        os.makedirs(os.path.dirname(out), exist_ok=True)
+        with open(out, "w", encoding="utf-8") as f:
+            f.write(text)
+        print(f"Wrote {out}", file=sys.stderr)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())